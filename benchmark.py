@@ -0,0 +1,380 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""modtime_pecker的性能基准测试
+
+在临时文件夹中按预设形状生成可复现的合成文件夹树，测量检查和序列化的耗时、每秒处理的条目数和峰值内存，
+以及在新的解释器中导入modtime_pecker的耗时；可以将结果保存为基准，之后与基准比较，在部署前发现性能退化。
+
+用法：
+    python benchmark.py                                  # 运行所有形状
+    python benchmark.py --shapes deep wide --scale 0.2   # 只运行部分形状，并缩小规模
+    python benchmark.py --scale 40 --shapes tiny         # 约一百万个小文件
+    python benchmark.py --save-baseline baseline.json
+    python benchmark.py --compare baseline.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from modtime_pecker import (ENGINES, get_latest_modification_time,
+                            multi_check, ndjson_records, render_json,
+                            render_text)
+
+# 合成条目的修改时间范围（ns），由随机种子决定，保证同一种子生成的树完全相同
+BASE_NS = 1_600_000_000 * 10**9
+SPAN_NS = 10**8 * 10**9
+# 导入modtime_pecker时不应加载的模块，只在使用图形界面、剪贴板、进度条或numpy引擎以及开始检查时才导入
+LAZY_MODULES = ('tkinter', 'pyperclip', 'tqdm', 'numpy', 'asyncio',
+                'concurrent.futures')
+_IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import modtime_pecker
+seconds = time.perf_counter() - start
+print(json.dumps([seconds, [name for name in %r if name in sys.modules]]))
+""" % (LAZY_MODULES,)
+
+
+class _Builder:
+    """在root下创建条目，并记录需要设置修改时间的条目"""
+
+    def __init__(self, root, rng):
+        self.root = root
+        self.rng = rng
+        self.paths = []
+
+    def dir(self, parent, name):
+        path = os.path.join(parent, name)
+        os.mkdir(path)
+        self.paths.append(path)
+        return path
+
+    def file(self, parent, name):
+        path = os.path.join(parent, name)
+        open(path, 'wb').close()
+        self.paths.append(path)
+        return path
+
+    def link(self, target, parent, name):
+        path = os.path.join(parent, name)
+        os.symlink(target, path)
+        self.paths.append(path)
+        return path
+
+    def files(self, parent, count):
+        for i in range(count):
+            self.file(parent, f'f{i}.dat')
+
+    def finish(self):
+        """为所有条目设置随机但可复现的修改时间，设置修改时间不会改变所在文件夹的修改时间
+        :return count: int, 生成的条目数
+        """
+        for path in self.paths:
+            mtime_ns = BASE_NS + self.rng.randrange(SPAN_NS)
+            os.utime(path, ns=(mtime_ns, mtime_ns), follow_symlinks=False)
+        return len(self.paths)
+
+
+def _n(base, scale):
+    return max(1, int(base * scale))
+
+def _deep(b, scale):
+    """少量很深的窄链，每层一个文件"""
+    for i in range(4):
+        path = b.dir(b.root, f'chain{i}')
+        for _ in range(_n(250, scale)):
+            b.file(path, 'f.dat')
+            path = b.dir(path, 'd')
+
+def _wide(b, scale):
+    """大量直接子条目和一个含大量文件的扁平文件夹"""
+    b.files(b.root, _n(2000, scale))
+    b.files(b.dir(b.root, 'flat'), _n(20000, scale))
+    for i in range(_n(200, scale)):
+        b.files(b.dir(b.root, f'd{i}'), 50)
+
+def _tiny(b, scale):
+    """大量空的小文件，scale=40时约一百万个"""
+    for i in range(_n(50, scale)):
+        b.files(b.dir(b.root, f'd{i}'), 500)
+
+def _skewed(b, scale):
+    """一个直接子文件夹包含绝大部分条目，其余直接子文件夹很小，用于检验并行引擎的负载均衡"""
+    heavy = b.dir(b.root, 'heavy')
+    for i in range(_n(40, scale)):
+        path = b.dir(heavy, f's{i}')
+        for _ in range(b.rng.randrange(1, 8)):
+            b.files(path, b.rng.randrange(20, 60))
+            path = b.dir(path, 'n')
+    for i in range(_n(50, scale)):
+        b.files(b.dir(b.root, f'light{i}'), 2)
+
+def _symlinks(b, scale):
+    """含有指向文件和文件夹的符号链接的树，其中一个链接指回根文件夹而成环"""
+    data = b.dir(b.root, 'data')
+    targets = []
+    for i in range(_n(20, scale)):
+        path = b.dir(data, f'd{i}')
+        b.files(path, 50)
+        targets.append(path)
+    links = b.dir(b.root, 'links')
+    for i in range(_n(20, scale)):
+        path = b.dir(links, f'l{i}')
+        b.files(path, 5)
+        target = b.rng.choice(targets)
+        b.link(target, path, 'dir_link')
+        b.link(os.path.join(target, 'f0.dat'), path, 'file_link')
+    b.link(b.root, links, 'loop')
+
+# 预设的树形状，均以(builder, scale)调用
+SHAPES = {
+    'deep': _deep,
+    'wide': _wide,
+    'tiny': _tiny,
+    'skewed': _skewed,
+    'symlinks': _symlinks,
+}
+
+def generate_tree(root, shape, scale=1.0, seed=0):
+    """在root下生成指定形状的合成文件夹树，同一形状、规模和种子总是生成相同的树
+    :param root: str, 生成位置，必须是已存在的空文件夹
+    :param shape: str, 树的形状，见SHAPES
+    :param scale: float, 规模系数
+    :param seed: int, 随机种子
+    :return count: int, 生成的条目数（不含root本身）
+    """
+    builder = _Builder(root, random.Random(f'{shape}:{seed}'))
+    SHAPES[shape](builder, scale)
+    return builder.finish()
+
+
+def _measure(func, repeat):
+    """多次运行取最短耗时，再在tracemalloc下运行一次测量Python堆的峰值内存
+    :return (seconds, peak, value): (float, int, object), 最短耗时、峰值内存（字节）和最后一次的返回值
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak, value
+
+def _serialize_ndjson(results):
+    return ''.join(json.dumps(record, ensure_ascii=False) + '\n'
+                   for result in results
+                   for record in ndjson_records(result, per_child=True))
+
+def measure_import(repeat=3):
+    """每次在新的解释器中导入modtime_pecker，取最短耗时，不包括解释器本身的启动
+    :return record: dict, 导入耗时（秒）和导入时被加载的LAZY_MODULES
+    """
+    best, loaded = None, []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', _IMPORT_SCRIPT], capture_output=True,
+            text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        seconds, loaded = json.loads(output)
+        if best is None or seconds < best:
+            best = seconds
+    return {'seconds': best, 'loaded': loaded}
+
+def bench_shape(root, entries, repeat=3, workers=4):
+    """对一棵已生成的树运行所有基准项
+    检查类的基准项以树中的条目数计算每秒处理的条目数，序列化类的以结果中的直接子条目数计算
+    :return records: list[dict], 每个基准项的结果
+    """
+    # 不显示进度条，避免其输出和刷新线程计入耗时
+    scans = {
+        'get_latest_modification_time':
+            lambda: [get_latest_modification_time(root)],
+        'multi_check': lambda: multi_check([root], progress=False),
+        f'multi_check_threads{workers}':
+            lambda: multi_check([root], workers=workers, progress=False),
+        f'multi_check_process{workers}':
+            lambda: multi_check([root], engine='process', workers=workers,
+                                progress=False),
+        'multi_check_numpy':
+            lambda: multi_check([root], engine='numpy', progress=False),
+        'multi_check_follow_symlinks':
+            lambda: multi_check([root], follow_symlinks=True, progress=False),
+        'multi_check_dedup':
+            lambda: multi_check([root], follow_symlinks=True, dedup=True,
+                                progress=False),
+        'multi_check_depth3':
+            lambda: multi_check([root], depth=3, progress=False),
+        'multi_check_top10':
+            lambda: multi_check([root], limit=10, progress=False),
+    }
+    if 'fd' in ENGINES:
+        scans['multi_check_fd'] = lambda: multi_check([root], engine='fd',
+                                                      progress=False)
+    records = []
+    results = None
+    for name, func in scans.items():
+        seconds, peak, results = _measure(func, repeat)
+        records.append({'bench': name, 'entries': entries,
+                        'seconds': seconds, 'peak_bytes': peak})
+
+    children = sum(len(result) for result in results)
+    serializers = {
+        'render_text': lambda: render_text(results),
+        'render_json': lambda: json.dumps(render_json(results),
+                                          ensure_ascii=False),
+        'ndjson': lambda: _serialize_ndjson(results),
+    }
+    for name, func in serializers.items():
+        seconds, peak, _ = _measure(func, repeat)
+        records.append({'bench': name, 'entries': children,
+                        'seconds': seconds, 'peak_bytes': peak})
+    for record in records:
+        record['entries_per_sec'] = record['entries'] / max(
+            record['seconds'], 1e-9)
+    return records
+
+def run(shapes, scale=1.0, seed=0, repeat=3, workers=4, tmp_dir=None):
+    """生成每种形状的树并运行基准测试，结束后删除生成的树
+    :return report: dict, 运行参数和各形状下各基准项的结果
+    """
+    report = {'scale': scale, 'seed': seed, 'workers': workers,
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'import': measure_import(repeat), 'results': {}}
+    for shape in shapes:
+        with tempfile.TemporaryDirectory(dir=tmp_dir) as root:
+            start = time.perf_counter()
+            entries = generate_tree(root, shape, scale, seed)
+            generated = time.perf_counter() - start
+            print(f"[{shape}] generated {entries} entries in "
+                  f"{generated:.2f}s", file=sys.stderr)
+            report['results'][shape] = bench_shape(root, entries, repeat,
+                                                   workers)
+    return report
+
+def format_report(report):
+    """将基准结果渲染为文本表格"""
+    lines = [f"{'shape':<10}{'bench':<32}{'entries':>10}{'seconds':>10}"
+             f"{'entries/s':>14}{'peak MiB':>10}"]
+    for shape, records in report['results'].items():
+        for record in records:
+            lines.append(
+                f"{shape:<10}{record['bench']:<32}{record['entries']:>10}"
+                f"{record['seconds']:>10.4f}"
+                f"{record['entries_per_sec']:>14,.0f}"
+                f"{record['peak_bytes'] / 2**20:>10.2f}")
+    if 'import' in report:
+        lines.append(f"import modtime_pecker: "
+                     f"{report['import']['seconds'] * 1000:.1f} ms")
+        if report['import']['loaded']:
+            lines.append(f"  also loaded: "
+                         f"{', '.join(report['import']['loaded'])}")
+    return os.linesep.join(lines)
+
+def compare(report, baseline, tolerance=0.25):
+    """与基准比较每秒处理的条目数
+    :param tolerance: float, 允许的相对下降比例
+    :return regressions: list[str], 退化超过tolerance的基准项说明
+    """
+    if (baseline['scale'], baseline['seed']) != (report['scale'],
+                                                 report['seed']):
+        raise ValueError("The baseline was recorded with a different "
+                         "--scale or --seed")
+    regressions = []
+    if 'import' in report:
+        for name in report['import']['loaded']:
+            regressions.append(f"import modtime_pecker loads {name}")
+        base = baseline.get('import')
+        if base is not None:
+            ratio = base['seconds'] / max(report['import']['seconds'], 1e-9)
+            if ratio < 1 - tolerance:
+                regressions.append(
+                    f"import modtime_pecker: "
+                    f"{report['import']['seconds'] * 1000:.1f} ms, "
+                    f"{1 / ratio:.0%} of the baseline "
+                    f"{base['seconds'] * 1000:.1f} ms")
+    for shape, records in report['results'].items():
+        old = {record['bench']: record
+               for record in baseline['results'].get(shape, [])}
+        for record in records:
+            base = old.get(record['bench'])
+            if base is None:
+                continue
+            ratio = record['entries_per_sec'] / base['entries_per_sec']
+            if ratio < 1 - tolerance:
+                regressions.append(
+                    f"{shape}/{record['bench']}: "
+                    f"{record['entries_per_sec']:,.0f} entries/s, "
+                    f"{ratio:.0%} of the baseline "
+                    f"{base['entries_per_sec']:,.0f}")
+    return regressions
+
+def argparser():
+    parser = argparse.ArgumentParser(
+        description='Benchmark modtime_pecker on reproducible synthetic trees')
+    parser.add_argument('--shapes', type=str, nargs='+', default=list(SHAPES),
+                        choices=list(SHAPES),
+                        help='Tree shapes to benchmark (default: all)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Size multiplier of the generated trees '
+                             '(default: 1; 40 gives about one million files '
+                             'for the tiny shape)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed of the generated trees (default: 0)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per benchmark, the fastest one is reported '
+                             '(default: 3)')
+    parser.add_argument('-w', '--workers', type=int, default=4,
+                        help='Workers of the parallel benchmarks (default: 4)')
+    parser.add_argument('--tmp-dir', type=str, default=None,
+                        help='Folder in which the trees are generated '
+                             '(default: the system temp folder)')
+    parser.add_argument('--json', type=str, default=None,
+                        help='Also write the results to this json file')
+    parser.add_argument('--save-baseline', type=str, default=None,
+                        metavar='FILE',
+                        help='Save the results as the baseline')
+    parser.add_argument('--compare', type=str, default=None, metavar='FILE',
+                        help='Compare against a saved baseline and exit with '
+                             'status 1 on a regression')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative drop of entries/s before a '
+                             'benchmark counts as a regression '
+                             '(default: 0.25)')
+    return parser.parse_args()
+
+def main():
+    args = argparser()
+    report = run(args.shapes, args.scale, args.seed, args.repeat,
+                 args.workers, args.tmp_dir)
+    print(format_report(report))
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=4)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions:", *regressions, sep=os.linesep)
+            sys.exit(1)
+        print("No regression against the baseline.")
+
+
+if __name__ == '__main__':
+    main()
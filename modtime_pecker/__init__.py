@@ -0,0 +1,13 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""查看指定文件夹下所有直接文件夹和文件的最后修改时间，
+递归查找所有文件夹的子文件夹中的所有内容，以找出直接子文件夹的最新修改日期
+
+core为检查引擎，render负责输出结果，cli为命令行入口，gui为图形界面；
+filter、stats、report、snapshot、index、watch和agent分别提供排除规则、扫描统计、二进制报告、快照、
+持久化索引、监视和多主机检查；
+导入本包时不会导入tkinter、pyperclip、tqdm、NumPy、asyncio和concurrent.futures，它们只在使用时才导入"""
+
+from .core import *
+from .render import *
+from .cli import *
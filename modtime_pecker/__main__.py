@@ -0,0 +1,8 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""python -m modtime_pecker"""
+
+from .cli import main
+
+if __name__ == '__main__':
+    main()
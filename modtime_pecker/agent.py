@@ -0,0 +1,256 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""在多台主机上检查的代理和协调器
+
+代理在本机提供一个小型的HTTP/JSON接口，按请求检查目标路径并返回每个目标路径一条的NDJSON记录；
+协调器同时向多个代理发出同一请求，每个代理保持一个长连接供后续请求复用，超时或出错的代理只记录为失败，
+不影响其他代理的结果，最后将各主机的结果按修改时间归并为一个排名"""
+
+import heapq
+import http.client
+import json
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+DEFAULT_PORT = 8765
+API_VERSION = 1
+
+
+class AgentError(Exception):
+    """代理返回了错误，或响应无法解析"""
+
+
+def parse_address(text, default_host='127.0.0.1'):
+    """解析'HOST:PORT'、'PORT'、'HOST'或'http://HOST:PORT'形式的地址
+    :return (host, port): (str, int)
+    """
+    if '//' in text:
+        parts = urlsplit(text)
+        return parts.hostname or default_host, parts.port or DEFAULT_PORT
+    host, sep, port = text.rpartition(':')
+    if not sep:
+        if text.isdigit():
+            return default_host, int(text)
+        return text, DEFAULT_PORT
+    return host.strip('[]') or default_host, int(port)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1使协调器可以在同一连接上发出后续请求
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._reply(200, {'host': self.server.host_name,
+                              'version': API_VERSION})
+        else:
+            self._reply(404, {'error': f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            # 无法确定请求体的长度，回复后关闭连接
+            self.close_connection = True
+            self._reply(400, {'error': "Invalid Content-Length"})
+            return
+        # 无论是否处理都读完请求体，连接才能继续复用
+        body = self.rfile.read(length)
+        if self.path != '/check':
+            self._reply(404, {'error': f"Unknown endpoint: {self.path}"})
+            return
+        try:
+            request = json.loads(body or b'{}')
+            if not isinstance(request, dict):
+                raise ValueError("The request must be a JSON object")
+            results = self.server.check(request)
+        except PermissionError as e:
+            self._reply(403, {'error': str(e)})
+        except (ValueError, TypeError, FileNotFoundError) as e:
+            self._reply(400, {'error': str(e)})
+        except OSError as e:
+            self._reply(500, {'error': str(e)})
+        else:
+            self._reply(200, {'host': self.server.host_name,
+                              'results': results})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class AgentServer(ThreadingHTTPServer):
+    """代理的HTTP服务，每个连接一个线程
+
+    GET /health 返回主机名和接口版本；
+    POST /check 的请求体为JSON对象，交给check处理，返回{"host": ..., "results": check的返回值}；
+    check抛出PermissionError时返回403，ValueError、TypeError和FileNotFoundError时返回400
+    """
+    daemon_threads = True
+
+    def __init__(self, check, address=('127.0.0.1', DEFAULT_PORT),
+                 host_name=None, verbose=False):
+        """
+        :param check: Callable[[dict], list], 处理检查请求，返回可json序列化的结果
+        :param address: (str, int), 监听的地址，端口为0时由系统分配
+        :param host_name: str, 响应中的主机名，默认为本机的主机名
+        :param verbose: bool, 是否在标准错误中记录每个请求
+        """
+        super().__init__(address, _Handler)
+        self.check = check
+        self.host_name = host_name or socket.gethostname()
+        self.verbose = verbose
+
+    @property
+    def address(self):
+        """实际监听的'HOST:PORT'，可直接交给协调器"""
+        host, port = self.server_address[:2]
+        return f"{host}:{port}"
+
+
+class AgentClient:
+    """与一个代理之间的长连接，连接在请求之间保持并复用；同一时刻只能由一个线程使用"""
+
+    def __init__(self, agent, timeout=30):
+        """
+        :param agent: str, 代理的地址，见parse_address
+        :param timeout: float, 连接和等待响应的超时（秒）
+        """
+        self.agent = agent
+        self.host, self.port = parse_address(agent, 'localhost')
+        self.timeout = timeout
+        self.conn = None
+        # 打开过的连接数，连接被复用时不增加
+        self.connections = 0
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def request(self, method, path, payload=None):
+        """发出请求并返回解析后的响应，代理返回错误时抛出AgentError"""
+        body = None if payload is None else json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        while True:
+            reused = self.conn is not None
+            if not reused:
+                self.conn = http.client.HTTPConnection(self.host, self.port,
+                                                       timeout=self.timeout)
+                self.connections += 1
+            try:
+                self.conn.request(method, path, body, headers)
+                response = self.conn.getresponse()
+                data = response.read()
+            except (ConnectionResetError, BrokenPipeError):
+                self.close()
+                if reused:
+                    # 空闲的长连接已被代理关闭，重新连接一次
+                    continue
+                raise
+            except BaseException:
+                # 超时等情况下连接状态未知，不再复用
+                self.close()
+                raise
+            break
+        if response.will_close:
+            self.close()
+        try:
+            reply = json.loads(data)
+        except ValueError:
+            raise AgentError(f"Invalid response (HTTP {response.status})")
+        if not isinstance(reply, dict):
+            # 如代理前的反向代理返回的错误
+            raise AgentError(f"Invalid response (HTTP {response.status})")
+        if response.status != 200:
+            raise AgentError(reply.get('error')
+                             or f"HTTP {response.status}")
+        return reply
+
+    def health(self):
+        return self.request('GET', '/health')
+
+    def check(self, request):
+        return self.request('POST', '/check', request)
+
+
+def describe_error(error, timeout=None):
+    """将请求代理时的异常转换为简短的说明"""
+    if isinstance(error, TimeoutError):
+        return "timed out" if timeout is None else f"timed out after {timeout}s"
+    if isinstance(error, ConnectionRefusedError):
+        return "connection refused"
+    return str(error) or type(error).__name__
+
+
+class Coordinator:
+    """同时向多个代理发出同一请求，每个代理的连接在多次请求之间复用"""
+
+    def __init__(self, agents, timeout=30, workers=None):
+        """
+        :param agents: Iterable[str], 代理的地址，见parse_address
+        :param timeout: float, 每个代理连接和等待响应的超时（秒）
+        :param workers: int, 同时请求的代理数上限，默认为代理数（不超过32）
+        """
+        self.timeout = timeout
+        self.clients = {agent: AgentClient(agent, timeout) for agent in agents}
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or max(1, min(32, len(self.clients))))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+        for client in self.clients.values():
+            client.close()
+
+    def check(self, request):
+        """向所有代理发出检查请求，不能在多个线程中同时调用
+        :param request: dict, 检查请求，见AgentServer
+        :return (responses, failures): (dict[str, dict], dict[str, str]),
+            成功的代理的响应，以及失败的代理的错误说明，均以代理的地址为键，顺序与agents一致
+        """
+        futures = {agent: self.executor.submit(client.check, request)
+                   for agent, client in self.clients.items()}
+        responses, failures = {}, {}
+        for agent, future in futures.items():
+            try:
+                responses[agent] = future.result()
+            except (OSError, AgentError, http.client.HTTPException) as e:
+                failures[agent] = describe_error(e, self.timeout)
+        return responses, failures
+
+
+def rank(responses, limit=None, oldest=False):
+    """将各代理返回的直接子条目按修改时间归并为一个排名；各目标路径的条目已由代理排好序，
+    因此只需一次多路归并，提供limit时只取前limit个
+    :param responses: dict[str, dict], Coordinator.check返回的响应
+    :param limit: int, 最多产出的条目数
+    :param oldest: bool, 条目是否按修改时间从旧到新排序，需与请求一致
+    :return: Iterator[(str, str, dict)], (代理的地址, 目标路径, NDJSON条目)
+    """
+    streams = [[(agent, record['path'], entry) for entry in record['entries']]
+               for agent, response in responses.items()
+               for record in response['results']]
+    merged = heapq.merge(*streams, key=lambda item: item[2]['mtime_ns'],
+                         reverse=not oldest)
+    for count, item in enumerate(merged):
+        if limit is not None and count >= limit:
+            return
+        yield item
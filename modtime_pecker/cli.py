@@ -0,0 +1,645 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""命令行入口
+
+代理、索引和监视所需的模块只在使用对应的参数时才导入，图形界面只在不带参数运行或使用-g时才导入，
+因此没有Tk的环境中也可以使用全部命令行功能"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+from .filter import read_patterns
+from .snapshot import Snapshot, diff_snapshots
+from .stats import ScanStats
+
+from .core import (DEFAULT_ENGINE, ENGINES, PARALLEL_ENGINES, ScanProgress,
+                   _check_paths, multi_check, unique_roots, watch_results)
+from .render import (diff_records, ndjson_records, ranking_records,
+                     render_diff, render_ranking, render_text, save2binary,
+                     save2clipboard, save2json, save2txt, stream_check)
+
+
+def parse_device_limit(text):
+    """解析命令行中的'PATH=N'形式的设备并发上限"""
+    path, sep, limit = text.rpartition('=')
+    if not sep or not path:
+        raise argparse.ArgumentTypeError(f"expected PATH=N, got {text!r}")
+    try:
+        return path, int(limit)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected PATH=N, got {text!r}")
+
+def parse_since(text):
+    """解析命令行中的阈值时间，支持POSIX时间戳（秒）和'%Y-%m-%d %H:%M:%S'等ISO格式的本地时间"""
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text)
+
+def parse_serve_address(text):
+    """解析--serve的地址，见agent.parse_address"""
+    from .agent import parse_address
+    return parse_address(text)
+
+# 请求中可以覆盖的参数 -> 其值的检查，不合法时由代理返回400
+_REQUEST_FIELDS = {
+    'since': lambda value: isinstance(value, (int, float))
+    and not isinstance(value, bool),
+    'depth': lambda value: _is_count(value),
+    'limit': lambda value: _is_count(value),
+    'offset': lambda value: _is_count(value),
+    'oldest': lambda value: isinstance(value, bool),
+}
+
+def _is_count(value):
+    return isinstance(value, int) and not isinstance(value, bool) \
+        and value >= 0
+
+def _inside(path, roots):
+    real = os.path.realpath(path)
+    return any(os.path.commonpath([real, root]) == root for root in roots)
+
+def agent_handler(path_list, index=None, **options):
+    """创建代理处理检查请求的函数，供agent.AgentServer使用
+
+    请求中的"paths"必须是path_list中的目标路径或其下的文件夹，省略时检查path_list；
+    "since"（POSIX秒数）、"depth"、"limit"、"offset"和"oldest"覆盖options中的同名参数；
+    引擎、线程数、排除规则、遍历策略和按设备调度由代理自身的options决定
+    :param path_list: Iterable[str], 代理允许检查的目标路径
+    :param index: MtimeIndex, 代理持有的持久化索引，在请求之间复用，使用时逐个处理请求
+    :param options: multi_check的其他参数
+    :return check: Callable[[dict], list[dict]], 返回每个目标路径一条的NDJSON记录
+    """
+    path_list = sorted(path_list)
+    _check_paths(path_list)
+    roots = [os.path.realpath(path) for path in path_list]
+    # 索引只支持串行遍历，同一时刻只处理一个请求
+    lock = threading.Lock() if index is not None else nullcontext()
+
+    def check(request):
+        paths = request.get('paths') or path_list
+        if isinstance(paths, str) or not all(isinstance(path, str)
+                                             for path in paths):
+            raise TypeError('"paths" must be a list of strings')
+        for path in paths:
+            if not _inside(path, roots):
+                raise PermissionError(f"{path} is outside the served folders")
+        kwargs = dict(options)
+        for key, valid in _REQUEST_FIELDS.items():
+            if request.get(key) is not None:
+                if not valid(request[key]):
+                    raise TypeError(f'Invalid "{key}": {request[key]!r}')
+                kwargs[key] = request[key]
+        with lock:
+            results = multi_check(paths, index=index, progress=False,
+                                  **kwargs)
+        return [record for result in results
+                for record in ndjson_records(result)]
+
+    return check
+
+def argparser():
+    parser = argparse.ArgumentParser(
+        description='Check the latest modification time of all '
+                    'folders and files in the specified folder')
+    # 目标路径，可以提供多条路径，如果没有指定则默认为None
+    parser.add_argument('-p', '--path', type=str,
+                        default=None, nargs='+',
+                        help='Path(s) of the folder(s) to be checked')
+    # 从指定的txt文件中读取路径，可以提供多条txt文件路径，如果没有指定则默认为None
+    parser.add_argument('-i', '--import_txt', type=str,
+                        default=None, nargs='+',
+                        help='Read path from the specified txt file')
+    # 直接查看当前脚本所在文件夹
+    parser.add_argument('-c', '--current', action='store_true',
+                        help='Check the modification time of current folder')
+    # GUI界面
+    parser.add_argument('-g', '--gui', action='store_true',
+                        help='Use GUI interface')
+    # 是否要复制结果到剪贴板
+    parser.add_argument('-sc', '--save_clipboard', action='store_true',
+                        help='Save(copy) the result to the clipboard')
+    # 是否要将结果保存为txt文件
+    parser.add_argument('-st', '--save_txt', action='store_true',
+                        help='Save the result as a txt file')
+    # 是否要将结果保存为json文件
+    parser.add_argument('-sj', '--save_json', action='store_true',
+                        help='Save the result as a json file')
+    # 是否要将结果保存为列式二进制报告
+    parser.add_argument('-sb', '--save_binary', action='store_true',
+                        help='Save the result as a columnar binary report '
+                             '(.mtr) that can be memory-mapped')
+    # 遍历子文件夹所用的引擎
+    parser.add_argument('--engine', type=str, default=DEFAULT_ENGINE,
+                        choices=sorted([*ENGINES, *PARALLEL_ENGINES]),
+                        help='Traversal engine used for the subfolders '
+                             f'(default: {DEFAULT_ENGINE})')
+    # 并行遍历子文件夹的线程数
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='Number of threads (processes for the process '
+                             'engine) used to scan the subfolders in parallel '
+                             '(default: 1, or the CPU count for the process '
+                             'engine)')
+    # 持久化索引，用于增量重新检查
+    parser.add_argument('--index', type=str, default=None,
+                        help='Path of the SQLite index used to rescan '
+                             'incrementally (created if missing)')
+    parser.add_argument('--rebuild-index', action='store_true',
+                        help='Discard the existing index and rebuild it')
+    # 持续监视模式
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep watching the folders (inotify on Linux) '
+                             'and print the result whenever the order changes')
+    parser.add_argument('--poll-interval', type=float, default=300,
+                        help='Seconds between full rescans of the parts that '
+                             'cannot be watched with inotify (default: 300)')
+    # 流式输出
+    parser.add_argument('--format', type=str, default='text',
+                        choices=['text', 'ndjson', 'json', 'binary'],
+                        help='Output format; ndjson streams one JSON record '
+                             'per folder as soon as it is checked, json and '
+                             'binary (a columnar .mtr report, needs --out) '
+                             'stream the -sj/-sb file contents '
+                             '(default: text)')
+    parser.add_argument('--out', type=str, default=None,
+                        help="Stream each folder's result to this file as "
+                             "soon as it is checked ('-' for stdout, the "
+                             "default for ndjson)")
+    parser.add_argument('--per-child', action='store_true',
+                        help='With --format ndjson, write one record per '
+                             'direct child instead of one per folder')
+    # 阈值查询
+    parser.add_argument('--since', type=parse_since, default=None,
+                        metavar='TIMESTAMP',
+                        help='Only report the direct children changed after '
+                             'TIMESTAMP (POSIX seconds or local time such as '
+                             '"2024-01-01 08:00:00"); a subfolder stops being '
+                             'walked as soon as a newer entry is found')
+    # 排除规则
+    parser.add_argument('--exclude', type=str, default=[], nargs='+',
+                        metavar='PATTERN',
+                        help='gitignore-style pattern(s) of entries to skip; '
+                             'excluded folders are never listed or stat\'ed '
+                             '(e.g. .git node_modules/ "*.pyc")')
+    parser.add_argument('--exclude-from', type=str, default=[], nargs='+',
+                        metavar='FILE',
+                        help='Read exclusion patterns from gitignore-style '
+                             'file(s)')
+    parser.add_argument('--gitignore', action='store_true',
+                        help='Also honour the .gitignore files found while '
+                             'walking')
+    # 符号链接和重复出现的物理文件夹
+    parser.add_argument('--follow-symlinks', default=False,
+                        action=argparse.BooleanOptionalAction,
+                        help='Walk into symlinked folders, skipping any '
+                             'physical folder (st_dev, st_ino) already walked '
+                             'so that symlink loops terminate '
+                             '(default: --no-follow-symlinks)')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Walk each physical folder only once and reuse '
+                             'its latest time wherever it reappears '
+                             '(symlinks, bind mounts)')
+    # 文件系统边界和按设备调度
+    parser.add_argument('--one-file-system', action='store_true',
+                        help='Do not walk into folders on another filesystem '
+                             '(mount points are reported but not walked)')
+    parser.add_argument('--per-device', type=int, default=None, metavar='N',
+                        help='Walk at most N subfolders at a time on each '
+                             'device (st_dev), so that many workers do not '
+                             'flood a single disk or network share')
+    parser.add_argument('--device-limit', type=parse_device_limit,
+                        default=[], nargs='+', metavar='PATH=N',
+                        help='Per-device limit for the device holding PATH, '
+                             'overriding --per-device (e.g. /mnt/nfs=1)')
+    # 多层报告
+    parser.add_argument('--depth', type=int, default=1, metavar='N',
+                        help='Report the latest modification time of every '
+                             'folder down to N levels, computed in the same '
+                             'single walk (default: 1, the direct children)')
+    # 快照和差异
+    parser.add_argument('--snapshot', type=str, default=None, metavar='FILE',
+                        help='Also save the result as a compact binary '
+                             'snapshot for later --diff')
+    parser.add_argument('--diff', type=str, default=None, nargs='+',
+                        metavar='SNAPSHOT',
+                        help='Report the children changed, added and removed '
+                             'since SNAPSHOT, against a second snapshot or '
+                             'else a fresh check of the same folders and '
+                             'depth (saved with --snapshot if given)')
+    # 只输出部分条目
+    parser.add_argument('--top', type=int, default=None, metavar='K',
+                        help='Only report the K newest (or, with --oldest, '
+                             'oldest) entries of each folder; same as '
+                             '--limit K --offset 0')
+    parser.add_argument('--limit', type=int, default=None,
+                        help='Report at most LIMIT entries of each folder, '
+                             'selected with a bounded heap')
+    parser.add_argument('--offset', type=int, default=0,
+                        help='Skip the first OFFSET entries of each folder '
+                             'after ordering (default: 0)')
+    parser.add_argument('--oldest', action='store_true',
+                        help='Order the entries from the oldest to the newest')
+    # 代理和协调器
+    parser.add_argument('--serve', type=parse_serve_address, default=None,
+                        metavar='[HOST:]PORT',
+                        help='Serve checks of the given folders over a local '
+                             'HTTP/JSON API (POST /check) instead of checking '
+                             'once; --index is kept open and reused between '
+                             'requests (port 8765 by default, '
+                             'host 127.0.0.1)')
+    parser.add_argument('--coordinate', type=str, default=None, nargs='+',
+                        metavar='AGENT',
+                        help='Send the check to the agents (HOST:PORT) '
+                             'started with --serve concurrently and print '
+                             'one ranked report; agents that fail or time '
+                             'out are listed instead')
+    parser.add_argument('--timeout', type=float, default=30,
+                        help='Seconds to wait for each agent (default: 30)')
+    # 时间预算和进度
+    parser.add_argument('--time-budget', type=float, default=None,
+                        metavar='SECONDS',
+                        help='Stop scanning after SECONDS and report what was '
+                             'found so far, marking unfinished subfolders as '
+                             'incomplete')
+    parser.add_argument('--root-time-budget', type=float, default=None,
+                        metavar='SECONDS',
+                        help='Time budget for each target path, counted from '
+                             'when its scan starts')
+    parser.add_argument('--eta-file', type=str, default=None, metavar='FILE',
+                        help='Remember the number of entries scanned in FILE '
+                             'and use it to estimate the remaining time of '
+                             'the next run over the same paths')
+    # 计数和计时
+    parser.add_argument('--stats', action='store_true',
+                        help='Print scandir/stat counts and the time spent in '
+                             'each phase and subfolder to stderr')
+    args = parser.parse_args()
+    args.stream = args.out is not None or args.format != 'text'
+    if args.stream and (args.save_clipboard or args.save_txt
+                        or args.save_json or args.save_binary):
+        parser.error('streaming output (--out / --format) cannot be '
+                     'combined with -sc/-st/-sj/-sb')
+    if args.format == 'binary' and args.out is None:
+        parser.error('--format binary needs --out (use - for stdout)')
+    for budget in (args.time_budget, args.root_time_budget):
+        if budget is not None and budget <= 0:
+            parser.error('--time-budget/--root-time-budget must be positive')
+    for txt in args.exclude_from:
+        args.exclude.extend(read_patterns(txt))
+    if args.watch and (args.exclude or args.gitignore):
+        parser.error('--exclude/--exclude-from/--gitignore cannot be combined '
+                     'with --watch')
+    if args.watch and (args.one_file_system or args.per_device
+                       or args.device_limit or args.depth != 1):
+        parser.error('--one-file-system/--per-device/--device-limit/--depth '
+                     'cannot be combined with --watch')
+    args.device_limit = dict(args.device_limit)
+    if args.top is not None:
+        if args.limit is not None or args.offset:
+            parser.error('--top cannot be combined with --limit/--offset')
+        args.limit = args.top
+    if (args.limit is not None and args.limit < 0) or args.offset < 0:
+        parser.error('--top/--limit/--offset must not be negative')
+    if args.watch and (args.limit is not None or args.offset or args.oldest):
+        parser.error('--top/--limit/--offset/--oldest cannot be combined '
+                     'with --watch')
+    if args.watch and (
+            args.since is not None or args.engine != DEFAULT_ENGINE
+            or args.workers is not None or args.follow_symlinks
+            or args.dedup or args.index or args.stats or args.stream
+            or args.save_clipboard or args.save_txt or args.save_json
+            or args.save_binary or args.time_budget is not None
+            or args.root_time_budget is not None or args.eta_file):
+        # 监视模式由Watcher自行遍历，并总是以文本格式输出到标准输出
+        parser.error('--watch prints text to stdout and cannot be combined '
+                     'with --since, --engine, --workers, --follow-symlinks, '
+                     '--dedup, --index, --stats, --format, --out, '
+                     '--time-budget, --root-time-budget, --eta-file or '
+                     '-sc/-st/-sj/-sb')
+    if args.diff is not None and len(args.diff) > 2:
+        parser.error('--diff takes one or two snapshots')
+    if (args.snapshot or args.diff) and (
+            args.watch or args.since is not None or args.limit is not None
+            or args.offset):
+        # 快照需要完整的条目列表，才能在比较时区分未变化和已删除的条目
+        parser.error('--snapshot/--diff cannot be combined with --watch, '
+                     '--since or --top/--limit/--offset')
+    if args.diff and (args.out is not None or args.save_clipboard
+                      or args.save_txt or args.save_json):
+        parser.error('--diff prints to stdout and cannot be combined with '
+                     '--out or -sc/-st/-sj')
+    if args.snapshot and args.stream and not args.diff:
+        parser.error('--snapshot cannot be combined with streaming output '
+                     '(--out / --format ndjson)')
+    if args.serve and args.coordinate:
+        parser.error('--serve cannot be combined with --coordinate')
+    if (args.serve or args.coordinate) and (
+            args.watch or args.diff or args.snapshot or args.out is not None
+            or args.save_clipboard or args.save_txt or args.save_json
+            or args.save_binary):
+        parser.error('--serve/--coordinate cannot be combined with --watch, '
+                     '--diff, --snapshot, --out or -sc/-st/-sj/-sb')
+    if args.serve and args.stream:
+        parser.error('--serve cannot be combined with --format')
+    if args.coordinate and (args.format not in ('text', 'ndjson')
+                            or args.index or args.offset or args.stats):
+        # 各代理的分页无法合并为全局的分页，索引和统计由各代理自身决定
+        parser.error('--coordinate only supports --format text/ndjson and '
+                     'cannot be combined with --index, --offset or --stats')
+    return args
+
+def run_diff(args, stats=None):
+    """比较快照与另一个快照，或与按快照中的目标路径和层数重新检查的结果；提供--snapshot时保存较新的快照"""
+    old = Snapshot.load(args.diff[0])
+    if len(args.diff) == 2:
+        new = Snapshot.load(args.diff[1])
+    else:
+        start = time.time_ns()
+        results = multi_check(old.roots, engine=args.engine,
+                              workers=args.workers, exclude=args.exclude,
+                              gitignore=args.gitignore, stats=stats,
+                              follow_symlinks=args.follow_symlinks,
+                              dedup=args.dedup,
+                              one_file_system=args.one_file_system,
+                              per_device=args.per_device,
+                              device_limits=args.device_limit,
+                              depth=old.depth)
+        new = Snapshot.from_results(results, start)
+    if args.snapshot:
+        new.save(args.snapshot)
+    changes = diff_snapshots(old, new)
+    if args.format == 'ndjson':
+        for record in diff_records(changes):
+            print(json.dumps(record, ensure_ascii=False))
+    else:
+        print(render_diff(changes, old.created_ns))
+    if stats is not None:
+        print(stats.summary(), file=sys.stderr)
+
+def run_serve(args, path_list, index=None):
+    """作为代理持续提供检查，直到被中断"""
+    check = agent_handler(path_list, index, engine=args.engine,
+                          workers=args.workers, since=args.since,
+                          exclude=args.exclude, gitignore=args.gitignore,
+                          follow_symlinks=args.follow_symlinks,
+                          dedup=args.dedup,
+                          one_file_system=args.one_file_system,
+                          per_device=args.per_device,
+                          device_limits=args.device_limit, depth=args.depth,
+                          limit=args.limit, offset=args.offset,
+                          oldest=args.oldest, timeout=args.time_budget,
+                          root_timeout=args.root_time_budget)
+    from .agent import AgentServer
+    server = AgentServer(check, args.serve, verbose=True)
+    print(f"Serving {', '.join(sorted(path_list))} on {server.address}",
+          file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def run_coordinate(args, paths):
+    """向各代理发出同一检查请求，输出合并后的排名
+    :param paths: list[str], 要检查的代理上的路径，为空时各代理检查其自身的目标路径
+    """
+    from .agent import Coordinator, rank
+    since = args.since
+    if isinstance(since, datetime):
+        since = since.timestamp()
+    request = {"paths": paths, "since": since, "depth": args.depth,
+               "limit": args.limit, "oldest": args.oldest}
+    with Coordinator(args.coordinate, args.timeout) as coordinator:
+        responses, failures = coordinator.check(request)
+    ranking = rank(responses, args.limit, args.oldest)
+    if args.format == 'ndjson':
+        for record in ranking_records(ranking, failures):
+            print(json.dumps(record, ensure_ascii=False))
+    else:
+        print(f"Ranked across {len(responses)} of "
+              f"{len(args.coordinate)} agents:{os.linesep}")
+        print(render_ranking(ranking, failures))
+
+def load_expected_entries(eta_file, path_list):
+    """读取--eta-file中上一次检查同一组目标路径时列出的条目数，没有记录或目标路径不同时返回None"""
+    try:
+        with open(eta_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('paths') != sorted(path_list):
+        return None
+    return data.get('entries')
+
+def save_expected_entries(eta_file, path_list, entries):
+    with open(eta_file, 'w', encoding='utf-8') as f:
+        json.dump({"paths": sorted(path_list), "entries": entries}, f)
+
+def run_watch(path_list, poll_interval):
+    """持续监视，排序变化时输出结果；在支持的系统上收到SIGUSR1时按需输出当前结果"""
+    from .watch import Watcher
+    path_list = sorted(path_list)
+    _check_paths(path_list)
+    watcher = Watcher(path_list, poll_interval=poll_interval)
+
+    def report(*_):
+        print(os.linesep, "-" * 10, datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+              "-" * 10, os.linesep)
+        print(render_text(watch_results(watcher)), flush=True)
+
+    report()
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, report)
+    try:
+        watcher.run(on_change=report)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+def cli():
+    args = argparser()
+    if args.gui:
+        from .gui import gui
+        gui()
+        return
+
+    if args.coordinate:
+        # 协调器只转发明确指定的路径，否则由各代理检查其自身的目标路径
+        paths = list(args.path or [])
+        for txt in args.import_txt or []:
+            with open(txt, 'r') as f:
+                paths.extend(f.read().splitlines())
+        run_coordinate(args, paths)
+        return
+
+    # 获取所有目标路径
+    script_path = os.path.dirname(os.path.realpath(sys.executable))
+    if args.current or (not args.path and not args.import_txt):
+        # 如果提供了-c参数，或者既没有提供路径也没有提供txt文件，
+        # 则默认目标路径为脚本所在文件夹
+        path_list = [script_path]
+    else:
+        # 如果提供了路径，则将路径添加到列表中
+        path_list = list(args.path) if args.path else []
+        # 如果提供了txt文件，则读取文件中的路径
+        if args.import_txt:
+            import_txt_list = list(args.import_txt)
+            # 检查提供的txt文件是否存在
+            for txt in import_txt_list:
+                if not os.path.exists(txt) or not os.path.isfile(txt):
+                    raise FileNotFoundError(f"{txt} is not a valid txt file")
+            # 读取txt文件中的路径
+            for txt in import_txt_list:
+                with open(txt, 'r') as f:
+                    path_list.extend(f.read().splitlines())
+        # 按物理文件夹去除重复，保持输入的顺序
+        path_list = unique_roots(path_list)
+
+    if args.watch:
+        run_watch(path_list, args.poll_interval)
+        return
+
+    # 执行查看任务并记录结果
+    stats = ScanStats() if args.stats else None
+    if args.diff:
+        run_diff(args, stats)
+        return
+    index = None
+    if args.index:
+        from .index import MtimeIndex
+        index = MtimeIndex(args.index, rebuild=args.rebuild_index)
+    if args.serve:
+        try:
+            run_serve(args, path_list, index)
+        finally:
+            if index is not None:
+                index.close()
+        return
+    started_ns = time.time_ns()
+    progress = ScanProgress()
+    if args.eta_file:
+        progress.expected_entries = load_expected_entries(args.eta_file,
+                                                          path_list)
+    try:
+        if args.stream:
+            # 流式输出时逐个写出结果，不再累积；path_list已读取完毕并去除重复，
+            # 因此同样与外层共用嵌套的目标路径的遍历
+            binary = args.format == 'binary'
+            if args.out in (None, '-'):
+                stream_check(path_list,
+                             sys.stdout.buffer if binary else sys.stdout,
+                             args.format,
+                             args.per_child, args.engine, args.workers,
+                             index=index, since=args.since,
+                             exclude=args.exclude, gitignore=args.gitignore,
+                             stats=stats,
+                             follow_symlinks=args.follow_symlinks,
+                             dedup=args.dedup,
+                             one_file_system=args.one_file_system,
+                             per_device=args.per_device,
+                             device_limits=args.device_limit,
+                             depth=args.depth, limit=args.limit,
+                             offset=args.offset, oldest=args.oldest,
+                             share_nested=True, timeout=args.time_budget,
+                             root_timeout=args.root_time_budget,
+                             progress=progress)
+            else:
+                with open(args.out, 'wb' if binary else 'w',
+                          encoding=None if binary else 'utf-8') as f:
+                    stream_check(path_list, f, args.format, args.per_child,
+                                 args.engine, args.workers, index=index,
+                                 since=args.since, exclude=args.exclude,
+                                 gitignore=args.gitignore, stats=stats,
+                                 follow_symlinks=args.follow_symlinks,
+                                 dedup=args.dedup,
+                                 one_file_system=args.one_file_system,
+                                 per_device=args.per_device,
+                                 device_limits=args.device_limit,
+                                 depth=args.depth, limit=args.limit,
+                                 offset=args.offset, oldest=args.oldest,
+                                 share_nested=True, timeout=args.time_budget,
+                                 root_timeout=args.root_time_budget,
+                                 progress=progress)
+        else:
+            results = multi_check(path_list, engine=args.engine,
+                                  workers=args.workers, index=index,
+                                  since=args.since, exclude=args.exclude,
+                                  gitignore=args.gitignore, stats=stats,
+                                  follow_symlinks=args.follow_symlinks,
+                                  dedup=args.dedup,
+                                  one_file_system=args.one_file_system,
+                                  per_device=args.per_device,
+                                  device_limits=args.device_limit,
+                                  depth=args.depth, limit=args.limit,
+                                  offset=args.offset, oldest=args.oldest,
+                                  progress=progress,
+                                  timeout=args.time_budget,
+                                  root_timeout=args.root_time_budget)
+    finally:
+        if index is not None:
+            index.close()
+    if args.eta_file and progress.entries:
+        entries = progress.entries
+        if args.time_budget is not None or args.root_time_budget is not None:
+            # 超时的检查只列出了部分条目，不能减少记录的条目数
+            entries = max(entries, progress.expected_entries or 0)
+        save_expected_entries(args.eta_file, path_list, entries)
+    if index is not None:
+        print(f"Index: {index.scandir_saved} scandir calls saved, "
+              f"{index.scandir_calls} performed.",
+              file=sys.stderr if args.stream else sys.stdout)
+    if args.stream:
+        if stats is not None:
+            print(stats.summary(), file=sys.stderr)
+        return
+    incomplete = sum(not result.complete for result in results)
+    if incomplete:
+        print(f"Warning: {incomplete} of {len(results)} target paths were "
+              f"not fully scanned; see the errors and incomplete subfolders "
+              f"listed with them.", file=sys.stderr)
+    print(os.linesep, "-" * 10, "Result", "-" * 10, os.linesep)
+    text = render_text(results, stats=stats)
+    if stats is not None:
+        with stats.phase('write'):
+            print(text)
+        stats.add_output(text)
+        print(stats.summary(), file=sys.stderr)
+    else:
+        print(text)
+
+    # 保存结果
+    if args.snapshot:
+        Snapshot.from_results(results, started_ns).save(args.snapshot)
+    if args.save_clipboard:
+        save2clipboard(results)
+    if args.save_txt:
+        save2txt(results)
+    if args.save_json:
+        save2json(results)
+    if args.save_binary:
+        save2binary(results)
+
+
+def main():
+    """命令行工具的入口，不带参数运行时打开图形界面"""
+    if len(sys.argv) == 1:
+        from .gui import gui
+        gui()
+    else:
+        cli()
+
+
+def main_nogui():
+    """不含图形界面的入口，不带参数运行时检查当前文件夹并保存到txt文件"""
+    if len(sys.argv) == 1:
+        sys.argv.extend(['-c', '-st'])
+    cli()
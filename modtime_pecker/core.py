@@ -0,0 +1,2045 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""检查引擎：遍历目标路径，找出每个直接子条目的子树最新修改时间
+
+只依赖标准库，NumPy只在使用numpy引擎时才导入，tqdm只在显示进度条时才导入；
+导入asyncio和concurrent.futures占导入本包的大部分耗时，它们也只在检查时才导入"""
+
+import heapq
+import itertools
+import os
+import stat
+import sys
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime
+
+from .filter import ExcludeMatcher, Pruner, is_excluded
+from .stats import Counters
+
+
+def _load_numpy():
+    """导入NumPy，未安装时返回None，此时numpy引擎退回到默认引擎；
+    导入NumPy较慢，因此只在使用numpy引擎时才调用"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class ScanResult:
+    """一个目标文件夹的检查结果，按列存储每个直接子条目的 (mtime_ns, name, is_dir)"""
+    __slots__ = ('path', 'mtimes', 'names', 'is_dirs', 'since_ns',
+                 'pruned_entries', 'pruned_dirs', 'mount_skipped',
+                 'subresults', 'omitted', 'omitted_latest', 'errors',
+                 'incomplete', 'timed_out')
+
+    def __init__(self, path):
+        self.path = path
+        self.mtimes = array('q')
+        self.names = []
+        self.is_dirs = bytearray()
+        # 阈值查询时只保留在该时刻之后有变化的条目，其修改时间为找到的第一个更新的修改时间
+        self.since_ns = None
+        # 使用排除规则时，被排除（未列出也未stat）的条目数和其中的文件夹数
+        self.pruned_entries = None
+        self.pruned_dirs = None
+        # 不跨越文件系统时，在挂载点处跳过（只计入其自身修改时间）的文件夹路径
+        self.mount_skipped = None
+        # 多层报告时，子文件夹名 -> 该子文件夹的结果，未展开时为None
+        self.subresults = None
+        # 只输出部分条目时，未输出的条目数，以及使latest计入未输出条目的修改时间
+        self.omitted = None
+        self.omitted_latest = None
+        # 遍历中无法列出或stat而被跳过的条目 [(路径, 错误说明)]，只记录在目标路径的结果中
+        self.errors = None
+        # 子树中有错误或因超时未遍历完的子文件夹名，其修改时间只是已遍历部分中最新的
+        self.incomplete = None
+        # 是否因超过时间预算而停止了遍历
+        self.timed_out = False
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return zip(self.mtimes, self.names, self.is_dirs)
+
+    def append(self, mtime_ns, name, is_dir):
+        self.mtimes.append(mtime_ns)
+        self.names.append(name)
+        self.is_dirs.append(is_dir)
+
+    def _take(self, order):
+        self.mtimes = array('q', [self.mtimes[i] for i in order])
+        self.names = [self.names[i] for i in order]
+        self.is_dirs = bytearray(self.is_dirs[i] for i in order)
+
+    def sort(self, oldest=False):
+        """按修改时间从新到旧排序，oldest为True时从旧到新"""
+        self._take(sorted(range(len(self)), key=self.mtimes.__getitem__,
+                          reverse=not oldest))
+
+    def select(self, selection):
+        """按selection排序并只保留其中一页，需要的条目数为K时使用堆选择，耗时O(n log K)
+        :param selection: Selection, 排序方向、偏移和条目数
+        """
+        n = len(self)
+        keep = selection.keep
+        if keep is None or keep >= n:
+            self.sort(selection.oldest)
+            order = range(n)
+        else:
+            pick = heapq.nsmallest if selection.oldest else heapq.nlargest
+            self._take(pick(keep, range(n), key=self.mtimes.__getitem__))
+            order = range(len(self))
+        order = order[selection.offset:keep]
+        if len(order) < n:
+            latest = self.latest
+            self._take(order)
+            self.omitted = (self.omitted or 0) + n - len(order)
+            self.omitted_latest = latest
+        elif self.omitted is None:
+            self.omitted = 0
+
+    def keep_changed(self, since_ns):
+        """只保留修改时间晚于since_ns的条目"""
+        self._take([i for i, mtime_ns in enumerate(self.mtimes)
+                    if mtime_ns > since_ns])
+        self.since_ns = since_ns
+
+    @property
+    def complete(self):
+        """检查是否没有遇到错误也没有超时，即所有条目的修改时间都是确切的"""
+        return not (self.errors or self.incomplete or self.timed_out)
+
+    @property
+    def latest(self):
+        """最新的一个条目的修改时间，包括未输出的条目，空文件夹返回None"""
+        latest = max(self.mtimes) if self.mtimes else None
+        if self.omitted_latest is not None \
+                and (latest is None or self.omitted_latest > latest):
+            latest = self.omitted_latest
+        return latest
+
+    def truncated(self, path, depth):
+        """作为另一路径下的子文件夹结果、只保留depth层的副本，与原结果共用条目数组
+        :param path: str, 副本的路径
+        :param depth: int, 保留的层数，为1时不含subresults
+        """
+        copy = ScanResult(path)
+        copy.mtimes, copy.names, copy.is_dirs = \
+            self.mtimes, self.names, self.is_dirs
+        copy.since_ns = self.since_ns
+        copy.omitted = self.omitted
+        copy.omitted_latest = self.omitted_latest
+        copy.incomplete = self.incomplete
+        if depth > 1 and self.subresults is not None:
+            copy.subresults = {
+                name: child.truncated(os.path.join(path, name), depth - 1)
+                for name, child in self.subresults.items()}
+        return copy
+
+
+class Selection:
+    """只输出排序后的一页直接子条目，如最新的K个或按修改时间从旧到新的第offset到offset+limit个"""
+    __slots__ = ('limit', 'offset', 'oldest')
+
+    def __init__(self, limit=None, offset=0, oldest=False):
+        """
+        :param limit: int, 最多输出的条目数，默认为None，即不限制
+        :param offset: int, 跳过排序后的前offset个条目
+        :param oldest: bool, 是否按修改时间从旧到新排序
+        """
+        if limit is not None and limit < 0:
+            raise ValueError(f"limit must not be negative, got {limit}")
+        if offset < 0:
+            raise ValueError(f"offset must not be negative, got {offset}")
+        self.limit = limit
+        self.offset = offset
+        self.oldest = oldest
+
+    @property
+    def keep(self):
+        """排序后需要的前几个条目数，不限制时为None"""
+        return None if self.limit is None else self.offset + self.limit
+
+def _make_selection(limit=None, offset=0, oldest=False):
+    """输出全部条目并从新到旧排序时返回None"""
+    if limit is None and not offset and not oldest:
+        return None
+    return Selection(limit, offset, oldest)
+
+
+class _FileHeap:
+    """列出文件夹时只保留排序后可能输出的K个文件，文件夹的修改时间要遍历后才能确定，不放入堆中"""
+    __slots__ = ('heap', 'keep', 'sign', 'since_ns', 'count', 'dropped',
+                 'latest')
+
+    def __init__(self, selection, since_ns=None):
+        self.heap = []
+        self.keep = selection.keep
+        # 从新到旧时淘汰最旧的，从旧到新时淘汰最新的
+        self.sign = -1 if selection.oldest else 1
+        self.since_ns = since_ns
+        self.count = 0
+        self.dropped = 0
+        self.latest = None
+
+    def push(self, mtime_ns, name):
+        if self.latest is None or mtime_ns > self.latest:
+            self.latest = mtime_ns
+        if self.since_ns is not None and mtime_ns <= self.since_ns:
+            # 阈值查询中不会输出，也不计入未输出的条目数
+            return
+        self.count += 1
+        item = (self.sign * mtime_ns, -self.count, name)
+        if len(self.heap) < self.keep:
+            heapq.heappush(self.heap, item)
+        else:
+            heapq.heappushpop(self.heap, item)
+            self.dropped += 1
+
+    def drain(self, result):
+        """将保留的文件加入结果，并记录被淘汰的文件"""
+        for key, _, name in self.heap:
+            result.append(self.sign * key, name, False)
+        self.heap = []
+        if self.latest is not None:
+            result.omitted = self.dropped
+            result.omitted_latest = self.latest
+
+def format_mtime(mtime_ns):
+    return datetime.fromtimestamp(mtime_ns // 10**9).strftime(
+        '%Y-%m-%d %H:%M:%S')
+
+
+class WalkPolicy:
+    """遍历时对符号链接、重复出现的物理文件夹和挂载点的处理方式"""
+    __slots__ = ('follow_symlinks', 'dedup', 'one_file_system', 'memo',
+                 'device', 'skipped')
+
+    def __init__(self, follow_symlinks=False, dedup=False,
+                 one_file_system=False):
+        """
+        :param follow_symlinks: bool, 是否进入指向文件夹的符号链接，进入时以(st_dev, st_ino)检测成环
+        :param dedup: bool, 是否每个物理文件夹只遍历一次，再次出现时（符号链接、bind mount）复用其结果
+        :param one_file_system: bool, 是否不进入与目标路径不在同一文件系统(st_dev)的文件夹
+        """
+        self.follow_symlinks = follow_symlinks
+        self.dedup = dedup
+        self.one_file_system = one_file_system
+        # (st_dev, st_ino) -> 该物理文件夹子树中最新的修改时间，仅在dedup时使用，同一次检查的所有目标路径共用
+        self.memo = {}
+        # 目标路径所在的文件系统和在挂载点处跳过的文件夹，由for_root为每个目标路径设置
+        self.device = None
+        self.skipped = None
+
+    def for_root(self, root):
+        """为一个目标路径创建副本，共用memo，单独记录跳过的挂载点"""
+        policy = WalkPolicy(self.follow_symlinks, self.dedup,
+                            self.one_file_system)
+        policy.memo = self.memo
+        if self.one_file_system:
+            policy.device = os.stat(root).st_dev
+            policy.skipped = []
+        return policy
+
+def _make_policy(follow_symlinks, dedup, one_file_system=False):
+    """默认的遍历方式（不跟随符号链接、不去重、跨越文件系统）返回None，使用不做额外检查的遍历"""
+    if not follow_symlinks and not dedup and not one_file_system:
+        return None
+    return WalkPolicy(follow_symlinks, dedup, one_file_system)
+
+class ScanProgress:
+    """一次检查中已列出的文件夹数和条目数，由各引擎在每列出一个文件夹后累加；
+    多个线程同时累加时可能少计，只用于显示进度"""
+    __slots__ = ('dirs', 'entries', 'expected_entries', 'started')
+
+    def __init__(self, expected_entries=None):
+        """
+        :param expected_entries: int, 预计的条目数，如上一次检查的条目数，用于估计剩余时间
+        """
+        self.dirs = 0
+        self.entries = 0
+        self.expected_entries = expected_entries
+        self.started = time.perf_counter()
+
+    def add(self, dirs, entries):
+        self.dirs += dirs
+        self.entries += entries
+
+    def rates(self):
+        """
+        :return (dirs_per_sec, entries_per_sec): (float, float), 开始以来每秒列出的文件夹数和条目数
+        """
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return self.dirs / elapsed, self.entries / elapsed
+
+    def eta(self):
+        """按预计的条目数和当前速度估计的剩余秒数，没有预计条目数或已超出时返回None"""
+        rate = self.rates()[1]
+        if not self.expected_entries or not rate \
+                or self.entries >= self.expected_entries:
+            return None
+        return (self.expected_entries - self.entries) / rate
+
+
+class ScanGuard:
+    """检查的时间预算，以及遍历中遇到的错误和超时
+    提供给引擎时，无法列出或stat的条目记录为错误后跳过，不再中止整个检查；
+    超过截止时间后引擎停止遍历，返回已遍历部分中最新的修改时间，并设置timed_out"""
+    __slots__ = ('deadline', 'root_timeout', 'progress', 'errors',
+                 'incomplete', 'timed_out')
+
+    def __init__(self, timeout=None, root_timeout=None, progress=None):
+        """
+        :param timeout: float, 整个检查的时间预算（秒），默认为None，即不限制
+        :param root_timeout: float, 每个目标路径的时间预算（秒），从开始检查该目标路径时计时
+        :param progress: ScanProgress, 累加进度的对象，默认新建
+        """
+        for name, value in (('timeout', timeout),
+                            ('root_timeout', root_timeout)):
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} must be positive, got {value}")
+        self.deadline = None
+        if timeout is not None:
+            self.deadline = time.perf_counter_ns() + int(timeout * 10**9)
+        self.root_timeout = root_timeout
+        self.progress = ScanProgress() if progress is None else progress
+        # [(路径, 错误说明)]
+        self.errors = []
+        # 有错误或超时的子文件夹路径
+        self.incomplete = set()
+        self.timed_out = False
+
+    def _copy(self, deadline):
+        guard = ScanGuard(progress=self.progress)
+        guard.deadline = deadline
+        return guard
+
+    def for_root(self):
+        """为一个目标路径创建副本，从现在开始计算该目标路径的时间预算，与整体的截止时间取较早者"""
+        deadline = self.deadline
+        if self.root_timeout is not None:
+            root_deadline = time.perf_counter_ns() + int(
+                self.root_timeout * 10**9)
+            if deadline is None or root_deadline < deadline:
+                deadline = root_deadline
+        return self._copy(deadline)
+
+    def for_walk(self):
+        """为一个子文件夹的遍历创建副本，单独记录错误和超时，之后由merge合并，因此可以在多个线程中同时遍历"""
+        return self._copy(self.deadline)
+
+    def merge(self, path, walk):
+        """合并遍历子文件夹path所用的副本，有错误或超时时将path记为不完整"""
+        if walk.errors or walk.timed_out:
+            self.errors.extend(walk.errors)
+            self.incomplete.add(path)
+            if walk.timed_out:
+                self.timed_out = True
+
+    def expired(self):
+        return (self.deadline is not None
+                and time.perf_counter_ns() >= self.deadline)
+
+    def tick(self, entries):
+        """列出一个文件夹后调用，累加进度，返回是否已超过截止时间"""
+        self.progress.add(1, entries)
+        return self.expired()
+
+    def error(self, path, error):
+        """记录无法列出或stat的条目"""
+        self.errors.append((path, error.strerror or str(error)))
+
+def _record(guard, path, error):
+    """没有提供guard时抛出遍历中遇到的错误，提供时记录后继续"""
+    if guard is None:
+        raise error
+    guard.error(path, error)
+
+def _device_limits(device_limits):
+    """将{设备上的路径: 并发上限}转换为{st_dev: 并发上限}"""
+    limits = {}
+    for path, limit in (device_limits or {}).items():
+        if limit < 1:
+            raise ValueError(f"Device limits must be at least 1, got {limit}")
+        limits[os.stat(path).st_dev] = limit
+    return limits
+
+def _entry_stat(entry, follow_symlinks):
+    """stat条目；跟随符号链接时，失效或成环的链接退回到链接自身的stat"""
+    if follow_symlinks:
+        try:
+            return entry.stat()
+        except OSError:
+            if not entry.is_symlink():
+                raise
+    return entry.stat(follow_symlinks=False)
+
+def _entry_is_dir(entry, follow_symlinks):
+    """判断条目是否为文件夹；成环的符号链接不视为文件夹"""
+    try:
+        return entry.is_dir(follow_symlinks=follow_symlinks)
+    except OSError:
+        if not entry.is_symlink():
+            raise
+        return False
+
+def _dir_key(path):
+    st = os.stat(path)
+    return st.st_dev, st.st_ino
+
+def _recursive_latest_ns(path, since_ns=None, pruner=None, counts=None,
+                         policy=None, guard=None):
+    """递归查找指定路径下所有条目中最新的修改时间，空文件夹返回None，不进入符号链接
+    提供since_ns时，一旦找到晚于它的修改时间就立即返回该值"""
+    if pruner is not None or counts is not None or policy is not None:
+        raise ValueError("The recursive engine does not support exclusion "
+                         "filters, stats, following symlinks, dedup or "
+                         "--one-file-system")
+    if guard is not None and guard.expired():
+        guard.timed_out = True
+        return None
+    latest = None
+    listed = 0
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                listed += 1
+                try:
+                    mtime_ns = entry.stat(follow_symlinks=False).st_mtime_ns
+                except OSError as e:
+                    _record(guard, entry.path, e)
+                    continue
+                # 如果是文件夹，则递归查找子文件夹中的文件和文件夹的修改时间，保留最新值
+                if entry.is_dir(follow_symlinks=False) \
+                        and (since_ns is None or mtime_ns <= since_ns):
+                    latest_in_subdir = _recursive_latest_ns(
+                        entry.path, since_ns, guard=guard)
+                    # 子文件夹可能为空文件夹，所以需要判断是否为空
+                    if latest_in_subdir is not None \
+                            and latest_in_subdir > mtime_ns:
+                        mtime_ns = latest_in_subdir
+                if latest is None or mtime_ns > latest:
+                    latest = mtime_ns
+                    if since_ns is not None and latest > since_ns:
+                        return latest
+    except OSError as e:
+        _record(guard, path, e)
+    if guard is not None:
+        guard.tick(listed)
+    return latest
+
+def _counted_walk(stack, budget, since_ns, pruner, counts, visited=None,
+                  device=None, skipped=None, guard=None):
+    """使用显式栈遍历，应用排除规则并计数计时，最多列出budget个文件夹
+    被排除的条目在stat和进入之前就被跳过；提供guard时记录错误，超过截止时间后停止
+    :param stack: list[(str, str, tuple, tuple)], 待列出的(文件夹, 相对于目标路径的路径,
+        上一级文件夹的规则链, (st_dev, st_ino))，不提供pruner时第二、三项为None，不跟随符号链接时第四项为None
+    :param pruner: Pruner|None, 排除规则
+    :param counts: Counters, 累加计数的对象
+    :param visited: set|None, 提供时跟随符号链接，记录已进入的文件夹的(st_dev, st_ino)，不再重复进入
+    :param device: int|None, 提供时不进入其他文件系统的文件夹，并将其路径加入skipped
+    :param guard: ScanGuard|None, 提供时记录无法列出或stat的条目，并在超过截止时间后停止
+    :return (latest, leftover): (int|None, list), 已遍历部分中最新的修改时间和尚未列出的文件夹
+    """
+    clock = time.perf_counter_ns
+    follow = visited is not None
+    latest = None
+    rel = chain = key = None
+    while stack and budget > 0:
+        budget -= 1
+        dir_path, dir_rel, chain, _ = stack.pop()
+        start = clock()
+        try:
+            with os.scandir(dir_path) as it:
+                listing = list(it)
+        except OSError as e:
+            _record(guard, dir_path, e)
+            listing = []
+        counts.list_ns += clock() - start
+        counts.scandir_calls += 1
+        counts.entries += len(listing)
+        if pruner is not None:
+            chain = pruner.enter(chain, dir_path, dir_rel,
+                                 (entry.name for entry in listing))
+        for entry in listing:
+            try:
+                is_dir = _entry_is_dir(entry, follow)
+            except OSError as e:
+                _record(guard, entry.path, e)
+                continue
+            if pruner is not None:
+                rel = f"{dir_rel}/{entry.name}"
+                if is_excluded(chain, rel, entry.name, is_dir):
+                    counts.pruned_entries += 1
+                    counts.pruned_dirs += is_dir
+                    continue
+            start = clock()
+            try:
+                st = _entry_stat(entry, follow)
+            except OSError as e:
+                _record(guard, entry.path, e)
+                continue
+            counts.stat_ns += clock() - start
+            counts.stat_calls += 1
+            if latest is None or st.st_mtime_ns > latest:
+                latest = st.st_mtime_ns
+                if since_ns is not None and latest > since_ns:
+                    return latest, []
+            if is_dir:
+                counts.dirs += 1
+                if device is not None and st.st_dev != device:
+                    # 挂载点，只计入其自身的修改时间
+                    skipped.append(entry.path)
+                    continue
+                if follow:
+                    key = (st.st_dev, st.st_ino)
+                    if key in visited:
+                        # 已经进入过的物理文件夹，可能是成环的符号链接
+                        counts.cycles += 1
+                        continue
+                    visited.add(key)
+                stack.append((entry.path, rel, chain, key))
+        if guard is not None and guard.tick(len(listing)) and stack:
+            guard.timed_out = True
+            break
+    return latest, stack
+
+# 用于区分缓存中没有记录和记录了空文件夹(None)
+_MISSING = object()
+
+def _shared_latest_ns(path, policy, counts, guard=None):
+    """后序遍历子树，记录每个物理文件夹的子树最新修改时间，同一物理文件夹再次出现时直接复用
+    仍在栈中的文件夹（成环）不再进入；子树中引用了栈中祖先的文件夹，其结果不完整，只回传不记录。
+    为了使记录的结果完整，即使提供了since_ns也总是遍历整棵子树
+    :param policy: WalkPolicy, 其memo由同一次检查的所有目标路径共用
+    :param counts: Counters, 累加计数的对象
+    :param guard: ScanGuard|None, 提供时记录错误，超过截止时间后停止；
+        有错误的文件夹及其祖先和超时时尚未遍历完的文件夹都不记录
+    """
+    memo = policy.memo
+    follow = policy.follow_symlinks
+    device = policy.device
+    clock = time.perf_counter_ns
+
+    def open_frame(dir_path, key, depth):
+        start = clock()
+        try:
+            with os.scandir(dir_path) as it:
+                listing = list(it)
+        except OSError as e:
+            _record(guard, dir_path, e)
+            # 深度-1使该文件夹及其所有祖先的结果都不被记录
+            return [key, None, -1, iter(())]
+        counts.list_ns += clock() - start
+        counts.scandir_calls += 1
+        counts.entries += len(listing)
+        if guard is not None:
+            guard.progress.add(1, len(listing))
+        latest = None
+        subdirs = []
+        for entry in listing:
+            start = clock()
+            try:
+                st = _entry_stat(entry, follow)
+            except OSError as e:
+                _record(guard, entry.path, e)
+                depth = -1
+                continue
+            counts.stat_ns += clock() - start
+            counts.stat_calls += 1
+            if latest is None or st.st_mtime_ns > latest:
+                latest = st.st_mtime_ns
+            if stat.S_ISDIR(st.st_mode):
+                counts.dirs += 1
+                if device is not None and st.st_dev != device:
+                    policy.skipped.append(entry.path)
+                    continue
+                subdirs.append((entry.path, (st.st_dev, st.st_ino)))
+        # [(st_dev, st_ino), 子树最新修改时间, 引用到的栈中最浅的深度, 尚未进入的子文件夹]
+        return [key, latest, depth, iter(subdirs)]
+
+    key = _dir_key(path)
+    cached = memo.get(key, _MISSING)
+    if cached is not _MISSING:
+        counts.reused += 1
+        return cached
+    depths = {key: 0}
+    stack = [open_frame(path, key, 0)]
+    while True:
+        if guard is not None and guard.expired():
+            # 超时，栈中的文件夹均未遍历完，合并已遍历的部分后返回，不记录
+            guard.timed_out = True
+            return max((frame[1] for frame in stack if frame[1] is not None),
+                       default=None)
+        frame = stack[-1]
+        subdir = next(frame[3], None)
+        if subdir is not None:
+            sub_path, sub_key = subdir
+            if sub_key in depths:
+                counts.cycles += 1
+                frame[2] = min(frame[2], depths[sub_key])
+                continue
+            cached = memo.get(sub_key, _MISSING)
+            if cached is not _MISSING:
+                counts.reused += 1
+                if cached is not None and (frame[1] is None
+                                           or cached > frame[1]):
+                    frame[1] = cached
+                continue
+            depths[sub_key] = len(stack)
+            stack.append(open_frame(sub_path, sub_key, len(stack)))
+            continue
+        # 该文件夹的子树已遍历完，结果完整时记录，并回传给上一级文件夹
+        stack.pop()
+        del depths[frame[0]]
+        if frame[2] >= len(stack):
+            memo[frame[0]] = frame[1]
+        if not stack:
+            return frame[1]
+        parent = stack[-1]
+        if frame[1] is not None and (parent[1] is None or frame[1] > parent[1]):
+            parent[1] = frame[1]
+        parent[2] = min(parent[2], frame[2])
+
+def _iterative_latest_ns(path, since_ns=None, pruner=None, counts=None,
+                         policy=None, guard=None):
+    """使用显式栈遍历指定路径下的整棵子树，返回所有条目中最新的修改时间，空文件夹返回None
+    子树的最新修改时间即子树中所有条目修改时间的最大值，因此无需逐层回传，
+    只需维护一个整数最大值，不受递归深度限制；
+    提供since_ns时，一旦找到晚于它的修改时间就立即返回该值；
+    提供pruner时，跳过被排除的条目并累计其数量；提供counts时在其中累加计数；
+    默认不进入符号链接，提供policy时按其跟随符号链接、对物理文件夹去重或不跨越文件系统；
+    提供guard时，无法列出或stat的条目记录在其中后跳过，超过截止时间后返回已遍历部分中最新的修改时间"""
+    if policy is not None and policy.dedup:
+        if pruner is not None:
+            raise ValueError("Exclusion filters cannot be combined with dedup")
+        return _shared_latest_ns(path, policy,
+                                 counts if counts is not None else Counters(),
+                                 guard)
+    if pruner is not None or counts is not None or policy is not None:
+        if counts is None:
+            counts = Counters()
+        visited = None
+        key = None
+        if policy is not None and policy.follow_symlinks:
+            key = _dir_key(path)
+            visited = {key}
+        if pruner is None:
+            top = (path, None, None, key)
+        else:
+            top = (path, pruner.rel_path(path), pruner.chain, key)
+        device = skipped = None
+        if policy is not None:
+            device, skipped = policy.device, policy.skipped
+        latest, _ = _counted_walk([top], float('inf'), since_ns, pruner,
+                                  counts, visited, device, skipped, guard)
+        if pruner is not None:
+            pruner.count(counts.pruned_entries, counts.pruned_dirs)
+        return latest
+    latest = None
+    stack = [path]
+    while stack:
+        dir_path = stack.pop()
+        listed = 0
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    listed += 1
+                    try:
+                        mtime_ns = entry.stat(
+                            follow_symlinks=False).st_mtime_ns
+                    except OSError as e:
+                        _record(guard, entry.path, e)
+                        continue
+                    if latest is None or mtime_ns > latest:
+                        latest = mtime_ns
+                        if since_ns is not None and latest > since_ns:
+                            return latest
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+        except OSError as e:
+            _record(guard, dir_path, e)
+        if guard is not None and guard.tick(listed) and stack:
+            guard.timed_out = True
+            break
+    return latest
+
+# fd引擎每次遍历最多同时持有的文件夹描述符数，更深的层级相对于最深的持有描述符的一层打开
+FD_WALK_LIMIT = 32
+
+_DIR_FLAGS = (os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0)
+              | getattr(os, 'O_CLOEXEC', 0))
+
+# 子文件夹在列出和打开之间可能被替换为符号链接，不跟随
+_SUBDIR_FLAGS = _DIR_FLAGS | getattr(os, 'O_NOFOLLOW', 0)
+
+def _fd_latest_ns(path, since_ns=None, pruner=None, counts=None,
+                  policy=None, guard=None):
+    """基于文件夹描述符遍历指定路径下的整棵子树，返回所有条目中最新的修改时间，空文件夹返回None，不进入符号链接
+    与os.fwalk一样，子文件夹以相对于上一级描述符的名称打开，条目以相对于所在文件夹的名称stat，
+    内核每次只需解析一级名称，也不需要为每个条目拼接完整路径；栈中最多FD_WALK_LIMIT层持有描述符，
+    更深的层级以相对于最深的持有描述符的一层的路径打开，列出后立即关闭；
+    提供since_ns时，一旦找到晚于它的修改时间就立即返回该值；提供counts时在其中累加计数"""
+    if pruner is not None or policy is not None:
+        raise ValueError("The fd engine does not support exclusion "
+                         "filters, following symlinks, dedup or "
+                         "--one-file-system")
+    clock = time.perf_counter_ns
+    latest = None
+    # 栈中每层为[持有的描述符或None, 相对于最深的持有描述符的一层的路径, 待进入的子文件夹名, 完整路径]，
+    # 完整路径只用于记录错误
+    stack = []
+    held = []
+    try:
+        frame_fd = os.open(path, _DIR_FLAGS)
+    except OSError as e:
+        _record(guard, path, e)
+        return None
+    try:
+        held.append(frame_fd)
+        rel = ''
+        dir_path = path
+        while True:
+            names = []
+            listed = 0
+            try:
+                list_fd = frame_fd
+                if frame_fd is None:
+                    list_fd = os.open(rel, _SUBDIR_FLAGS, dir_fd=held[-1])
+                try:
+                    with os.scandir(list_fd) as it:
+                        listing = it
+                        if counts is not None:
+                            # 计数时先列出再stat，分别计时；否则逐个处理，不保留条目对象
+                            start = clock()
+                            listing = list(it)
+                            counts.list_ns += clock() - start
+                            counts.scandir_calls += 1
+                            counts.entries += len(listing)
+                            counts.stat_calls += len(listing)
+                            start = clock()
+                        for entry in listing:
+                            listed += 1
+                            # 由scandir的描述符以名称stat，不拼接entry.path
+                            try:
+                                st = entry.stat(follow_symlinks=False)
+                            except OSError as e:
+                                _record(guard,
+                                        os.path.join(dir_path, entry.name), e)
+                                continue
+                            if latest is None or st.st_mtime_ns > latest:
+                                latest = st.st_mtime_ns
+                                if since_ns is not None and latest > since_ns:
+                                    return latest
+                            if entry.is_dir(follow_symlinks=False):
+                                names.append(entry.name)
+                    if counts is not None:
+                        counts.stat_ns += clock() - start
+                        counts.dirs += len(names)
+                finally:
+                    if frame_fd is None:
+                        os.close(list_fd)
+            except OSError as e:
+                _record(guard, dir_path, e)
+            stack.append([frame_fd, rel, names, dir_path])
+            if guard is not None and guard.tick(listed) \
+                    and any(frame[2] for frame in stack):
+                guard.timed_out = True
+                return latest
+            # 关闭已遍历完的各层，找到下一个要进入的子文件夹
+            while True:
+                while stack and not stack[-1][2]:
+                    if stack.pop()[0] is not None:
+                        os.close(held.pop())
+                if not stack:
+                    return latest
+                parent_fd, parent_rel, names, parent_path = stack[-1]
+                name = names.pop()
+                dir_path = os.path.join(parent_path, name)
+                if parent_fd is not None and len(held) < FD_WALK_LIMIT:
+                    try:
+                        frame_fd = os.open(name, _SUBDIR_FLAGS,
+                                           dir_fd=parent_fd)
+                    except OSError as e:
+                        _record(guard, dir_path, e)
+                        continue
+                    held.append(frame_fd)
+                    rel = ''
+                else:
+                    frame_fd = None
+                    rel = os.path.join(parent_rel, name)
+                break
+    finally:
+        for fd in held:
+            os.close(fd)
+
+# 可用的子树遍历引擎，均以(path, since_ns=None, pruner=None, counts=None, policy=None, guard=None)调用，
+# 不需要pruner、counts和policy时只以(path, since_ns, guard=guard)调用，如MtimeIndex.subtree_latest_ns，
+# 不接受guard的自定义函数以(path, since_ns)调用；
+# 返回子树中最新的修改时间(ns)，空文件夹返回None；提供since_ns时可以在找到晚于它的修改时间后提前返回，
+# 提供pruner（filter.Pruner）时跳过被排除的条目，提供counts（stats.Counters）时计数，
+# 提供policy（WalkPolicy）时按其处理符号链接、重复出现的物理文件夹和挂载点，
+# 提供guard（ScanGuard）时记录而不抛出遍历中的错误，并在超过截止时间后停止遍历
+ENGINES = {
+    'iterative': _iterative_latest_ns,
+    'recursive': _recursive_latest_ns,
+}
+
+if os.scandir in os.supports_fd and os.open in os.supports_dir_fd:
+    ENGINES['fd'] = _fd_latest_ns
+
+DEFAULT_ENGINE = 'iterative'
+
+def _list_children(path, pruner=None, stats=None, policy=None, devices=None,
+                   selection=None, since_ns=None, guard=None):
+    """列出目标文件夹下所有直接的文件和文件夹及其自身的修改时间
+    :param pruner: Pruner, 该目标路径的排除规则，被排除的直接子条目不会出现在结果中
+    :param stats: ScanStats, 提供时记录列出目标文件夹本身的计数
+    :param policy: WalkPolicy, 跟随符号链接时，指向文件夹的符号链接作为子文件夹，修改时间取其目标的；
+        不跨越文件系统时，作为挂载点的直接子文件夹保留在结果中，但不计入subdirs
+    :param devices: list|None, 提供时按subdirs的顺序填入各子文件夹的st_dev，用于按设备调度
+    :param selection: Selection, 只输出K个条目时，文件只在大小为K的堆中保留可能输出的部分，
+        结果中的文件夹在前、文件在后
+    :param since_ns: int, 阈值查询时不放入堆中的文件的阈值
+    :param guard: ScanGuard, 提供时无法stat的直接子条目记录为错误后跳过，无法列出path本身时仍抛出异常
+    :return (result, subdirs): (ScanResult, list[int]), 未排序的结果和其中需要遍历的子文件夹的下标
+    """
+    result = ScanResult(path)
+    subdirs = []
+    heap = None
+    if selection is not None and selection.keep is not None:
+        heap = _FileHeap(selection, since_ns)
+    if pruner is None and stats is None and policy is None and devices is None:
+        # 遍历目标文件夹下的所有直接的文件和文件夹
+        listed = 0
+        for entry in os.scandir(path):
+            listed += 1
+            try:
+                mtime_ns = entry.stat(follow_symlinks=False).st_mtime_ns
+            except OSError as e:
+                _record(guard, entry.path, e)
+                continue
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if is_dir:
+                subdirs.append(len(result))
+            elif heap is not None:
+                heap.push(mtime_ns, entry.name)
+                continue
+            result.append(mtime_ns, entry.name, is_dir)
+        if heap is not None:
+            heap.drain(result)
+        if guard is not None:
+            guard.tick(listed)
+        return result, subdirs
+
+    follow = policy is not None and policy.follow_symlinks
+    device = policy.device if policy is not None else None
+    counts = Counters()
+    clock = time.perf_counter_ns
+    start = clock()
+    with os.scandir(path) as it:
+        listing = list(it)
+    counts.list_ns += clock() - start
+    counts.scandir_calls += 1
+    counts.entries += len(listing)
+    if pruner is not None:
+        pruner.chain = pruner.enter(pruner.chain, path, '',
+                                    (entry.name for entry in listing))
+    for entry in listing:
+        try:
+            is_dir = _entry_is_dir(entry, follow)
+        except OSError as e:
+            _record(guard, entry.path, e)
+            continue
+        if pruner is not None \
+                and is_excluded(pruner.chain, entry.name, entry.name, is_dir):
+            counts.pruned_entries += 1
+            counts.pruned_dirs += is_dir
+            continue
+        start = clock()
+        try:
+            st = _entry_stat(entry, follow)
+        except OSError as e:
+            _record(guard, entry.path, e)
+            continue
+        finally:
+            counts.stat_ns += clock() - start
+        counts.stat_calls += 1
+        if is_dir:
+            counts.dirs += 1
+            if device is not None and st.st_dev != device:
+                policy.skipped.append(entry.path)
+            else:
+                subdirs.append(len(result))
+                if devices is not None:
+                    devices.append(st.st_dev)
+        elif heap is not None:
+            heap.push(st.st_mtime_ns, entry.name)
+            continue
+        result.append(st.st_mtime_ns, entry.name, is_dir)
+    if heap is not None:
+        heap.drain(result)
+    if pruner is not None:
+        pruner.count(counts.pruned_entries, counts.pruned_dirs)
+    if stats is not None:
+        stats.add_counts(counts)
+    if guard is not None:
+        guard.tick(len(listing))
+    return result, subdirs
+
+def _merge_latest(result, index, latest_in_subdir):
+    """比较子文件夹中最新的修改时间和子文件夹自身的修改时间，保留最新值"""
+    # 子文件夹可能为空文件夹，所以需要判断是否为空
+    if latest_in_subdir is not None \
+            and latest_in_subdir > result.mtimes[index]:
+        result.mtimes[index] = latest_in_subdir
+
+def _resolve_engine(engine):
+    return engine if callable(engine) else ENGINES[engine]
+
+def _accepts_guard(subtree_latest_ns):
+    """自定义的引擎可能只接受(path, since_ns)，此时不传入guard，其中的错误照常抛出"""
+    if subtree_latest_ns in ENGINES.values():
+        return True
+    # inspect只在使用自定义的引擎时才导入
+    import inspect
+    try:
+        return 'guard' in inspect.signature(subtree_latest_ns).parameters
+    except (TypeError, ValueError):
+        return False
+
+def _subtree_walker(subtree_latest_ns, since_ns, guard, pruner=None,
+                    stats=None, policy=None):
+    """返回遍历一个直接子文件夹的函数，按需传入排除规则和遍历策略，记录子树的计数和耗时；
+    每次遍历使用guard的副本，结束后将其中的错误和超时合并回guard，已超过截止时间时不再遍历"""
+    takes_guard = _accepts_guard(subtree_latest_ns)
+
+    def walk(path):
+        walk_guard = guard.for_walk()
+        if walk_guard.expired():
+            latest = None
+            walk_guard.timed_out = True
+        elif stats is None and pruner is None and policy is None:
+            if takes_guard:
+                latest = subtree_latest_ns(path, since_ns, guard=walk_guard)
+            else:
+                latest = subtree_latest_ns(path, since_ns)
+        elif stats is None:
+            latest = subtree_latest_ns(path, since_ns, pruner, None, policy,
+                                       walk_guard)
+        else:
+            counts = Counters()
+            start = time.perf_counter_ns()
+            latest = subtree_latest_ns(path, since_ns, pruner, counts, policy,
+                                       walk_guard)
+            counts.elapsed_ns = time.perf_counter_ns() - start
+            stats.add_subtree(path, counts)
+        guard.merge(path, walk_guard)
+        return latest
+    return walk
+
+def _make_pruner(exclude, gitignore):
+    """将排除规则编译为Pruner，没有任何规则时返回None"""
+    if exclude is not None and not isinstance(exclude, ExcludeMatcher):
+        exclude = ExcludeMatcher(exclude)
+    if not exclude and not gitignore:
+        return None
+    return Pruner(exclude, gitignore)
+
+def _to_ns(since):
+    """将阈值时间转换为ns，支持datetime和POSIX时间戳（秒），其他类型抛出TypeError"""
+    if since is None:
+        return None
+    if isinstance(since, datetime):
+        since = since.timestamp()
+    elif isinstance(since, bool) or not isinstance(since, (int, float)):
+        raise TypeError(f"since must be a number or datetime, "
+                        f"got {type(since).__name__}")
+    return int(since * 10**9)
+
+def _unchanged_subdirs(result, subdirs, since_ns):
+    """阈值查询时，自身修改时间已晚于阈值的子文件夹无需遍历"""
+    if since_ns is None:
+        return subdirs
+    return [index for index in subdirs if result.mtimes[index] <= since_ns]
+
+def _finish(result, since_ns, pruner=None, stats=None, policy=None,
+            selection=None, guard=None):
+    if pruner is not None:
+        result.pruned_entries = pruner.entries
+        result.pruned_dirs = pruner.dirs
+    if policy is not None and policy.skipped is not None:
+        result.mount_skipped = sorted(policy.skipped)
+    start = time.perf_counter_ns()
+    if since_ns is not None:
+        result.keep_changed(since_ns)
+    # 将直接子条目按修改时间排序，得到最终所需结果
+    if selection is None:
+        result.sort()
+    else:
+        result.select(selection)
+    if guard is not None and guard.incomplete:
+        # 不完整的文件夹可能在更深的层级，取其在result.path下的第一层
+        prefix = os.path.join(result.path, '')
+        marked = {path[len(prefix):].split(os.sep, 1)[0]
+                  for path in guard.incomplete if path.startswith(prefix)}
+        result.incomplete = [name for name in result.names
+                             if name in marked] or None
+    if stats is not None:
+        stats.add_phase('sort', time.perf_counter_ns() - start)
+    return result
+
+def _report_guard(result, guard, stats=None, nested=False):
+    """将guard中记录的错误和超时写入目标路径的结果
+    :param nested: bool, 嵌套的目标路径与外层的目标路径共用guard，只取其路径之下的错误，
+        且只在有未遍历完的子文件夹时才视为超时
+    """
+    errors = guard.errors
+    if nested:
+        prefix = os.path.join(result.path, '')
+        errors = [error for error in errors if error[0].startswith(prefix)]
+    result.errors = list(errors) or None
+    result.timed_out = guard.timed_out \
+        and (not nested or result.incomplete is not None)
+    if stats is not None and errors:
+        stats.add_error(len(errors))
+
+def get_latest_modification_time(path, engine=DEFAULT_ENGINE, executor=None,
+                                 since=None, exclude=None, gitignore=False,
+                                 stats=None, follow_symlinks=False,
+                                 dedup=False, one_file_system=False,
+                                 limit=None, offset=0, oldest=False,
+                                 timeout=None):
+    """查找指定路径下所有直接的文件和文件夹的最后修改时间，并返回查找结果
+    :param path: str, 目标路径
+    :param engine: str|callable, 遍历子文件夹所用的引擎，见ENGINES，
+        也可以是返回子树最新修改时间的函数，如MtimeIndex.subtree_latest_ns
+    :param executor: Executor, 用于并行遍历各个子文件夹，默认为None，即串行遍历
+    :param since: datetime|float, 阈值时间，提供时只查找在该时刻之后有变化的直接子条目，
+        子文件夹中一旦找到更新的条目就停止遍历该子文件夹
+    :param exclude: Iterable[str]|ExcludeMatcher, gitignore风格的排除规则，相对于目标路径匹配，
+        被排除的条目及其子树既不会被列出也不会被stat
+    :param gitignore: bool, 是否同时遵循遍历时遇到的.gitignore文件
+    :param stats: ScanStats, 提供时记录计数和各阶段、各直接子文件夹的耗时
+    :param follow_symlinks: bool, 是否进入指向文件夹的符号链接，默认不进入；
+        进入时以(st_dev, st_ino)检测成环，每个物理文件夹在一个子文件夹的遍历中只列出一次
+    :param dedup: bool, 是否每个物理文件夹只遍历一次，在其再次出现的位置（符号链接、bind mount）复用其结果，
+        此时总是遍历整棵子树，不能与排除规则同时使用
+    :param one_file_system: bool, 是否不进入与目标路径不在同一文件系统的文件夹，
+        这些挂载点只计入其自身的修改时间，并记录在结果的mount_skipped中
+    :param limit: int, 最多输出的条目数，提供时使用大小为offset+limit的堆选择，未输出的条目数记录在结果的omitted中
+    :param offset: int, 跳过排序后的前offset个条目
+    :param oldest: bool, 是否按修改时间从旧到新排序
+    :param timeout: float, 时间预算（秒），超过后停止遍历，结果中未遍历完的子文件夹记录在incomplete中；
+        子树中无法列出或stat的条目记录在结果的errors中，无法列出path本身时仍抛出异常
+    :return result: ScanResult, 按修改时间从新到旧排序的直接子条目
+    """
+    start = time.perf_counter_ns()
+    guard = ScanGuard(timeout)
+    since_ns = _to_ns(since)
+    selection = _make_selection(limit, offset, oldest)
+    pruner = _make_pruner(exclude, gitignore)
+    if pruner is not None:
+        pruner = pruner.for_root(path)
+    policy = _make_policy(follow_symlinks, dedup, one_file_system)
+    if policy is not None:
+        policy = policy.for_root(path)
+    walk = _subtree_walker(_resolve_engine(engine), since_ns, guard, pruner,
+                           stats, policy)
+    result, subdirs = _list_children(path, pruner, stats, policy,
+                                     selection=selection, since_ns=since_ns,
+                                     guard=guard)
+    subdirs = _unchanged_subdirs(result, subdirs, since_ns)
+    # 如果不是文件夹而是文件，则直接使用文件的修改时间；
+    # 如果是文件夹，则查找子文件夹中所有条目的最新修改时间，与子文件夹的修改时间比较，保留最新值
+    if executor is not None:
+        futures = [executor.submit(walk,
+                                   os.path.join(path, result.names[index]))
+                   for index in subdirs]
+        for index, future in zip(subdirs, futures):
+            _merge_latest(result, index, future.result())
+    else:
+        for index in subdirs:
+            _merge_latest(result, index,
+                          walk(os.path.join(path, result.names[index])))
+    result = _finish(result, since_ns, pruner, stats, policy, selection,
+                     guard)
+    _report_guard(result, guard, stats)
+    if stats is not None:
+        stats.add_root(path, time.perf_counter_ns() - start)
+    return result
+
+
+class MtimeTree:
+    """一个目标文件夹的完整遍历结果，缓存其中每个文件夹的子树最新修改时间，
+    之后列出任意一个文件夹的直接子条目时只需列出该文件夹本身，无需重新遍历其子文件夹"""
+
+    def __init__(self, path):
+        self.path = path
+        # 文件夹路径 -> 其子树中最新的修改时间，空文件夹为None
+        self.latest = {}
+        self.dirs = 0
+        self.entries = 0
+        # 遍历中无法列出或stat的条目记录在guard.errors中，不中止遍历
+        self.guard = ScanGuard()
+        # 子树中有错误的文件夹路径，其最新修改时间只是可读部分中最新的
+        self.incomplete = set()
+
+    def scan(self, cancel=None, progress=None, interval=256):
+        """使用显式栈遍历整棵树，不进入符号链接，再按逆序将各文件夹的最新修改时间归约到其父文件夹；
+        无法列出或stat的条目记录在guard中后跳过，所在文件夹及其祖先记入incomplete
+        :param cancel: threading.Event, 被设置时尽快停止遍历并抛出CancelledError
+        :param progress: callable, 每列出interval个文件夹以(已列出的文件夹数, 已列出的条目数)调用一次，
+            在遍历所在的线程中调用
+        :return self: MtimeTree
+        """
+        paths, parents, latests, failures = [], [], [], []
+        stack = [(self.path, -1)]
+        while stack:
+            if cancel is not None and cancel.is_set():
+                from concurrent.futures import CancelledError
+                raise CancelledError(f"Scanning {self.path} was cancelled")
+            path, parent = stack.pop()
+            index = len(paths)
+            latest = None
+            failed = False
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        self.entries += 1
+                        try:
+                            mtime_ns = entry.stat(
+                                follow_symlinks=False).st_mtime_ns
+                        except OSError as e:
+                            self.guard.error(entry.path, e)
+                            failed = True
+                            continue
+                        if latest is None or mtime_ns > latest:
+                            latest = mtime_ns
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append((entry.path, index))
+            except OSError as e:
+                self.guard.error(path, e)
+                failed = True
+            paths.append(path)
+            parents.append(parent)
+            latests.append(latest)
+            failures.append(failed)
+            self.dirs += 1
+            if progress is not None and self.dirs % interval == 0:
+                progress(self.dirs, self.entries)
+        # 先序遍历中子孙文件夹的下标总是大于祖先，逆序归约时每个文件夹的子树已归约完毕
+        for index in range(len(paths) - 1, 0, -1):
+            latest, parent = latests[index], parents[index]
+            if latest is not None and (latests[parent] is None
+                                       or latest > latests[parent]):
+                latests[parent] = latest
+            if failures[index]:
+                failures[parent] = True
+        self.latest = dict(zip(paths, latests))
+        self.incomplete = {path for path, failed in zip(paths, failures)
+                           if failed}
+        if progress is not None:
+            progress(self.dirs, self.entries)
+        return self
+
+    def children(self, path=None):
+        """列出一个已遍历的文件夹的直接子条目，子文件夹的修改时间取自缓存的子树最新修改时间
+        :param path: str, 文件夹路径，默认为目标文件夹
+        :return result: ScanResult, 按修改时间从新到旧排序的直接子条目，
+            path之下遍历时和本次列出时的错误记录在errors中，子树中有错误的子文件夹记录在incomplete中
+        """
+        path = self.path if path is None else path
+        result = ScanResult(path)
+        guard = ScanGuard()
+        for entry in os.scandir(path):
+            try:
+                mtime_ns = entry.stat(follow_symlinks=False).st_mtime_ns
+            except OSError as e:
+                guard.error(entry.path, e)
+                continue
+            is_dir = entry.is_dir(follow_symlinks=False)
+            result.append(mtime_ns, entry.name, is_dir)
+            if is_dir:
+                # 遍历之后新建的文件夹没有缓存，只使用其自身的修改时间
+                _merge_latest(result, len(result) - 1,
+                              self.latest.get(entry.path))
+        result.sort()
+        if self.incomplete:
+            result.incomplete = [
+                name for name in result.names
+                if os.path.join(path, name) in self.incomplete] or None
+        prefix = os.path.join(path, '')
+        result.errors = [error for error in self.guard.errors
+                         if error[0].startswith(prefix)] + guard.errors or None
+        return result
+
+async def scan(path_list, engine=DEFAULT_ENGINE, workers=None,
+               concurrency=None, executor=None, since=None, exclude=None,
+               gitignore=False, stats=None, follow_symlinks=False,
+               dedup=False, one_file_system=False, per_device=None,
+               device_limits=None, depth=1, limit=None, offset=0,
+               oldest=False, share_nested=False, timeout=None,
+               root_timeout=None, progress=None):
+    """异步检查多个目标路径，按完成顺序逐个产出每个目标路径的结果
+    目录列举和stat都在有界的线程池中执行，不会阻塞事件循环；
+    提前退出迭代或取消所在任务时，尚未开始的遍历会被一并取消；
+    提供per_device或device_limits时，按直接子文件夹的st_dev分组，限制每个设备上同时遍历的子文件夹数，
+    使快速设备可以使用大量线程，而不会让同一个机械硬盘或网络文件系统同时承受过多请求
+    :param path_list: Iterable[str], 目标路径列表
+    :param engine: str|callable, 遍历子文件夹所用的引擎，见ENGINES
+    :param workers: int, 线程池的线程数，默认为1，提供executor时忽略
+    :param concurrency: int, 同时检查的目标路径数上限，默认为None，即不限制
+    :param executor: Executor, 使用已有的线程池，由调用者负责关闭
+    :param since: datetime|float, 阈值时间，见get_latest_modification_time
+    :param exclude: Iterable[str]|ExcludeMatcher, 排除规则，只编译一次，见get_latest_modification_time
+    :param gitignore: bool, 是否同时遵循遍历时遇到的.gitignore文件
+    :param stats: ScanStats, 提供时记录计数和耗时，见get_latest_modification_time
+    :param follow_symlinks: bool, 是否进入指向文件夹的符号链接，见get_latest_modification_time
+    :param dedup: bool, 是否每个物理文件夹只遍历一次，各目标路径共用已遍历的结果
+    :param one_file_system: bool, 是否不跨越文件系统，见get_latest_modification_time
+    :param per_device: int, 每个设备上同时遍历的直接子文件夹数上限，默认为None，即不限制
+    :param device_limits: dict[str, int], 单独指定的上限，键为该设备上的任意路径，优先于per_device
+    :param depth: int, 报告的层数，大于1时逐层展开子文件夹，各层结果存入subresults，
+        所有层级在同一次遍历中自底向上归约得到，不能与排除规则同时使用
+    :param limit: int, 每个文件夹最多输出的条目数，见get_latest_modification_time
+    :param offset: int, 跳过排序后的前offset个条目
+    :param oldest: bool, 是否按修改时间从旧到新排序
+    :param share_nested: bool, 是否按realpath找出嵌套在其他目标路径之下的目标路径，
+        只遍历外层的目标路径一次，嵌套的目标路径的结果在同一次遍历中得到；需要先读取整个path_list，
+        使用排除规则或不跨越文件系统时不生效
+    :param timeout: float, 整个检查的时间预算（秒），从调用时开始计时，超过后各目标路径停止遍历并产出已有的结果
+    :param root_timeout: float, 每个目标路径的时间预算（秒），从开始检查该目标路径时计时
+    :param progress: ScanProgress, 累加已列出的文件夹数和条目数，用于显示进度
+    :return: AsyncIterator[ScanResult], 每个目标路径按修改时间从新到旧排序的直接子条目；
+        子树中无法列出或stat的条目记录在结果的errors中，未遍历完的子文件夹记录在incomplete中，
+        无法列出目标路径本身时抛出异常
+    """
+    if depth < 1:
+        raise ValueError(f"depth must be at least 1, got {depth}")
+    subtree_latest_ns = _resolve_engine(engine)
+    since_ns = _to_ns(since)
+    base_guard = ScanGuard(timeout, root_timeout, progress)
+    base_pruner = _make_pruner(exclude, gitignore)
+    if depth > 1 and base_pruner is not None:
+        raise ValueError("--depth cannot be combined with exclusion filters")
+    base_policy = _make_policy(follow_symlinks, dedup, one_file_system)
+    selection = _make_selection(limit, offset, oldest)
+    limits = _device_limits(device_limits)
+    if per_device is not None and per_device < 1:
+        raise ValueError(f"per_device must be at least 1, got {per_device}")
+    scheduled = per_device is not None or bool(limits)
+    # st_dev -> 限制该设备上并发遍历数的信号量，遇到新设备时创建
+    semaphores = {}
+    import asyncio
+    loop = asyncio.get_running_loop()
+    own_executor = executor is None
+    if own_executor:
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(max_workers=workers or 1)
+
+    async def walk_on(device, walk, subdir):
+        semaphore = semaphores.get(device)
+        if semaphore is None:
+            semaphore = semaphores[device] = asyncio.Semaphore(
+                limits.get(device, per_device or sys.maxsize))
+        async with semaphore:
+            return await loop.run_in_executor(executor, walk, subdir)
+
+    async def check_level(path, pruner, policy, walk, guard, level,
+                          inner=None, found=None):
+        """列出一层文件夹，未到depth时逐层展开子文件夹，到达depth时遍历其子文件夹；
+        返回尚未排序的结果，其修改时间已归约了各子文件夹的子树最新修改时间；
+        inner为嵌套在path之下的目标路径的前缀树，通往它们的文件夹总是展开，嵌套的目标路径的结果放入found；
+        展开的子文件夹无法列出或已超过截止时间时，记入guard并返回空结果"""
+        devices = [] if scheduled else None
+
+        def list_level():
+            # 同一层的文件夹同时提交，在线程池实际执行时才检查截止时间
+            if level > 1 and guard.expired():
+                return None
+            return _list_children(path, pruner, stats, policy, devices,
+                                  selection, since_ns, guard)
+        try:
+            listed = await loop.run_in_executor(executor, list_level)
+        except OSError as e:
+            if level == 1:
+                raise
+            guard.error(path, e)
+            guard.incomplete.add(path)
+            return ScanResult(path)
+        if listed is None:
+            guard.timed_out = True
+            guard.incomplete.add(path)
+            return ScanResult(path)
+        result, subdirs = listed
+        device_of = dict(zip(subdirs, devices)) if scheduled else None
+        nested = []
+        pending = []
+        orphans = []
+        if inner:
+            nested = [index for index in subdirs
+                      if result.names[index] in inner]
+            subdirs = [index for index in subdirs
+                       if result.names[index] not in inner]
+            pending = [check_inner(path, result.names[index],
+                                   inner[result.names[index]], pruner,
+                                   policy, walk, guard, level, found)
+                       for index in nested]
+            # 未能列出的嵌套目标路径（如在两次列出之间被删除）单独检查
+            listed = {result.names[index] for index in nested}
+            orphans = [check_nested(root, node, pruner, policy, walk, guard,
+                                    found)
+                       for name in inner if name not in listed
+                       for root, node in _trie_roots({name: inner[name]})]
+        if level < depth:
+            # 中间各层的文件夹本来就需要列出，展开它们不会增加遍历的总量
+            pending += [
+                check_level(os.path.join(path, result.names[index]), pruner,
+                            policy, walk, guard, level + 1)
+                for index in subdirs]
+        else:
+            subdirs = _unchanged_subdirs(result, subdirs, since_ns)
+            # 每个子文件夹作为一个任务单元提交给线程池
+            pending += [
+                walk_on(device_of[index], walk,
+                        os.path.join(path, result.names[index]))
+                if scheduled else
+                loop.run_in_executor(executor, walk,
+                                     os.path.join(path, result.names[index]))
+                for index in subdirs]
+        outcomes = await asyncio.gather(*pending, *orphans)
+        if level < depth:
+            result.subresults = {}
+        for index, (latest, child) in zip(nested, outcomes):
+            _merge_latest(result, index, latest)
+            if child is not None:
+                result.subresults[result.names[index]] = child
+        for index, outcome in zip(subdirs, outcomes[len(nested):]):
+            if level < depth:
+                _merge_latest(result, index, outcome.latest)
+                result.subresults[result.names[index]] = _finish(
+                    outcome, since_ns, stats=stats, selection=selection,
+                    guard=guard)
+            else:
+                _merge_latest(result, index, outcome)
+        return result
+
+    async def check_inner(path, name, node, pruner, policy, walk, guard,
+                          level, found):
+        """展开path下通往嵌套目标路径的子文件夹name
+        :return (latest, child): 该子文件夹的子树最新修改时间，以及未到depth时作为subresults的结果
+        """
+        child_path = os.path.join(path, name)
+        inner = {key: value for key, value in node.items() if key}
+        if '' not in node:
+            child = await check_level(child_path, pruner, policy, walk,
+                                      guard, level + 1, inner, found)
+            latest = child.latest
+            if level < depth:
+                return latest, _finish(child, since_ns, stats=stats,
+                                       selection=selection, guard=guard)
+            return latest, None
+        latest, nested = await check_nested(node[''], inner, pruner, policy,
+                                            walk, guard, found)
+        if level < depth:
+            return latest, nested.truncated(child_path, depth - level)
+        return latest, None
+
+    async def check_nested(path, inner, pruner, policy, walk, guard, found):
+        """检查嵌套的目标路径，其结果与外层的目标路径一同产出
+        :return (latest, result): 子树最新修改时间和已排序的结果
+        """
+        start = time.perf_counter_ns()
+        result = await check_level(path, pruner, policy, walk, guard, 1,
+                                   inner, found)
+        latest = result.latest
+        result = _finish(result, since_ns, stats=stats, selection=selection,
+                         guard=guard)
+        _report_guard(result, guard, nested=True)
+        if stats is not None:
+            stats.add_root(path, time.perf_counter_ns() - start)
+        found.append(result)
+        return latest, result
+
+    async def scan_root(path, inner=None):
+        """检查一个目标路径，返回其结果及嵌套在其中的目标路径的结果"""
+        start = time.perf_counter_ns()
+        pruner = policy = None
+        found = []
+        guard = base_guard.for_root()
+        if base_pruner is not None:
+            pruner = base_pruner.for_root(path)
+        try:
+            if base_policy is not None:
+                policy = base_policy.for_root(path)
+            walk = _subtree_walker(subtree_latest_ns, since_ns, guard, pruner,
+                                   stats, policy)
+            result = await check_level(path, pruner, policy, walk, guard, 1,
+                                       inner, found)
+        except OSError:
+            if stats is not None:
+                stats.add_error()
+            raise
+        result = _finish(result, since_ns, pruner, stats, policy, selection,
+                         guard)
+        _report_guard(result, guard, stats)
+        if stats is not None:
+            stats.add_root(path, time.perf_counter_ns() - start)
+        return [result, *found]
+
+    if share_nested and base_pruner is None and not one_file_system:
+        # 排除规则以各自的目标路径为锚点，挂载点也相对于各自的目标路径，此时嵌套的目标路径仍单独检查
+        plan = iter(_nest_roots(list(path_list)))
+    else:
+        plan = ((path, None) for path in path_list)
+    # 限制同时检查的目标路径数时，只在有目标路径完成后才开始下一个，
+    # 因此path_list可以是惰性的迭代器，内存占用与目标路径总数无关
+    pending = {asyncio.ensure_future(scan_root(*item)) for item in
+               (itertools.islice(plan, concurrency) if concurrency else plan)}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if concurrency:
+                    item = next(plan, None)
+                    if item is not None:
+                        pending.add(asyncio.ensure_future(scan_root(*item)))
+                for result in task.result():
+                    yield result
+    finally:
+        for task in pending:
+            task.cancel()
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# 进程池引擎中每个任务最多列出的文件夹数，超出的部分交还给协调者重新分配
+PROCESS_CHUNK_SIZE = 256
+
+def _walk_chunk(paths, budget, since_ns=None, pruner=None, counted=False,
+                follow_symlinks=False, device=None):
+    """进程池引擎的任务：使用显式栈从paths出发遍历，最多列出budget个文件夹，
+    提供since_ns时，一旦找到晚于它的修改时间就立即返回；
+    提供pruner、counted、device或follow_symlinks为True时，paths中的每项为
+    (文件夹, 相对于目标路径的路径, 规则链, (st_dev, st_ino))，见_counted_walk
+    :param device: int, 提供时不进入其他文件系统的文件夹
+    :return (latest, leftover, counts, skipped, guard):
+        (int|None, list, Counters|None, list|None, ScanGuard),
+        已遍历部分中最新的修改时间、尚未列出的文件夹、该任务的计数、在挂载点处跳过的文件夹，
+        以及记录了该任务中的错误和进度的ScanGuard；截止时间由协调者在任务之间检查
+    """
+    guard = ScanGuard()
+    if pruner is not None or counted or follow_symlinks or device is not None:
+        counts = Counters()
+        visited = {item[3] for item in paths} if follow_symlinks else None
+        skipped = [] if device is not None else None
+        start = time.perf_counter_ns()
+        latest, leftover = _counted_walk(list(paths), budget, since_ns,
+                                         pruner, counts, visited, device,
+                                         skipped, guard)
+        counts.elapsed_ns = time.perf_counter_ns() - start
+        return latest, leftover, counts, skipped, guard
+    latest = None
+    stack = list(paths)
+    while stack and budget > 0:
+        budget -= 1
+        dir_path = stack.pop()
+        listed = 0
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    listed += 1
+                    try:
+                        mtime_ns = entry.stat(
+                            follow_symlinks=False).st_mtime_ns
+                    except OSError as e:
+                        guard.error(entry.path, e)
+                        continue
+                    if latest is None or mtime_ns > latest:
+                        latest = mtime_ns
+                        if since_ns is not None and latest > since_ns:
+                            return latest, [], None, None, guard
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+        except OSError as e:
+            guard.error(dir_path, e)
+        guard.tick(listed)
+    return latest, stack, None, None, guard
+
+def _process_check(path_list, workers=None, since=None,
+                   chunk_size=PROCESS_CHUNK_SIZE, pruner=None, stats=None,
+                   policy=None, selection=None, guard=None):
+    """使用进程池检查多个目标路径，在任意深度切分子树
+    每个任务遍历至多chunk_size个文件夹后，将尚未列出的子文件夹交还给协调者，
+    协调者按当前空闲的进程数将其切分为多个任务重新提交，使空闲进程能够接手倾斜子树中未探索的部分；
+    各任务得到的部分最大值归约回其所属目标路径的直接子文件夹
+    :param path_list: list[str], 目标路径列表
+    :param workers: int, 进程数，默认为CPU核数
+    :param since: datetime|float, 阈值时间，见get_latest_modification_time
+    :param chunk_size: int, 每个任务最多列出的文件夹数
+    :param pruner: Pruner, 排除规则，随任务序列化到各进程，被排除的条目数由协调者汇总
+    :param stats: ScanStats, 提供时由协调者汇总各任务的计数，直接子文件夹的耗时为其各任务耗时之和
+    :param policy: WalkPolicy, 跟随符号链接时，协调者为每个直接子文件夹记录已分配的物理文件夹，
+        交还的子文件夹中已分配过的不再重新提交；不跨越文件系统时，各任务跳过的挂载点由协调者汇总；不支持dedup
+    :param selection: Selection, 只输出部分条目时的排序方向、偏移和条目数
+    :param guard: ScanGuard, 时间预算和进度，由协调者在任务之间检查截止时间，超过后不再提交交还的子文件夹
+    :return results: list[ScanResult], 检查结果
+    """
+    if policy is not None and policy.dedup:
+        raise ValueError("The process engine does not support dedup")
+    start = time.perf_counter_ns()
+    workers = workers or os.cpu_count() or 1
+    since_ns = _to_ns(since)
+    counted = stats is not None
+    follow = policy is not None and policy.follow_symlinks
+    guard = ScanGuard() if guard is None else guard
+    results = []
+    pruners = []
+    policies = []
+    guards = []
+    # future -> (所属的目标路径结果, 所属直接子文件夹在结果中的下标, 所属目标路径的Pruner、WalkPolicy和ScanGuard)
+    futures = {}
+    # 所属直接子文件夹 -> [尚未完成的任务数, 已完成任务的计数]
+    pending = {}
+    # 所属直接子文件夹 -> 已分配的物理文件夹的(st_dev, st_ino)
+    assigned = {}
+    # 进程池需要导入multiprocessing，只在使用process引擎时才导入
+    from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                    wait)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def submit(owner, paths):
+            if owner[4].expired():
+                give_up(owner)
+                return
+            device = owner[3] and owner[3].device
+            futures[executor.submit(_walk_chunk, paths, chunk_size,
+                                    since_ns, owner[2], counted,
+                                    follow, device)] = owner
+            if counted:
+                pending.setdefault(owner[:2], [0, Counters()])[0] += 1
+
+        def give_up(owner):
+            """超过截止时间后放弃所属直接子文件夹中尚未遍历的部分"""
+            owner[4].timed_out = True
+            owner[4].incomplete.add(
+                os.path.join(owner[0].path, owner[0].names[owner[1]]))
+
+        def settle(owner, counts):
+            # 所属直接子文件夹的所有任务都已完成或被放弃时，记录其计数
+            tasks = pending[owner[:2]]
+            tasks[0] -= 1
+            if counts is not None:
+                tasks[1].merge(counts)
+            if not tasks[0]:
+                del pending[owner[:2]]
+                stats.add_subtree(
+                    os.path.join(owner[0].path, owner[0].names[owner[1]]),
+                    tasks[1])
+
+        # 在协调者中列出所有目标路径的直接子条目，每个子文件夹作为一个初始任务
+        for path in path_list:
+            root_pruner = None if pruner is None else pruner.for_root(path)
+            root_policy = None if policy is None else policy.for_root(path)
+            root_guard = guard.for_root()
+            result, subdirs = _list_children(path, root_pruner, stats,
+                                             root_policy, None, selection,
+                                             since_ns, root_guard)
+            for index in _unchanged_subdirs(result, subdirs, since_ns):
+                subdir = os.path.join(path, result.names[index])
+                if root_pruner is not None or counted or follow \
+                        or root_policy is not None:
+                    key = None
+                    if follow:
+                        key = _dir_key(subdir)
+                        assigned[(result, index)] = {key}
+                    rel, chain = None, None
+                    if root_pruner is not None:
+                        rel, chain = result.names[index], root_pruner.chain
+                    subdir = (subdir, rel, chain, key)
+                submit((result, index, root_pruner, root_policy, root_guard),
+                       [subdir])
+            results.append(result)
+            pruners.append(root_pruner)
+            policies.append(root_policy)
+            guards.append(root_guard)
+
+        # 有时间预算时，等待任务的同时等待最早的截止时间，到期后放弃所属目标路径尚未完成的任务
+        live = [root_guard for root_guard in guards
+                if root_guard.deadline is not None]
+        while futures:
+            timeout = None
+            if live:
+                timeout = max(0, min(root_guard.deadline for root_guard in live)
+                              - time.perf_counter_ns()) / 10**9
+            done, _ = wait(futures, timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                result, index, root_pruner, root_policy, root_guard = owner = \
+                    futures.pop(future)
+                try:
+                    latest, leftover, counts, skipped, chunk = future.result()
+                except OSError:
+                    if counted:
+                        stats.add_error()
+                    raise
+                subdir = os.path.join(result.path, result.names[index])
+                root_guard.progress.add(chunk.progress.dirs,
+                                        chunk.progress.entries)
+                root_guard.merge(subdir, chunk)
+                if root_pruner is not None:
+                    root_pruner.count(counts.pruned_entries,
+                                      counts.pruned_dirs)
+                if skipped:
+                    root_policy.skipped.extend(skipped)
+                _merge_latest(result, index, latest)
+                if since_ns is not None and result.mtimes[index] > since_ns:
+                    # 该直接子文件夹已确定有变化，不再继续遍历
+                    leftover = []
+                if follow:
+                    # 其他任务中已分配过的物理文件夹不再重新提交，避免成环的符号链接无限循环
+                    seen = assigned[owner[:2]]
+                    leftover = [item for item in leftover
+                                if item[3] not in seen]
+                    seen.update(item[3] for item in leftover)
+                if leftover:
+                    # 按空闲进程数切分尚未探索的子树，交给空闲进程领取
+                    pieces = max(1, min(len(leftover), workers - len(futures)))
+                    for i in range(pieces):
+                        submit(owner, leftover[i::pieces])
+                if counted:
+                    settle(owner, counts)
+            expired = [root_guard for root_guard in live
+                       if root_guard.expired()]
+            if expired:
+                live = [root_guard for root_guard in live
+                        if root_guard not in expired]
+                # 正在运行的任务无法取消，其结果被丢弃；每个任务最多列出chunk_size个文件夹
+                for future, owner in list(futures.items()):
+                    if owner[4] in expired:
+                        future.cancel()
+                        del futures[future]
+                        give_up(owner)
+                        if counted:
+                            settle(owner, None)
+
+    results = [_finish(result, since_ns, root_pruner, stats, root_policy,
+                       selection, root_guard)
+               for result, root_pruner, root_policy, root_guard
+               in zip(results, pruners, policies, guards)]
+    for result, root_guard in zip(results, guards):
+        _report_guard(result, root_guard, stats)
+    if counted:
+        elapsed_ns = time.perf_counter_ns() - start
+        for result in results:
+            # 各目标路径在同一个进程池中交错检查，只能记录整体耗时
+            stats.add_root(result.path, elapsed_ns)
+    return results
+
+def _flat_listing(path, counts=None, guard=None):
+    """按广度优先列出整棵树，将每个条目的(所在文件夹下标, mtime_ns)收集到扁平数组中，不进入符号链接
+    文件夹的下标按发现的顺序分配，目标路径为0；广度优先使每层文件夹的下标连续，
+    且条目和文件夹均按所在文件夹的下标非递减排列，便于按段归约
+    :param guard: ScanGuard, 提供时记录子树中无法列出或stat的条目，超过截止时间后不再列出队列中剩余的文件夹
+    :return (names, is_dirs, child_dirs, entry_parents, entry_mtimes, dir_parents, level_starts, incomplete):
+        目标路径的直接子条目名、是否为文件夹及其文件夹下标（文件为-1），所有条目和所有文件夹（不含目标路径）
+        所在文件夹的下标，每层文件夹的起始下标，以及有错误或未列出完的直接子文件夹名
+    """
+    names, is_dirs, child_dirs = [], bytearray(), array('q')
+    entry_parents, entry_mtimes = array('q'), array('q')
+    dir_parents = array('q', [-1])
+    level_starts = [0, 1]
+    queue_paths = [path]
+    # 每个文件夹所属的直接子文件夹名，目标路径为None
+    tops = [None]
+    incomplete = set()
+    i = 0
+    while i < len(queue_paths):
+        if i == level_starts[-1]:
+            level_starts.append(len(queue_paths))
+        dir_path, queue_paths[i] = queue_paths[i], None
+        top = tops[i]
+        listed = 0
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    listed += 1
+                    try:
+                        mtime_ns = entry.stat(
+                            follow_symlinks=False).st_mtime_ns
+                    except OSError as e:
+                        _record(guard, entry.path, e)
+                        incomplete.add(top)
+                        continue
+                    entry_parents.append(i)
+                    entry_mtimes.append(mtime_ns)
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if is_dir:
+                        dir_parents.append(i)
+                        queue_paths.append(entry.path)
+                        tops.append(entry.name if i == 0 else top)
+                    if i == 0:
+                        names.append(entry.name)
+                        is_dirs.append(is_dir)
+                        child_dirs.append(
+                            len(queue_paths) - 1 if is_dir else -1)
+        except OSError as e:
+            if i == 0:
+                raise
+            _record(guard, dir_path, e)
+            incomplete.add(top)
+        i += 1
+        if guard is not None and guard.tick(listed) and i < len(queue_paths):
+            # 队列中剩余的文件夹不再列出，其子树最新修改时间按空文件夹归约
+            guard.timed_out = True
+            incomplete.update(tops[i:])
+            break
+    incomplete.discard(None)
+    if counts is not None:
+        counts.scandir_calls += i
+        counts.stat_calls += len(entry_mtimes)
+        counts.entries += len(entry_mtimes)
+        counts.dirs += len(queue_paths) - 1
+    if level_starts[-1] != len(queue_paths):
+        level_starts.append(len(queue_paths))
+    return (names, is_dirs, child_dirs, entry_parents, entry_mtimes,
+            dir_parents, level_starts, incomplete)
+
+def _segment_max(values, groups):
+    """groups非递减时，按组求values的最大值，返回(各组的组号, 最大值)"""
+    np = _load_numpy()
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    return groups[starts], np.maximum.reduceat(values, starts)
+
+def _numpy_latest(path, since_ns=None, stats=None, selection=None,
+                  guard=None):
+    """numpy引擎检查一个目标路径：列出时只收集扁平数组，之后自底向上逐层以向量化的分段归约
+    计算每个文件夹的子树最新修改时间，最后以argsort对直接子条目排序"""
+    np = _load_numpy()
+    start = time.perf_counter_ns()
+    guard = ScanGuard() if guard is None else guard
+    counts = Counters() if stats is not None else None
+    (names, is_dirs, child_dirs, entry_parents, entry_mtimes, dir_parents,
+     level_starts, incomplete) = _flat_listing(path, counts, guard)
+    listed = time.perf_counter_ns()
+    empty = np.iinfo(np.int64).min
+    parents = np.frombuffer(entry_parents, dtype=np.int64)
+    mtimes = np.frombuffer(entry_mtimes, dtype=np.int64)
+    dir_parent = np.frombuffer(dir_parents, dtype=np.int64)
+    # 每个文件夹的子树最新修改时间，空文件夹为empty
+    subtree = np.full(len(dir_parent), empty, dtype=np.int64)
+    if len(mtimes):
+        groups, maxima = _segment_max(mtimes, parents)
+        subtree[groups] = maxima
+    # 从最深的一层开始，将每层文件夹的子树最大值归约到上一层
+    for lo, hi in reversed(list(zip(level_starts[1:-1], level_starts[2:]))):
+        groups, maxima = _segment_max(subtree[lo:hi], dir_parent[lo:hi])
+        subtree[groups] = np.maximum(subtree[groups], maxima)
+    n = len(names)
+    values = mtimes[:n].copy()
+    child = np.frombuffer(child_dirs, dtype=np.int64)
+    dirs = child >= 0
+    values[dirs] = np.maximum(values[dirs], subtree[child[dirs]])
+    order = np.arange(n)
+    if since_ns is not None:
+        order = order[values > since_ns]
+    oldest = selection is not None and selection.oldest
+    # 稳定排序，相同修改时间的条目与ScanResult.sort一样保持列出的顺序
+    keys = values[order] if oldest else -values[order]
+    order = order[np.argsort(keys, kind='stable')]
+    result = ScanResult(path)
+    result.since_ns = since_ns
+    if selection is not None:
+        page = order[selection.offset:selection.keep]
+        result.omitted = len(order) - len(page)
+        if result.omitted:
+            result.omitted_latest = int(values[order].max())
+        order = page
+    result.mtimes.frombytes(values[order].tobytes())
+    result.names = [names[i] for i in order.tolist()]
+    result.is_dirs = bytearray(is_dirs[i] for i in order.tolist())
+    if incomplete:
+        result.incomplete = [name for name in result.names
+                             if name in incomplete] or None
+    _report_guard(result, guard, stats)
+    if stats is not None:
+        counts.list_ns += listed - start
+        stats.add_counts(counts)
+        stats.add_phase('sort', time.perf_counter_ns() - listed)
+        stats.add_root(path, time.perf_counter_ns() - start)
+    return result
+
+def _numpy_check(path_list, workers=None, since=None, pruner=None,
+                 stats=None, policy=None, selection=None, guard=None):
+    """numpy引擎，按目标路径整体检查，提供workers时在线程池中同时检查多个目标路径；
+    结果与默认引擎的完整遍历相同，阈值查询时给出的是子树中确切的最新修改时间
+    :param guard: ScanGuard, 时间预算和进度，每个目标路径使用其for_root的副本
+    :return results: list[ScanResult], 检查结果，顺序与path_list一致
+    """
+    since_ns = _to_ns(since)
+    guard = ScanGuard() if guard is None else guard
+
+    def check(path):
+        return _numpy_latest(path, since_ns, stats, selection,
+                             guard.for_root())
+    if (workers or 1) == 1:
+        return [check(path) for path in path_list]
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(check, path_list))
+
+# 以目标路径为单位整体调度的引擎，只能通过multi_check使用
+PARALLEL_ENGINES = {
+    'process': _process_check,
+    'numpy': _numpy_check,
+}
+
+def _root_key(path):
+    """目标路径所指的物理文件夹(st_dev, st_ino)，无法stat时为路径本身"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return path
+    return st.st_dev, st.st_ino
+
+def unique_roots(path_list):
+    """按物理文件夹去除重复的目标路径，保留第一次出现的写法，顺序与path_list一致；
+    如'/data'、'/data/'和指向它的符号链接只保留第一个"""
+    seen = set()
+    roots = []
+    for path in path_list:
+        key = _root_key(path)
+        if key not in seen:
+            seen.add(key)
+            roots.append(path)
+    return roots
+
+def _nest_roots(path_list):
+    """按realpath找出嵌套在其他目标路径之下的目标路径
+    :return plan: list[(str, dict)], 最外层的目标路径及其下嵌套的目标路径组成的前缀树，顺序与path_list一致；
+        前缀树以各层文件夹名为键，键''对应的值为该层作为目标路径时的原始写法；realpath重复的目标路径单独检查
+    """
+    first = {}
+    repeated = []
+    for path in path_list:
+        real = os.path.realpath(path)
+        if real in first:
+            repeated.append(path)
+        else:
+            first[real] = path
+    outermost = {}
+    for real in first:
+        ancestor, head = None, real
+        while os.path.dirname(head) != head:
+            head = os.path.dirname(head)
+            if head in first:
+                ancestor = head
+        outermost[real] = ancestor
+    tries = {real: {} for real, ancestor in outermost.items()
+             if ancestor is None}
+    for real, path in first.items():
+        ancestor = outermost[real]
+        if ancestor is not None:
+            node = tries[ancestor]
+            for name in os.path.relpath(real, ancestor).split(os.sep):
+                node = node.setdefault(name, {})
+            node[''] = path
+    return ([(first[real], trie) for real, trie in tries.items()]
+            + [(path, None) for path in repeated])
+
+def _trie_roots(node):
+    """前缀树中最上层的各个嵌套目标路径及其下的前缀树"""
+    for name, child in node.items():
+        if not name:
+            continue
+        if '' in child:
+            yield child[''], {key: value for key, value in child.items()
+                              if key}
+        else:
+            yield from _trie_roots(child)
+
+def _check_paths(path_list):
+    """检查所有目标路径是否有效"""
+    for path in path_list:
+        if not os.path.exists(path) or not os.path.isdir(path):
+            raise FileNotFoundError(f"{path} is not a valid directory")
+
+def _prepare_engine(engine, workers, index, pruner=None, stats=None,
+                    policy=None, scheduled=False, depth=1):
+    """检查引擎、线程数、排除规则、统计、遍历策略、按设备调度和报告层数，提供索引时返回基于索引遍历子文件夹的函数；
+    未安装NumPy时numpy引擎退回到默认引擎"""
+    if engine not in ENGINES and engine not in PARALLEL_ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    if engine == 'numpy':
+        if _load_numpy() is None:
+            engine = DEFAULT_ENGINE
+        elif pruner is not None or policy is not None:
+            raise ValueError("The numpy engine does not support exclusion "
+                             "filters, following symlinks, dedup or "
+                             "--one-file-system")
+    if workers is not None and workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+    if pruner is not None and (index is not None
+                               or engine in ('recursive', 'fd')):
+        raise ValueError("Exclusion filters are not supported by the "
+                         "recursive and fd engines or the index")
+    if stats is not None and (index is not None or engine == 'recursive'):
+        raise ValueError("Stats are not supported by the recursive engine "
+                         "or the index")
+    if policy is not None:
+        if index is not None or engine in ('recursive', 'fd'):
+            raise ValueError("Following symlinks, dedup and "
+                             "--one-file-system are not supported by the "
+                             "recursive and fd engines or the index")
+        if policy.dedup and (pruner is not None or engine in PARALLEL_ENGINES):
+            raise ValueError("Dedup cannot be combined with exclusion filters "
+                             f"or the {engine} engine")
+    if scheduled and engine in PARALLEL_ENGINES:
+        raise ValueError("Per-device limits are not supported by the "
+                         f"{engine} engine")
+    if depth < 1:
+        raise ValueError(f"depth must be at least 1, got {depth}")
+    if depth > 1 and (pruner is not None or engine in PARALLEL_ENGINES):
+        raise ValueError("--depth cannot be combined with exclusion filters "
+                         f"or the {engine} engine")
+    if index is not None:
+        if engine in PARALLEL_ENGINES or (workers or 1) > 1:
+            raise ValueError("The index only supports serial scanning")
+        return index.subtree_latest_ns
+    return engine
+
+def _show_progress(progress, stop, interval=0.5):
+    """在后台线程中每隔interval秒刷新进度条，直到stop被设置；有预计的条目数时由tqdm按其估计剩余时间
+    :param progress: ScanProgress, 检查中累加的进度
+    :param stop: threading.Event, 检查结束时设置
+    """
+    from tqdm import tqdm
+    try:
+        pbar = tqdm(total=progress.expected_entries, unit='entries',
+                    unit_scale=True)
+    except AttributeError:
+        # 没有标准错误输出（如使用pythonw运行）时不显示进度条
+        return
+    try:
+        while True:
+            stopped = stop.wait(interval)
+            pbar.update(progress.entries - pbar.n)
+            pbar.set_postfix_str(f"{progress.rates()[0]:,.0f} dirs/s")
+            if stopped:
+                return
+    finally:
+        pbar.close()
+
+@contextmanager
+def _progress_shown(progress):
+    """在with块执行期间于后台线程中显示进度条，见_show_progress；progress为None时不显示
+    :param progress: ScanProgress, 检查中累加的进度
+    """
+    if progress is None:
+        yield
+        return
+    stop = threading.Event()
+    display = threading.Thread(target=_show_progress, args=(progress, stop),
+                               daemon=True)
+    display.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        display.join()
+
+def _as_progress(progress):
+    """将bool|ScanProgress形式的progress参数转换为ScanProgress或None"""
+    if progress is True:
+        return ScanProgress()
+    if progress is False:
+        return None
+    return progress
+
+def multi_check(path_list, engine=DEFAULT_ENGINE, workers=None, index=None,
+                since=None, exclude=None, gitignore=False, stats=None,
+                follow_symlinks=False, dedup=False, one_file_system=False,
+                per_device=None, device_limits=None, depth=1, limit=None,
+                offset=0, oldest=False, progress=True, timeout=None,
+                root_timeout=None):
+    """检查多个目标路径，是scan的同步封装，不能在正在运行的事件循环中调用；
+    指向同一物理文件夹的目标路径只检查一次，嵌套在其他目标路径之下的目标路径与外层共用一次遍历
+    :param path_list: list[str], 目标路径列表
+    :param engine: str, 遍历子文件夹所用的引擎，见ENGINES和PARALLEL_ENGINES
+    :param workers: int, 并行遍历子文件夹的线程数（进程池引擎中为进程数），
+        默认为None，即串行遍历（进程池引擎中为CPU核数）
+    :param index: MtimeIndex, 持久化索引，提供时借助索引增量遍历子文件夹，仅支持串行遍历
+    :param since: datetime|float, 阈值时间，提供时只查找在该时刻之后有变化的直接子条目，
+        见get_latest_modification_time
+    :param exclude: Iterable[str]|ExcludeMatcher, gitignore风格的排除规则，见get_latest_modification_time
+    :param gitignore: bool, 是否同时遵循遍历时遇到的.gitignore文件
+    :param stats: ScanStats, 提供时记录计数和耗时，见get_latest_modification_time
+    :param follow_symlinks: bool, 是否进入指向文件夹的符号链接，见get_latest_modification_time
+    :param dedup: bool, 是否每个物理文件夹只遍历一次，见get_latest_modification_time
+    :param one_file_system: bool, 是否不跨越文件系统，见get_latest_modification_time
+    :param per_device: int, 每个设备上同时遍历的直接子文件夹数上限，见scan
+    :param device_limits: dict[str, int], 单独指定的各设备的上限，见scan
+    :param depth: int, 报告的层数，见scan
+    :param limit: int, 每个文件夹最多输出的条目数，见get_latest_modification_time
+    :param offset: int, 跳过排序后的前offset个条目
+    :param oldest: bool, 是否按修改时间从旧到新排序
+    :param progress: bool|ScanProgress, 是否显示进度条，显示已列出的条目数、每秒列出的文件夹数和条目数，
+        提供ScanProgress时以其expected_entries（如上一次检查的条目数）估计剩余时间，检查后可从中读取本次的条目数
+    :param timeout: float, 整个检查的时间预算（秒），见scan
+    :param root_timeout: float, 每个目标路径的时间预算（秒），见scan
+    :return results: list[ScanResult], 检查结果，顺序与去除重复后的path_list一致
+    """
+    pruner = _make_pruner(exclude, gitignore)
+    policy = _make_policy(follow_symlinks, dedup, one_file_system)
+    engine = _prepare_engine(engine, workers, index, pruner, stats, policy,
+                             per_device is not None or bool(device_limits),
+                             depth)
+    path_list = unique_roots(path_list)
+    _check_paths(path_list)
+    progress = _as_progress(progress)
+    guard = ScanGuard(timeout, root_timeout, progress)
+
+    async def collect():
+        results = {}
+        async for result in scan(path_list, engine, workers, since=since,
+                                 exclude=pruner and pruner.matcher,
+                                 gitignore=gitignore, stats=stats,
+                                 follow_symlinks=follow_symlinks,
+                                 dedup=dedup, one_file_system=one_file_system,
+                                 per_device=per_device,
+                                 device_limits=device_limits, depth=depth,
+                                 limit=limit, offset=offset, oldest=oldest,
+                                 share_nested=True, timeout=timeout,
+                                 root_timeout=root_timeout,
+                                 progress=guard.progress):
+            results[result.path] = result
+        return results
+
+    with _progress_shown(progress):
+        if engine in PARALLEL_ENGINES:
+            return PARALLEL_ENGINES[engine](
+                list(path_list), workers, since, pruner=pruner, stats=stats,
+                policy=policy,
+                selection=_make_selection(limit, offset, oldest),
+                guard=guard)
+        import asyncio
+        results = asyncio.run(collect())
+    return [results[path] for path in path_list]
+
+def watch_results(watcher):
+    """将Watcher当前维护的状态转换为检查结果，用于按需获取最新的排序
+    :param watcher: Watcher, 正在监视的对象
+    :return results: list[ScanResult], 检查结果
+    """
+    results = []
+    for root in watcher.path_list:
+        result = ScanResult(root)
+        for mtime_ns, name, is_dir in watcher.ranking(root):
+            result.append(mtime_ns, name, is_dir)
+        results.append(result)
+    return results
@@ -0,0 +1,247 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""gitignore风格的排除规则
+
+规则只在构造时编译一次：不含通配符的文件名放入集合，其余规则合并为少量正则表达式，
+遍历时在进入文件夹之前判断，被排除的子树既不会被列出也不会被stat"""
+
+import os
+import re
+import threading
+
+GITIGNORE = '.gitignore'
+
+
+def _translate(pattern):
+    """将gitignore风格的通配符转换为正则表达式"""
+    i, n = 0, len(pattern)
+    parts = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**/', i):
+                parts.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                parts.append('.*')
+                i += 2
+                continue
+            parts.append('[^/]*')
+        elif c == '?':
+            parts.append('[^/]')
+        elif c == '[':
+            j = pattern.find(']', i + 2)
+            if j < 0:
+                parts.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body[0] == '!':
+                    body = '^' + body[1:]
+                parts.append('[' + body.replace('\\', '\\\\') + ']')
+                i = j
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return ''.join(parts)
+
+
+def _combine(regexes):
+    if not regexes:
+        return None
+    return re.compile('(?:' + '|'.join(regexes) + r')\Z', re.S)
+
+
+class ExcludeMatcher:
+    """编译后的一组gitignore风格规则
+
+    规则语义与gitignore一致：'#'开头为注释，'!'开头为重新包含，'/'结尾只匹配文件夹，
+    不含'/'的规则匹配任意层级的条目名，含'/'的规则相对于规则所在的文件夹匹配"""
+
+    def __init__(self, patterns):
+        """
+        :param patterns: Iterable[str], 规则列表，每项对应gitignore中的一行
+        """
+        # (正则, 是否只匹配文件夹, 是否匹配相对路径, 是否为重新包含, 不含通配符时的原文)
+        self.rules = []
+        for line in patterns:
+            rule = self._parse(line)
+            if rule is not None:
+                self.rules.append(rule)
+        self.negated = any(rule[3] for rule in self.rules)
+        # 任意规则需要相对路径时，遍历时才需要维护相对路径
+        self.needs_path = any(rule[2] for rule in self.rules)
+
+        # 没有重新包含规则时，排除与否和规则顺序无关，可合并为集合和少量正则
+        names, dir_names = set(), set()
+        name_res, dir_name_res, path_res, dir_path_res = [], [], [], []
+        for regex, dir_only, anchored, _, literal in self.rules:
+            source = regex.pattern[:-2]
+            if literal is not None and not anchored:
+                (dir_names if dir_only else names).add(literal)
+            elif anchored:
+                (dir_path_res if dir_only else path_res).append(source)
+            else:
+                (dir_name_res if dir_only else name_res).append(source)
+        self._names = frozenset(names)
+        self._dir_names = frozenset(dir_names)
+        self._name_re = _combine(name_res)
+        self._dir_name_re = _combine(dir_name_res)
+        self._path_re = _combine(path_res)
+        self._dir_path_re = _combine(dir_path_res)
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8', errors='surrogateescape') as f:
+            return cls(f.read().splitlines())
+
+    @staticmethod
+    def _parse(line):
+        if line.endswith('\n'):
+            line = line[:-1]
+        # 去掉未转义的行尾空格
+        stripped = line.rstrip(' ')
+        if stripped.endswith('\\') and len(stripped) < len(line):
+            stripped += ' '
+        line = stripped
+        if not line or line.startswith('#'):
+            return None
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:]
+        elif line.startswith('\\#') or line.startswith('\\!'):
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            return None
+        anchored = '/' in line
+        line = line.lstrip('/')
+        literal = None if any(c in line for c in '*?[\\') else line
+        return (re.compile(_translate(line) + r'\Z', re.S), dir_only, anchored,
+                negated, literal)
+
+    def match(self, rel_path, name, is_dir):
+        """判断条目是否被排除
+        :param rel_path: str, 条目相对于规则所在文件夹的路径，以'/'分隔；needs_path为False时可为None
+        :param name: str, 条目名
+        :param is_dir: bool, 是否为文件夹
+        :return: True表示排除，False表示被'!'规则重新包含，None表示没有规则匹配
+        """
+        if not self.negated:
+            if name in self._names or (is_dir and name in self._dir_names):
+                return True
+            if self._name_re is not None and self._name_re.match(name):
+                return True
+            if is_dir and self._dir_name_re is not None \
+                    and self._dir_name_re.match(name):
+                return True
+            if rel_path is not None:
+                if self._path_re is not None and self._path_re.match(rel_path):
+                    return True
+                if is_dir and self._dir_path_re is not None \
+                        and self._dir_path_re.match(rel_path):
+                    return True
+            return None
+        # 存在重新包含规则时，按gitignore的语义以最后一条匹配的规则为准
+        for regex, dir_only, anchored, negated, _ in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            target = rel_path if anchored else name
+            if target is not None and regex.match(target):
+                return not negated
+        return None
+
+
+def is_excluded(chain, rel_path, name, is_dir):
+    """按规则链判断条目是否被排除，越深的文件夹中的规则优先级越高
+    :param chain: tuple[(str, ExcludeMatcher)], (规则所在文件夹相对于目标路径的路径, 规则)，由浅到深排列
+    :param rel_path: str, 条目相对于目标路径的路径，以'/'分隔
+    """
+    for base, matcher in reversed(chain):
+        if rel_path is not None and base:
+            sub_path = rel_path[len(base) + 1:]
+        else:
+            sub_path = rel_path
+        decision = matcher.match(sub_path, name, is_dir)
+        if decision is not None:
+            return decision
+    return False
+
+
+def extend_chain(chain, dir_path, rel_path):
+    """若文件夹中存在.gitignore，则将其规则加入规则链"""
+    gitignore = os.path.join(dir_path, GITIGNORE)
+    try:
+        matcher = ExcludeMatcher.from_file(gitignore)
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        return chain
+    if not matcher:
+        return chain
+    return chain + ((rel_path, matcher),)
+
+
+def read_patterns(path):
+    """读取--exclude-from指定的规则文件"""
+    with open(path, encoding='utf-8', errors='surrogateescape') as f:
+        return f.read().splitlines()
+
+
+class Pruner:
+    """一个目标路径的排除规则链及被排除条目的统计
+
+    同一目标路径下的各子文件夹可能在多个线程中同时遍历，统计通过锁累加；
+    传给进程池时只序列化规则，统计由协调者汇总"""
+
+    def __init__(self, matcher=None, gitignore=False):
+        """
+        :param matcher: ExcludeMatcher, --exclude和--exclude-from给出的规则，相对于目标路径匹配
+        :param gitignore: bool, 是否遵循遍历时遇到的.gitignore文件
+        """
+        self.matcher = matcher if matcher else None
+        self.gitignore = gitignore
+        self.root = None
+        # 目标路径下的规则链，见is_excluded
+        self.chain = ((('', self.matcher),) if self.matcher is not None
+                      else ())
+        self.entries = 0
+        self.dirs = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return self.matcher, self.gitignore, self.root, self.chain
+
+    def __setstate__(self, state):
+        self.matcher, self.gitignore, self.root, self.chain = state
+        self.entries = 0
+        self.dirs = 0
+        self._lock = threading.Lock()
+
+    def for_root(self, root):
+        """为一个目标路径创建独立统计的副本"""
+        pruner = Pruner(self.matcher, self.gitignore)
+        pruner.root = root
+        return pruner
+
+    def enter(self, chain, dir_path, rel_path, names):
+        """进入文件夹时，若其中有.gitignore且需要遵循，则返回加入其规则后的规则链
+        :param names: Iterable[str], 文件夹中的条目名，用于避免为没有.gitignore的文件夹打开文件
+        """
+        if self.gitignore and GITIGNORE in names:
+            return extend_chain(chain, dir_path, rel_path)
+        return chain
+
+    def rel_path(self, path):
+        """子文件夹相对于目标路径的路径，以'/'分隔"""
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def count(self, entries, dirs):
+        with self._lock:
+            self.entries += entries
+            self.dirs += dirs
@@ -0,0 +1,272 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""图形界面，只在需要时由命令行入口导入"""
+
+import json
+import os
+import queue
+import sys
+import threading
+import tkinter as tk
+from concurrent.futures import CancelledError
+from tkinter import ttk, filedialog, messagebox
+
+import pyperclip
+
+from .core import MtimeTree, format_mtime
+from .render import render_json, render_text
+
+
+def gui():
+    def browse_folder():
+        folder_path = filedialog.askdirectory()
+        if folder_path:
+            path_entry.delete(0, tk.END)
+            path_entry.insert(0, folder_path)
+
+    # 最近一次检查的结果，复制和保存都基于它渲染，而不是解析界面中的内容
+    last_results = []
+    # 最近一次检查的MtimeTree，展开文件夹时从中取子树的最新修改时间
+    last_tree = []
+    # 当前检查的消息队列和取消事件，每次检查新建；后台线程通过队列向主线程发送消息，Tk只能在主线程中操作，
+    # 被取消或取代的旧线程仍可能写入自己的队列，但这些消息不再被处理
+    current = {}
+    # 是否已安排了下一次轮询，保证同一时刻只有一个轮询循环
+    polling = [False]
+
+    def insert_children(parent, result):
+        """在结果树的parent节点下插入一个文件夹的直接子条目，子文件夹插入占位节点以便展开"""
+        incomplete = set(result.incomplete or ())
+        for mtime_ns, name, is_dir in result:
+            path = os.path.join(result.path, name)
+            # 子树中有无法读取的条目时，显示的时间只是可读部分中最新的
+            text = f"{name} (incomplete)" if name in incomplete else name
+            item = result_tree.insert(parent, tk.END, iid=path, text=text,
+                                      values=(format_mtime(mtime_ns),))
+            if is_dir:
+                result_tree.insert(item, tk.END, text="...")
+
+    def expand(_event):
+        item = result_tree.focus()
+        children = result_tree.get_children(item)
+        # 只有尚未展开过的文件夹下是占位节点
+        if not last_tree or len(children) != 1 \
+                or result_tree.item(children[0], 'text') != "...":
+            return
+        result_tree.delete(children[0])
+        try:
+            insert_children(item, last_tree[0].children(item))
+        except OSError as e:
+            messagebox.showerror("Error", str(e))
+
+    def show_results(tree):
+        last_tree[:] = [tree]
+        result = tree.children()
+        last_results[:] = [result]
+        result_tree.delete(*result_tree.get_children())
+        insert_children('', result)
+        counts = f"{tree.dirs} folders, {tree.entries} entries"
+        if tree.guard.errors:
+            counts += f", {len(tree.guard.errors)} unreadable"
+        status_label.config(text=f"Status: Check completed ({counts}).")
+
+    def set_running(running):
+        state = tk.DISABLED if running else tk.NORMAL
+        for button in (check_button, check_script_button):
+            button.config(state=state)
+        cancel_button.config(state=tk.NORMAL if running else tk.DISABLED)
+        if running:
+            progress_bar.start(10)
+        else:
+            progress_bar.stop()
+
+    def worker(path, messages, cancel):
+        def progress(dirs, entries):
+            messages.put(('progress', (dirs, entries)))
+        try:
+            messages.put(('done', MtimeTree(path).scan(cancel, progress)))
+        except CancelledError:
+            messages.put(('cancelled', None))
+        except Exception as e:
+            messages.put(('error', e))
+
+    def schedule_poll():
+        if not polling[0]:
+            polling[0] = True
+            root.after(100, poll)
+
+    def poll():
+        """在主线程中处理当前检查的后台线程的消息，检查结束前每100ms轮询一次"""
+        polling[0] = False
+        if not current:
+            return
+        messages = current['messages']
+        finished = False
+        while True:
+            try:
+                kind, data = messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                status_label.config(text=f"Status: Checking... {data[0]} "
+                                         f"folders, {data[1]} entries")
+                continue
+            finished = True
+            current.clear()
+            set_running(False)
+            if kind == 'done':
+                show_results(data)
+            elif kind == 'cancelled':
+                status_label.config(text="Status: Check cancelled.")
+            else:
+                messagebox.showerror("Error", str(data))
+                status_label.config(text="Status: Error occurred.")
+            break
+        if not finished:
+            schedule_poll()
+
+    def start_check(path):
+        if current:
+            # 仍在运行的旧线程不再需要，其结果也不会被显示
+            current['cancel'].set()
+        messages = queue.Queue()
+        cancel = threading.Event()
+        current.update(messages=messages, cancel=cancel)
+        set_running(True)
+        status_label.config(text=f"Status: Checking {path}...")
+        threading.Thread(target=worker, args=(path, messages, cancel),
+                         daemon=True).start()
+        schedule_poll()
+
+    def check_modification_time():
+        target_path = path_entry.get()
+        if not target_path:
+            messagebox.showerror("Error", "Please select a folder.")
+            return
+        if not os.path.isdir(target_path):
+            messagebox.showerror("Error",
+                                 f"{target_path} is not a valid directory")
+            return
+        start_check(target_path)
+
+    def check_script_folder_time():
+        start_check(os.path.dirname(os.path.realpath(sys.executable)))
+
+    def cancel_check():
+        if current:
+            # 后台线程会尽快停止，不必等待它，此后它的消息都被忽略，可以立即开始新的检查
+            current['cancel'].set()
+            current.clear()
+            set_running(False)
+            status_label.config(text="Status: Check cancelled.")
+
+    def copy_to_clipboard():
+        if last_results:
+            pyperclip.copy(render_text(last_results))
+            messagebox.showinfo("Info", "Result copied to clipboard.")
+        else:
+            messagebox.showwarning("Warning", "Nothing to copy.")
+
+    def save_as_txt():
+        if last_results:
+            filename = filedialog.asksaveasfilename(
+                defaultextension=".txt",
+                filetypes=[("Text files", "*.txt")]
+            )
+            if filename:
+                with open(filename, 'w', encoding='utf-8') as f:
+                    f.write(render_text(last_results))
+                messagebox.showinfo("Info", f"Result saved as {filename}.")
+        else:
+            messagebox.showwarning("Warning", "Nothing to save.")
+
+    def save_as_json():
+        if last_results:
+            filename = filedialog.asksaveasfilename(
+                defaultextension=".json",
+                filetypes=[("JSON files", "*.json")]
+            )
+            if filename:
+                with open(filename, 'w', encoding='utf-8') as f:
+                    json.dump(render_json(last_results), f,
+                              ensure_ascii=False, indent=4)
+                messagebox.showinfo("Info", f"Result saved as {filename}.")
+        else:
+            messagebox.showwarning("Warning", "Nothing to save.")
+
+    root = tk.Tk()
+    root.title("Modtime Pecker - Latest Modification Time Checker")
+    root.geometry('800x600')
+
+    # 文件夹路径
+    folder_frame = ttk.Frame(root)
+    folder_frame.pack(pady=10)
+
+    ttk.Label(folder_frame, text="Folder Path:").grid(
+        row=0, column=0, padx=5, pady=5)
+    path_entry = ttk.Entry(folder_frame, width=50)
+    path_entry.grid(row=0, column=1, padx=5, pady=5)
+
+    browse_button = ttk.Button(folder_frame,
+                               text="Browse",
+                               command=browse_folder)
+    browse_button.grid(row=0, column=2, padx=5, pady=5)
+
+    # 功能按钮
+    action_frame = ttk.Frame(root)
+    action_frame.pack(pady=10)
+
+    check_button = ttk.Button(action_frame,
+                              text="Check Modification Time",
+                              command=check_modification_time)
+    check_button.grid(row=0, column=0, padx=5, pady=5)
+
+    check_script_button = ttk.Button(action_frame,
+                                     text="Check Script Folder Time",
+                                     command=check_script_folder_time)
+    check_script_button.grid(row=0, column=1, padx=5, pady=5)
+
+    copy_button = ttk.Button(action_frame,
+                             text="Copy Result",
+                             command=copy_to_clipboard)
+    copy_button.grid(row=0, column=2, padx=5, pady=5)
+
+    save_txt_button = ttk.Button(action_frame,
+                                 text="Save as TXT",
+                                 command=save_as_txt)
+    save_txt_button.grid(row=0, column=3, padx=5, pady=5)
+
+    save_json_button = ttk.Button(action_frame,
+                                  text="Save as JSON",
+                                  command=save_as_json)
+    save_json_button.grid(row=0, column=4, padx=5, pady=5)
+
+    cancel_button = ttk.Button(action_frame,
+                               text="Cancel",
+                               command=cancel_check,
+                               state=tk.DISABLED)
+    cancel_button.grid(row=0, column=5, padx=5, pady=5)
+
+    # 结果显示框，每个文件夹可以展开查看其直接子条目
+    result_frame = ttk.Frame(root)
+    result_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    ttk.Label(result_frame, text="Result:").pack(anchor=tk.W, padx=5, pady=5)
+    result_tree = ttk.Treeview(result_frame, columns=('mtime',))
+    result_tree.heading('#0', text="Name")
+    result_tree.heading('mtime', text="Latest Modification Time")
+    result_tree.column('mtime', width=180, stretch=False)
+    scrollbar = ttk.Scrollbar(result_frame, orient=tk.VERTICAL,
+                              command=result_tree.yview)
+    result_tree.configure(yscrollcommand=scrollbar.set)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    result_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+    result_tree.bind('<<TreeviewOpen>>', expand)
+
+    # 状态栏和进度条
+    status_label = ttk.Label(root, text="Status: Ready")
+    status_label.pack(side=tk.BOTTOM, padx=10, pady=5)
+    progress_bar = ttk.Progressbar(root, mode='indeterminate')
+    progress_bar.pack(side=tk.BOTTOM, fill=tk.X, padx=10)
+
+    root.mainloop()
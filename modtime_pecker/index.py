@@ -0,0 +1,170 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""持久化的修改时间索引，用于增量重新检查
+
+索引以SQLite保存每个文件夹自身的修改时间和直接子条目列表。
+再次检查时，若文件夹自身的修改时间未变，说明其中没有增删或重命名条目，
+可直接复用缓存的条目列表而跳过scandir，只需重新stat已知的文件并进入已知的子文件夹；
+修改子文件夹中的文件不会改变上层文件夹的修改时间，因此不缓存子树中最新的修改时间，
+每个文件仍需重新stat"""
+
+import json
+import os
+import sqlite3
+import time
+
+# 修改时间距离记录时刻不足该值（ns）的文件夹不复用缓存，
+# 避免在文件系统时间戳精度内发生的修改被漏掉
+RACY_NS = 2 * 10**9
+
+
+class MtimeIndex:
+    """基于SQLite的修改时间索引，可作为检查子文件夹的引擎使用，与默认的遍历一样不进入符号链接"""
+
+    def __init__(self, path, rebuild=False):
+        """
+        :param path: str, 索引文件路径，所在文件夹不存在时自动创建
+        :param rebuild: bool, 是否清空已有索引后重新建立
+        """
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        self.path = path
+        # 检查在线程池中进行，但索引只用于串行遍历，同一时刻只有一个线程访问连接
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            "path BLOB PRIMARY KEY, "
+            "mtime_ns INTEGER NOT NULL, "
+            "scanned_ns INTEGER NOT NULL, "
+            "entries TEXT NOT NULL)")
+        if rebuild:
+            self.conn.execute("DELETE FROM dirs")
+        # 本次运行中实际执行的和因复用缓存而省去的scandir次数
+        self.scandir_calls = 0
+        self.scandir_saved = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def _lookup(self, key):
+        return self.conn.execute(
+            "SELECT mtime_ns, scanned_ns, entries FROM dirs WHERE path = ?",
+            (key,)).fetchone()
+
+    def _forget(self, key):
+        """删除某个文件夹及其所有后代文件夹的记录"""
+        sep = os.fsencode(os.sep)
+        upper = key + bytes([sep[0] + 1])
+        self.conn.execute(
+            "DELETE FROM dirs WHERE path = ? OR (path > ? AND path < ?)",
+            (key, key + sep, upper))
+
+    def _list(self, path, guard=None):
+        """列出文件夹的直接子条目，文件夹自身的修改时间未变时复用缓存的条目列表；
+        提供guard（ScanGuard）时，在scandir和stat之间消失或无法stat的条目记录后跳过
+        :return (dir_mtime_ns, scanned_ns, listing, complete): listing为list[(name, is_dir, mtime_ns)]，
+            complete为是否没有跳过任何条目
+        """
+        key = os.fsencode(path)
+        scanned_ns = time.time_ns()
+        dir_mtime_ns = os.stat(path).st_mtime_ns
+        row = self._lookup(key)
+        if row is not None and row[0] == dir_mtime_ns \
+                and dir_mtime_ns < row[1] - RACY_NS:
+            try:
+                listing = [(name, is_dir,
+                            os.stat(os.path.join(path, name),
+                                    follow_symlinks=False).st_mtime_ns)
+                           for name, is_dir in json.loads(row[2])]
+            except FileNotFoundError:
+                # 条目在两次stat之间被删除，退回到scandir
+                pass
+            else:
+                self.scandir_saved += 1
+                return dir_mtime_ns, row[1], listing, True
+
+        self.scandir_calls += 1
+        listing = []
+        complete = True
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    listing.append((
+                        entry.name, entry.is_dir(follow_symlinks=False),
+                        entry.stat(follow_symlinks=False).st_mtime_ns))
+                except OSError as e:
+                    if guard is None:
+                        raise
+                    guard.error(entry.path, e)
+                    complete = False
+        if row is not None:
+            # 已不存在的子文件夹，连同其后代的记录一并删除
+            names = {name for name, is_dir, _ in listing if is_dir}
+            for name, is_dir in json.loads(row[2]):
+                if is_dir and name not in names:
+                    self._forget(os.fsencode(os.path.join(path, name)))
+        return dir_mtime_ns, scanned_ns, listing, complete
+
+    def _store(self, path, dir_mtime_ns, scanned_ns, listing):
+        entries = json.dumps([(name, is_dir) for name, is_dir, _ in listing])
+        # 指明列名，使旧版本建立的带有latest_ns列的索引仍可使用
+        self.conn.execute(
+            "INSERT OR REPLACE INTO dirs (path, mtime_ns, scanned_ns, entries) "
+            "VALUES (?, ?, ?, ?)",
+            (os.fsencode(path), dir_mtime_ns, scanned_ns, entries))
+
+    def subtree_latest_ns(self, path, since_ns=None, guard=None):
+        """使用显式栈后序遍历指定路径下的整棵子树，返回所有条目中最新的修改时间，空文件夹返回None
+        遍历时更新每个文件夹的索引记录；
+        为了保持索引记录完整，即使提供了since_ns也总是遍历整棵子树；
+        提供guard（ScanGuard）时记录无法列出的文件夹和无法stat的条目，超过截止时间后停止，
+        有错误或未遍历完的文件夹及其祖先不更新记录"""
+        def open_frame(dir_path):
+            try:
+                dir_mtime_ns, scanned_ns, listing, complete = self._list(
+                    dir_path, guard)
+            except OSError as e:
+                if guard is None:
+                    raise
+                guard.error(dir_path, e)
+                return [dir_path, None, None, [], None, iter(()), False]
+            if guard is not None:
+                guard.tick(len(listing))
+            latest = max((mtime_ns for _, _, mtime_ns in listing),
+                         default=None)
+            subdirs = iter([os.path.join(dir_path, name)
+                            for name, is_dir, _ in listing if is_dir])
+            return [dir_path, dir_mtime_ns, scanned_ns, listing, latest,
+                    subdirs, complete]
+
+        stack = [open_frame(path)]
+        while True:
+            frame = stack[-1]
+            subdir = next(frame[5], None)
+            if subdir is not None:
+                if guard is not None and guard.expired():
+                    guard.timed_out = True
+                    return max((frame[4] for frame in stack
+                                if frame[4] is not None), default=None)
+                stack.append(open_frame(subdir))
+                continue
+            # 该文件夹的子树已遍历完，记录后将最新修改时间回传给上一级文件夹
+            stack.pop()
+            (dir_path, dir_mtime_ns, scanned_ns, listing, latest, _,
+             complete) = frame
+            if complete:
+                self._store(dir_path, dir_mtime_ns, scanned_ns, listing)
+            if not stack:
+                return latest
+            parent = stack[-1]
+            if not complete:
+                parent[6] = False
+            if latest is not None and (parent[4] is None or latest > parent[4]):
+                parent[4] = latest
@@ -0,0 +1,391 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""将检查结果渲染为文本、JSON、NDJSON或二进制报告，以及保存到剪贴板和文件
+
+pyperclip只在保存到剪贴板时才导入"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+from .report import ReportWriter, write_report
+
+from .core import (DEFAULT_ENGINE, PARALLEL_ENGINES, ScanGuard, _as_progress,
+                   _check_paths, _make_policy, _make_pruner, _make_selection,
+                   _prepare_engine, _progress_shown, format_mtime, scan,
+                   unique_roots)
+
+
+def _render_nested(result, parts, linesep, indent=''):
+    """多层报告中，每个子文件夹的结果缩进列在其条目之下"""
+    subresults = result.subresults or {}
+    for mtime_ns, name, _ in result:
+        parts.append(f"{indent}{format_mtime(mtime_ns)} - {name}{linesep}")
+        child = subresults.get(name)
+        if child is not None:
+            _render_nested(child, parts, linesep, indent + '    ')
+            if child.omitted:
+                parts.append(f"{indent}    Omitted {child.omitted} "
+                             f"entries.{linesep}")
+
+def render_text(results, linesep=os.linesep, stats=None):
+    """将检查结果渲染为文本
+    :param stats: ScanStats, 提供时分别记录格式化时间戳和拼接字符串的耗时，多层报告只记录拼接的耗时
+    """
+    parts = []
+    for result in results:
+        start = time.perf_counter_ns()
+        if result.subresults is None:
+            stamps = [format_mtime(mtime_ns) for mtime_ns in result.mtimes]
+        built = time.perf_counter_ns()
+        if result.since_ns is not None:
+            since = format_mtime(result.since_ns)
+            parts.append(f"In {result.path} (changed since {since}): {linesep}")
+        else:
+            parts.append(f"In {result.path}: {linesep}")
+        if result.subresults is None:
+            for stamp, name in zip(stamps, result.names):
+                parts.append(f"{stamp} - {name}{linesep}")
+        else:
+            _render_nested(result, parts, linesep)
+        if stats is not None:
+            stats.add_phase('format', built - start)
+            stats.add_phase('render', time.perf_counter_ns() - built)
+        if result.pruned_entries is not None:
+            parts.append(f"Pruned {result.pruned_entries} entries "
+                         f"({result.pruned_dirs} directories).{linesep}")
+        if result.omitted:
+            parts.append(f"Omitted {result.omitted} entries.{linesep}")
+        if result.mount_skipped:
+            parts.append(f"Skipped at mount boundaries: "
+                         f"{', '.join(result.mount_skipped)}{linesep}")
+        if result.timed_out:
+            parts.append(f"Timed out before the scan finished.{linesep}")
+        if result.incomplete:
+            parts.append(f"Incomplete (times may be older than actual): "
+                         f"{', '.join(result.incomplete)}{linesep}")
+        if result.errors:
+            parts.append(f"Errors ({len(result.errors)}):{linesep}")
+            for path, message in result.errors:
+                parts.append(f"    {path}: {message}{linesep}")
+        parts.append(linesep)
+    return "".join(parts)
+
+def _json_entries(result):
+    """多层报告中，展开的子文件夹的条目列在其"children"中"""
+    if result.subresults is None:
+        return [{format_mtime(mtime_ns): name} for mtime_ns, name, _ in result]
+    entries = []
+    for mtime_ns, name, _ in result:
+        entry = {format_mtime(mtime_ns): name}
+        child = result.subresults.get(name)
+        if child is not None:
+            entry["children"] = _json_entries(child)
+        entries.append(entry)
+    return entries
+
+def render_json(results):
+    """将检查结果转换为可json序列化的字典"""
+    json_dict = {}
+    for result in results:
+        json_dict[result.path] = _json_entries(result)
+    return json_dict
+
+def _json_item(result, first, indent=4):
+    """render_json中一个目标路径对应的json片段，first为True时包含开头的'{'"""
+    pad = ' ' * indent
+    body = json.dumps(_json_entries(result), ensure_ascii=False,
+                      indent=indent).replace('\n', '\n' + pad)
+    path = json.dumps(result.path, ensure_ascii=False)
+    return f"{'{' if first else ','}\n{pad}{path}: {body}"
+
+def _json_end(count):
+    return '\n}' if count else '{}'
+
+def json_chunks(results, indent=4):
+    """逐个目标路径产出json文本片段，拼接后与json.dumps(render_json(results), indent=indent)相同，
+    results可以是惰性的迭代器，不需要先构建整个字典"""
+    count = 0
+    for result in results:
+        yield _json_item(result, not count, indent)
+        count += 1
+    yield _json_end(count)
+
+def _ndjson_entries(result):
+    if result.subresults is None:
+        return [{"mtime": format_mtime(mtime_ns), "mtime_ns": mtime_ns,
+                 "name": name, "is_dir": bool(is_dir)}
+                for mtime_ns, name, is_dir in result]
+    entries = []
+    for mtime_ns, name, is_dir in result:
+        entry = {"mtime": format_mtime(mtime_ns), "mtime_ns": mtime_ns,
+                 "name": name, "is_dir": bool(is_dir)}
+        child = result.subresults.get(name)
+        if child is not None:
+            entry["children"] = _ndjson_entries(child)
+            if child.omitted is not None:
+                entry["omitted"] = child.omitted
+        entries.append(entry)
+    return entries
+
+def ndjson_records(result, per_child=False):
+    """将一个目标路径的检查结果转换为NDJSON记录，每个目标路径一条，或每个直接子条目一条；
+    多层报告中，每个目标路径一条时子文件夹的条目嵌套在其"children"中，每个条目一条时逐层输出，"path"为所在文件夹；
+    未遍历完的子文件夹在每个目标路径一条时列在"incomplete"中，每个条目一条时带有"incomplete": true"""
+    if per_child:
+        subresults = result.subresults or {}
+        incomplete = set(result.incomplete or ())
+        for mtime_ns, name, is_dir in result:
+            record = {"path": result.path, "mtime": format_mtime(mtime_ns),
+                      "mtime_ns": mtime_ns, "name": name,
+                      "is_dir": bool(is_dir)}
+            if name in incomplete:
+                record["incomplete"] = True
+            yield record
+            child = subresults.get(name)
+            if child is not None:
+                yield from ndjson_records(child, per_child)
+    else:
+        record = {"path": result.path, "entries": _ndjson_entries(result)}
+        if result.since_ns is not None:
+            record["since_ns"] = result.since_ns
+        if result.pruned_entries is not None:
+            record["pruned_entries"] = result.pruned_entries
+            record["pruned_dirs"] = result.pruned_dirs
+        if result.mount_skipped is not None:
+            record["mount_skipped"] = result.mount_skipped
+        if result.omitted is not None:
+            record["omitted"] = result.omitted
+        if result.errors is not None:
+            record["errors"] = [{"path": path, "error": message}
+                                for path, message in result.errors]
+        if result.incomplete is not None:
+            record["incomplete"] = result.incomplete
+        if result.timed_out:
+            record["timed_out"] = True
+        yield record
+
+def render_diff(changes, since_ns=None, linesep=os.linesep):
+    """将两个快照之间的差异渲染为文本
+    :param changes: Iterable[tuple], diff_snapshots产出的差异
+    :param since_ns: int, 较早的快照的检查时间
+    """
+    parts = []
+    if since_ns is not None:
+        parts.append(f"Changes since {format_mtime(since_ns)}:{linesep}")
+    current = None
+    for dir_path, name, kind, old_ns, new_ns, _ in changes:
+        if dir_path != current:
+            if current is not None:
+                parts.append(linesep)
+            parts.append(f"In {dir_path}: {linesep}")
+            current = dir_path
+        if kind == 'changed':
+            stamps = f"{format_mtime(old_ns)} -> {format_mtime(new_ns)}"
+        else:
+            stamps = format_mtime(old_ns if new_ns is None else new_ns)
+        parts.append(f"{kind:<8} {stamps} - {name}{linesep}")
+    if current is None:
+        parts.append(f"No changes.{linesep}")
+    return "".join(parts)
+
+def diff_records(changes):
+    """将两个快照之间的差异转换为NDJSON记录，每个差异一条"""
+    for dir_path, name, kind, old_ns, new_ns, is_dir in changes:
+        yield {"path": dir_path, "name": name, "change": kind,
+               "old_mtime_ns": old_ns, "new_mtime_ns": new_ns,
+               "is_dir": is_dir}
+
+def render_ranking(ranking, failures, linesep=os.linesep):
+    """将协调器合并后的排名渲染为文本
+    :param ranking: Iterable[tuple], agent.rank产出的条目
+    :param failures: dict[str, str], 失败的代理及其错误说明
+    """
+    parts = []
+    for agent, path, entry in ranking:
+        parts.append(f"{entry['mtime']} - {entry['name']} "
+                     f"(in {path} on {agent}){linesep}")
+    if not parts:
+        parts.append(f"No entries.{linesep}")
+    if failures:
+        parts.append(f"{linesep}Failed agents:{linesep}")
+        for agent, error in failures.items():
+            parts.append(f"{agent}: {error}{linesep}")
+    return "".join(parts)
+
+def ranking_records(ranking, failures):
+    """将协调器合并后的排名转换为NDJSON记录，每个条目一条，之后每个失败的代理一条"""
+    for agent, path, entry in ranking:
+        yield {"agent": agent, "path": path, "mtime": entry["mtime"],
+               "mtime_ns": entry["mtime_ns"], "name": entry["name"],
+               "is_dir": entry["is_dir"]}
+    for agent, error in failures.items():
+        yield {"agent": agent, "error": error}
+
+def save2clipboard(results):
+    """将结果保存到剪贴板"""
+    import pyperclip
+    pyperclip.copy(render_text(results))
+    msg = "The result has been copied to the clipboard."
+    print(msg)
+    return msg
+
+def save2txt(results):
+    """将结果以txt形式保存到脚本所在文件夹，使用时间戳作为文件名后缀"""
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    filename = f"modtime_{timestamp}.txt"
+    with open(filename, 'w') as f:
+        f.write(render_text(results))
+    msg = f"The result has been saved as {filename}" \
+          " in the folder where the script resides."
+    print(msg)
+    return msg
+
+def save2json(results):
+    """将结果以json形式保存到脚本所在文件夹，使用时间戳作为文件名后缀"""
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    filename = f"modtime_{timestamp}.json"
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.writelines(json_chunks(results))
+    msg = f"The result has been saved as {filename}" \
+          " in the folder where the script resides."
+    print(msg)
+    return msg
+
+def save2binary(results):
+    """将结果以列式二进制报告保存到脚本所在文件夹，使用时间戳作为文件名后缀，可用report.ReportReader读取"""
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    filename = f"modtime_{timestamp}.mtr"
+    write_report(filename, results)
+    msg = f"The result has been saved as {filename}" \
+          " in the folder where the script resides."
+    print(msg)
+    return msg
+
+def stream_check(path_list, out, fmt='ndjson', per_child=False,
+                 engine=DEFAULT_ENGINE, workers=None, concurrency=None,
+                 index=None, since=None, exclude=None, gitignore=False,
+                 stats=None, follow_symlinks=False, dedup=False,
+                 one_file_system=False, per_device=None, device_limits=None,
+                 depth=1, limit=None, offset=0, oldest=False,
+                 share_nested=False, timeout=None, root_timeout=None,
+                 progress=None):
+    """检查多个目标路径，每个目标路径完成后立即写出其结果并刷新，不在内存中累积结果
+    :param path_list: Iterable[str], 目标路径列表，可以是惰性的迭代器
+    :param out: file, 输出的文本文件对象，binary格式时为二进制文件对象
+    :param fmt: str, 输出格式，'ndjson'、'json'、'binary'或'text'；
+        json格式逐个目标路径写出，完成后的内容与save2json相同，binary格式见report模块
+    :param per_child: bool, ndjson格式下是否每个直接子条目输出一条记录，默认每个目标路径一条
+    :param concurrency: int, 同时检查的目标路径数上限，默认为线程数的两倍
+    :param stats: ScanStats, 提供时记录计数、耗时和输出的字节数
+    :param limit: int, 每个文件夹最多输出的条目数，未输出的条目数随结果输出
+    :param share_nested: bool, 是否去除重复的目标路径，并与外层共用嵌套的目标路径的遍历，见scan；
+        需要先读取整个path_list，默认不共用，使path_list可以惰性地逐个读取
+    :param timeout: float, 整个检查的时间预算（秒），见scan
+    :param root_timeout: float, 每个目标路径的时间预算（秒），见scan
+    :param progress: bool|ScanProgress, 是否在标准错误输出中显示进度条，见multi_check；默认不显示
+    :return count: int, 已输出的目标路径数
+    """
+    progress = _as_progress(progress)
+    pruner = _make_pruner(exclude, gitignore)
+    policy = _make_policy(follow_symlinks, dedup, one_file_system)
+    engine = _prepare_engine(engine, workers, index, pruner, stats, policy,
+                             per_device is not None or bool(device_limits),
+                             depth)
+
+    if share_nested:
+        path_list = unique_roots(path_list)
+
+    def checked_paths():
+        # 逐个检查目标路径是否有效，使path_list可以是惰性的迭代器
+        for path in path_list:
+            _check_paths([path])
+            yield path
+
+    writer = None
+    if fmt == 'binary':
+        # 共用嵌套的目标路径的遍历时path_list已读取完毕，可以预先跳过外层结果中目标路径的副本
+        writer = ReportWriter(out, path_list if share_nested else ())
+    # 已写出的目标路径数，json格式据此决定写出开头还是分隔符
+    written = [0]
+
+    def write(result):
+        if writer is not None:
+            start = time.perf_counter_ns()
+            size = writer.offset
+            writer.add(result)
+            out.flush()
+            written[0] += 1
+            if stats is not None:
+                stats.add_phase('write', time.perf_counter_ns() - start)
+                stats.add_output(writer.offset - size)
+            return
+        if fmt == 'ndjson':
+            start = time.perf_counter_ns()
+            records = list(ndjson_records(result, per_child))
+            built = time.perf_counter_ns()
+            text = ''.join(json.dumps(record, ensure_ascii=False) + '\n'
+                           for record in records)
+            if stats is not None:
+                stats.add_phase('format', built - start)
+                stats.add_phase('render', time.perf_counter_ns() - built)
+        elif fmt == 'json':
+            start = time.perf_counter_ns()
+            text = _json_item(result, not written[0])
+            if stats is not None:
+                stats.add_phase('render', time.perf_counter_ns() - start)
+        else:
+            text = render_text([result], stats=stats)
+        written[0] += 1
+        emit(text)
+
+    def emit(text):
+        start = time.perf_counter_ns()
+        out.write(text)
+        out.flush()
+        if stats is not None:
+            stats.add_phase('write', time.perf_counter_ns() - start)
+            stats.add_output(text)
+
+    def finish():
+        if writer is not None:
+            size = writer.offset
+            writer.close()
+            if stats is not None:
+                stats.add_output(writer.offset - size)
+        elif fmt == 'json':
+            emit(_json_end(written[0]))
+        return written[0]
+
+    if engine in PARALLEL_ENGINES:
+        with _progress_shown(progress):
+            results = PARALLEL_ENGINES[engine](
+                list(checked_paths()), workers, since, pruner=pruner,
+                stats=stats, policy=policy,
+                selection=_make_selection(limit, offset, oldest),
+                guard=ScanGuard(timeout, root_timeout, progress))
+        for result in results:
+            write(result)
+        return finish()
+
+    async def consume():
+        async for result in scan(checked_paths(), engine, workers,
+                                 concurrency or 2 * (workers or 1),
+                                 since=since,
+                                 exclude=pruner and pruner.matcher,
+                                 gitignore=gitignore, stats=stats,
+                                 follow_symlinks=follow_symlinks,
+                                 dedup=dedup, one_file_system=one_file_system,
+                                 per_device=per_device,
+                                 device_limits=device_limits, depth=depth,
+                                 limit=limit, offset=offset, oldest=oldest,
+                                 share_nested=share_nested, timeout=timeout,
+                                 root_timeout=root_timeout,
+                                 progress=progress):
+            write(result)
+        return finish()
+
+    import asyncio
+    with _progress_shown(progress):
+        return asyncio.run(consume())
@@ -0,0 +1,253 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""列式的二进制检查报告及其内存映射读取器
+
+每个检查过的文件夹（多层报告中的每层文件夹）保存为一节，条目按修改时间从新到旧排列：
+修改时间为int64数组，是否为文件夹为字节数组，名称为UTF-8的名称区及其uint64偏移数组。
+各节的位置记录在文件末尾的节表中，因此写入时可以在每个目标路径检查完成后立即写出，无需预先知道节数；
+读取时只映射文件，按需解码访问到的条目，按时间范围查询时在修改时间数组上二分查找"""
+
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b'MTPREP\0\0'
+VERSION = 1
+# 魔数, 版本
+_HEADER = struct.Struct('<8sH6x')
+# 路径偏移, 路径字节数, 条目数, 层级（目标路径为0）, 修改时间偏移, 是否为文件夹偏移, 名称偏移数组偏移, 名称区偏移
+_SECTION = struct.Struct('<QIIH6xQQQQ')
+# 节表偏移, 节数, 魔数
+_TRAILER = struct.Struct('<QI4x8s')
+
+_BIG_ENDIAN = sys.byteorder != 'little'
+
+
+def _packed(typecode, values):
+    """将整数序列转换为小端序的字节"""
+    packed = array(typecode, values)
+    if _BIG_ENDIAN:
+        packed.byteswap()
+    return packed.tobytes()
+
+
+class ReportWriter:
+    """逐个写入检查结果的二进制报告，写入后调用close写出节表"""
+
+    def __init__(self, f, roots=()):
+        """
+        :param f: file, 以二进制模式打开的可写文件对象，不需要支持seek，由调用者负责关闭
+        :param roots: Iterable[str], 预先知道的目标路径，外层结果中它们及其下各层的副本不再写出
+        """
+        self.f = f
+        self.offset = 0
+        self.sections = []
+        # 目标路径，已写出的目标路径也加入其中
+        self.roots = set(roots)
+        self._write(_HEADER.pack(MAGIC, VERSION))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self, data):
+        self.f.write(data)
+        self.offset += len(data)
+
+    def _align(self):
+        """数组按8字节对齐，便于读取时直接映射为int64"""
+        if self.offset % 8:
+            self._write(bytes(8 - self.offset % 8))
+
+    def add(self, result, level=0):
+        """写入一个检查结果，多层报告中的各层文件夹各自写为一节；
+        嵌套在其他目标路径之下的目标路径只写为目标路径，跳过外层结果中它及其下各层的副本
+        :param result: ScanResult, 检查结果
+        :param level: int, 结果所在的层级
+        """
+        if level:
+            if result.path in self.roots:
+                return
+        else:
+            self.roots.add(result.path)
+        order = sorted(range(len(result)), key=result.mtimes.__getitem__,
+                       reverse=True)
+        names = [result.names[i].encode('utf-8', 'surrogateescape')
+                 for i in order]
+        offsets = [0]
+        for name in names:
+            offsets.append(offsets[-1] + len(name))
+        path = result.path.encode('utf-8', 'surrogateescape')
+        path_offset = self.offset
+        self._write(path)
+        self._align()
+        mtimes_offset = self.offset
+        self._write(_packed('q', [result.mtimes[i] for i in order]))
+        offsets_offset = self.offset
+        self._write(_packed('Q', offsets))
+        is_dirs_offset = self.offset
+        self._write(bytes(result.is_dirs[i] for i in order))
+        blob_offset = self.offset
+        self._write(b''.join(names))
+        self.sections.append((path_offset, len(path), len(order), level,
+                              mtimes_offset, is_dirs_offset, offsets_offset,
+                              blob_offset))
+        for child in (result.subresults or {}).values():
+            self.add(child, level + 1)
+
+    def close(self):
+        """写出节表和文件尾，之后不能再写入"""
+        self._align()
+        table_offset = self.offset
+        for section in self.sections:
+            self._write(_SECTION.pack(*section))
+        self._write(_TRAILER.pack(table_offset, len(self.sections), MAGIC))
+        self.f.flush()
+
+
+def write_report(path, results):
+    """将检查结果写入二进制报告文件"""
+    results = list(results)
+    with open(path, 'wb') as f, \
+            ReportWriter(f, [result.path for result in results]) as writer:
+        for result in results:
+            writer.add(result)
+
+
+class Section:
+    """报告中一个文件夹的条目，按修改时间从新到旧排列，只在访问时解码"""
+    __slots__ = ('path', 'level', 'mtimes', 'is_dirs', 'offsets', 'blob')
+
+    def __init__(self, path, level, mtimes, is_dirs, offsets, blob):
+        self.path = path
+        self.level = level
+        self.mtimes = mtimes
+        self.is_dirs = is_dirs
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.mtimes)
+
+    def name(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode(
+            'utf-8', 'surrogateescape')
+
+    def __getitem__(self, i):
+        """第i新的条目 (mtime_ns, name, is_dir)"""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.mtimes[i], self.name(i), self.is_dirs[i]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def _first_older(self, mtime_ns):
+        """第一个修改时间早于mtime_ns的条目的下标"""
+        lo, hi = 0, len(self.mtimes)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.mtimes[mid] >= mtime_ns:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def between(self, start_ns=None, end_ns=None):
+        """按修改时间从新到旧产出start_ns <= mtime_ns < end_ns的条目，耗时O(log n + 结果数)
+        :param start_ns: int, 最早的修改时间，默认为不限制
+        :param end_ns: int, 修改时间的上界（不含），默认为不限制
+        """
+        lo = 0 if end_ns is None else self._first_older(end_ns)
+        hi = len(self) if start_ns is None else self._first_older(start_ns)
+        for i in range(lo, hi):
+            yield self[i]
+
+
+class ReportReader:
+    """以内存映射方式读取二进制报告，打开时只读取节表"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            self._load()
+        except Exception:
+            self.close()
+            raise
+
+    def _view(self, start, size, typecode=None):
+        view = memoryview(self._mmap)[start:start + size]
+        self._views.append(view)
+        if typecode is None:
+            return view
+        if _BIG_ENDIAN:
+            values = array(typecode, view)
+            values.byteswap()
+            return values
+        view = view.cast(typecode)
+        self._views.append(view)
+        return view
+
+    def _load(self):
+        data = self._mmap
+        if len(data) < _HEADER.size + _TRAILER.size \
+                or _HEADER.unpack_from(data) != (MAGIC, VERSION):
+            raise ValueError("Not a modtime_pecker binary report")
+        table_offset, count, magic = _TRAILER.unpack_from(
+            data, len(data) - _TRAILER.size)
+        if magic != MAGIC:
+            raise ValueError("The binary report is truncated")
+        self.sections = []
+        # 文件夹路径 -> Section
+        self.by_path = {}
+        for i in range(count):
+            (path_offset, path_size, entries, level, mtimes_offset,
+             is_dirs_offset, offsets_offset, blob_offset) = \
+                _SECTION.unpack_from(data, table_offset + i * _SECTION.size)
+            path = data[path_offset:path_offset + path_size].decode(
+                'utf-8', 'surrogateescape')
+            offsets = self._view(offsets_offset, 8 * (entries + 1), 'Q')
+            section = Section(
+                path, level, self._view(mtimes_offset, 8 * entries, 'q'),
+                self._view(is_dirs_offset, entries),
+                offsets, self._view(blob_offset, offsets[entries]))
+            self.sections.append(section)
+            # 流式写出时外层目标路径可能先于嵌套的目标路径写出，此时优先取目标路径本身的节
+            if level == 0 or path not in self.by_path:
+                self.by_path[path] = section
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        # 映射的内存仍被引用时不能关闭，先释放所有视图
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __len__(self):
+        return len(self.sections)
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def __getitem__(self, path):
+        return self.by_path[path]
+
+    @property
+    def roots(self):
+        """报告中的目标路径"""
+        return [section.path for section in self.sections
+                if section.level == 0]
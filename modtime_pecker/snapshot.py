@@ -0,0 +1,146 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""检查结果的二进制快照及两次检查之间的差异
+
+快照按文件夹保存其直接子条目的子树最新修改时间，每个文件夹的条目按名称排序后以列存储：
+修改时间为连续的int64数组，是否为文件夹为字节数组，名称以NUL分隔。
+比较两个快照时，对每个文件夹的两组有序名称做一次归并，时间与条目数成线性关系，无需重新遍历任何文件夹"""
+
+import os
+import struct
+import sys
+import time
+from array import array
+
+MAGIC = b'MTPSNAP\0'
+VERSION = 1
+# 魔数, 版本, 创建时间(ns), 文件夹记录数
+_HEADER = struct.Struct('<8sHqI')
+# 路径字节数, 层级（目标路径为0）, 条目数, 名称字节数
+_RECORD = struct.Struct('<IHII')
+
+
+class Snapshot:
+    """一次检查的快照，可由检查结果创建，或从快照文件读取"""
+
+    def __init__(self, created_ns=None):
+        """
+        :param created_ns: int, 快照对应的检查时间，默认为当前时间
+        """
+        self.created_ns = time.time_ns() if created_ns is None else created_ns
+        # 文件夹路径 -> (层级, 按名称排序的条目名, 修改时间, 是否为文件夹)
+        self.dirs = {}
+
+    @property
+    def roots(self):
+        """快照中的目标路径"""
+        return [path for path, record in self.dirs.items() if record[0] == 0]
+
+    @property
+    def depth(self):
+        """快照中报告的层数，与检查时的depth一致"""
+        return max((record[0] for record in self.dirs.values()), default=0) + 1
+
+    @classmethod
+    def from_results(cls, results, created_ns=None):
+        """由检查结果创建快照，多层报告中的各层文件夹各自保存为一条记录；
+        嵌套在其他目标路径之下的目标路径只保存为目标路径，跳过外层结果中它及其下各层的副本
+        :param results: Iterable[ScanResult], 检查结果，不能只包含部分条目
+        """
+        snapshot = cls(created_ns)
+        stack = [(result, 0) for result in results]
+        roots = {result.path for result, _ in stack}
+        while stack:
+            result, level = stack.pop()
+            if level and result.path in roots:
+                continue
+            order = sorted(range(len(result.names)),
+                           key=result.names.__getitem__)
+            snapshot.dirs[result.path] = (
+                level, [result.names[i] for i in order],
+                array('q', [result.mtimes[i] for i in order]),
+                bytearray(result.is_dirs[i] for i in order))
+            for child in (result.subresults or {}).values():
+                stack.append((child, level + 1))
+        return snapshot
+
+    def save(self, path):
+        """写入快照文件"""
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, self.created_ns,
+                                 len(self.dirs)))
+            for dir_path, (level, names, mtimes, is_dirs) in sorted(
+                    self.dirs.items()):
+                encoded = os.fsencode(dir_path)
+                blob = b'\0'.join(os.fsencode(name) for name in names)
+                if sys.byteorder != 'little':
+                    mtimes = array('q', mtimes)
+                    mtimes.byteswap()
+                f.write(_RECORD.pack(len(encoded), level, len(names),
+                                     len(blob)))
+                f.write(encoded)
+                f.write(mtimes.tobytes())
+                f.write(is_dirs)
+                f.write(blob)
+
+    @classmethod
+    def load(cls, path):
+        """读取快照文件"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, created_ns, count = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a modtime_pecker snapshot")
+        snapshot = cls(created_ns)
+        offset = _HEADER.size
+        for _ in range(count):
+            path_size, level, entries, blob_size = _RECORD.unpack_from(
+                data, offset)
+            offset += _RECORD.size
+            dir_path = os.fsdecode(data[offset:offset + path_size])
+            offset += path_size
+            mtimes = array('q')
+            mtimes.frombytes(data[offset:offset + 8 * entries])
+            if sys.byteorder != 'little':
+                mtimes.byteswap()
+            offset += 8 * entries
+            is_dirs = bytearray(data[offset:offset + entries])
+            offset += entries
+            blob = data[offset:offset + blob_size]
+            offset += blob_size
+            names = ([os.fsdecode(name) for name in blob.split(b'\0')]
+                     if entries else [])
+            snapshot.dirs[dir_path] = (level, names, mtimes, is_dirs)
+        return snapshot
+
+
+def diff_snapshots(old, new):
+    """按文件夹路径和条目名的顺序产出两个快照之间的差异
+    只存在于一个快照中的文件夹，其条目全部作为新增或删除的条目
+    :param old: Snapshot, 较早的快照
+    :param new: Snapshot, 较新的快照
+    :return: Iterator[(str, str, str, int|None, int|None, bool)],
+        (文件夹路径, 条目名, 'changed'|'added'|'removed', 旧的修改时间, 新的修改时间, 是否为文件夹)
+    """
+    empty = (0, [], array('q'), bytearray())
+    for dir_path in sorted(old.dirs.keys() | new.dirs.keys()):
+        _, old_names, old_mtimes, old_dirs = old.dirs.get(dir_path, empty)
+        _, new_names, new_mtimes, new_dirs = new.dirs.get(dir_path, empty)
+        # 两组条目名均已排序，一次归并即可找出所有差异
+        i = j = 0
+        while i < len(old_names) or j < len(new_names):
+            if j == len(new_names) or (i < len(old_names)
+                                       and old_names[i] < new_names[j]):
+                yield (dir_path, old_names[i], 'removed', old_mtimes[i], None,
+                       bool(old_dirs[i]))
+                i += 1
+            elif i == len(old_names) or new_names[j] < old_names[i]:
+                yield (dir_path, new_names[j], 'added', None, new_mtimes[j],
+                       bool(new_dirs[j]))
+                j += 1
+            else:
+                if old_mtimes[i] != new_mtimes[j]:
+                    yield (dir_path, new_names[j], 'changed', old_mtimes[i],
+                           new_mtimes[j], bool(new_dirs[j]))
+                i += 1
+                j += 1
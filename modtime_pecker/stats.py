@@ -0,0 +1,150 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""检查过程的计数和计时
+
+不提供ScanStats时，各引擎走原有的不计数的遍历路径，几乎没有额外开销；
+提供时，遍历中按任务在本地的Counters中累加，任务结束后再在锁内合并到ScanStats，
+并调用可选的回调函数，便于接入外部的指标导出"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Counters:
+    """一次遍历任务的计数，可在进程间传递"""
+    __slots__ = ('scandir_calls', 'stat_calls', 'entries', 'dirs',
+                 'pruned_entries', 'pruned_dirs', 'cycles', 'reused',
+                 'list_ns', 'stat_ns', 'elapsed_ns')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def merge(self, other):
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ScanStats:
+    """一次或多次检查的统计
+
+    计数包括scandir和stat的调用次数、列出的条目数和文件夹数、被排除的条目数、错误数和输出的字节数；
+    计时包括各阶段的耗时（多线程时为各线程耗时之和）、每个目标路径和每个直接子文件夹的耗时"""
+
+    # 各阶段的含义，也是输出摘要时的顺序
+    PHASES = {
+        'list': 'listing folders (scandir)',
+        'stat': 'stat calls',
+        'sort': 'sorting results',
+        'format': 'formatting timestamps',
+        'render': 'building output strings',
+        'write': 'writing output',
+    }
+
+    def __init__(self, hook=None):
+        """
+        :param hook: callable, 回调函数，以(event, data)调用，可能在工作线程中调用；
+            event为'subtree'时data为一个直接子文件夹的统计，为'root'时为一个目标路径的统计
+        """
+        self.hook = hook
+        self.counts = Counters()
+        self.errors = 0
+        self.output_bytes = 0
+        self.phases = dict.fromkeys(self.PHASES, 0)
+        # 直接子文件夹的路径 -> 遍历其子树的计数和耗时
+        self.subtrees = {}
+        # 目标路径 -> 检查耗时(ns)
+        self.roots = {}
+        self._lock = threading.Lock()
+
+    def add_counts(self, counts):
+        """合并目标路径自身列出时的计数"""
+        with self._lock:
+            self._merge(counts)
+
+    def _merge(self, counts):
+        self.counts.merge(counts)
+        self.phases['list'] += counts.list_ns
+        self.phases['stat'] += counts.stat_ns
+
+    def add_subtree(self, path, counts):
+        """合并一个直接子文件夹子树的计数"""
+        with self._lock:
+            self._merge(counts)
+            self.subtrees[path] = counts
+        if self.hook is not None:
+            self.hook('subtree', dict(counts.to_dict(), path=path))
+
+    def add_root(self, path, elapsed_ns):
+        with self._lock:
+            self.roots[path] = elapsed_ns
+        if self.hook is not None:
+            self.hook('root', {'path': path, 'elapsed_ns': elapsed_ns})
+
+    def add_phase(self, name, elapsed_ns):
+        with self._lock:
+            self.phases[name] += elapsed_ns
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter_ns() - start)
+
+    def add_error(self, count=1):
+        with self._lock:
+            self.errors += count
+
+    def add_output(self, text):
+        """:param text: str|int, 写出的文本，或二进制输出时写出的字节数"""
+        if not isinstance(text, int):
+            text = len(text.encode('utf-8', 'surrogateescape'))
+        with self._lock:
+            self.output_bytes += text
+
+    def to_dict(self):
+        """转换为可json序列化的字典"""
+        with self._lock:
+            data = self.counts.to_dict()
+            data.update(errors=self.errors, output_bytes=self.output_bytes,
+                        phases_ns=dict(self.phases), roots_ns=dict(self.roots),
+                        subtrees={path: counts.to_dict() for path, counts
+                                  in self.subtrees.items()})
+        return data
+
+    def summary(self, top=5, linesep=os.linesep):
+        """渲染为文本摘要，列出耗时最长的top个直接子文件夹"""
+        data = self.to_dict()
+        lines = [
+            "Stats:",
+            f"  scandir calls: {data['scandir_calls']}",
+            f"  stat calls: {data['stat_calls']}",
+            f"  entries: {data['entries']} ({data['dirs']} directories)",
+            f"  pruned: {data['pruned_entries']} "
+            f"({data['pruned_dirs']} directories)",
+            f"  folders already walked (symlink cycles): {data['cycles']}",
+            f"  folders reused (dedup): {data['reused']}",
+            f"  errors: {data['errors']}",
+            f"  output bytes: {data['output_bytes']}",
+            "  time by phase (summed over threads):",
+        ]
+        for name, description in self.PHASES.items():
+            lines.append(f"    {name:<8}{data['phases_ns'][name] / 1e9:>10.4f}s"
+                         f"  {description}")
+        for path, elapsed_ns in data['roots_ns'].items():
+            lines.append(f"  {path}: {elapsed_ns / 1e9:.4f}s")
+        slowest = sorted(data['subtrees'].items(),
+                         key=lambda item: item[1]['elapsed_ns'], reverse=True)
+        if slowest:
+            lines.append("  slowest subfolders:")
+        for path, counts in slowest[:top]:
+            lines.append(f"    {counts['elapsed_ns'] / 1e9:>10.4f}s  "
+                         f"{counts['entries']:>8} entries  {path}")
+        return linesep.join(lines) + linesep
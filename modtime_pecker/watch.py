@@ -0,0 +1,331 @@
+#!usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""基于Linux inotify的持续监视
+
+首次完整检查后，为目标路径下的每个文件夹添加inotify监视，之后只根据事件更新受影响的祖先链上的
+最新修改时间，更新代价为O(深度)而非O(整棵树)。inotify监视数用尽（或系统不支持inotify）时，
+对应的直接子文件夹退回到定期完整重新检查"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import stat
+import struct
+import threading
+import time
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0)
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM
+              | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR)
+_EVENT = struct.Struct('iIII')
+
+
+def _load_inotify():
+    """加载libc中的inotify接口，不支持时返回None"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p,
+                                           ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class Watcher:
+    """监视多个目标路径，持续维护每个直接子条目的最新修改时间，不进入符号链接"""
+
+    def __init__(self, path_list, poll_interval=300):
+        """
+        :param path_list: list[str], 目标路径列表
+        :param poll_interval: float, 无法使用inotify的部分定期重新检查的间隔（秒）
+        """
+        self.path_list = list(path_list)
+        self.poll_interval = poll_interval
+        self.lock = threading.RLock()
+        self._libc = _load_inotify()
+        self._fd = -1
+        if self._libc is not None:
+            self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        # 目标路径 -> {直接子条目名: [最新修改时间(ns), 是否为文件夹]}
+        self.children = {}
+        # 被监视的文件夹 -> [上一级文件夹, (所属目标路径, 所属直接子条目名),
+        #                   子树最新修改时间, 子文件夹集合]
+        self.dirs = {}
+        self.wds = {}
+        # 需要定期重新检查的直接子文件夹和目标路径
+        self.polled = set()
+        self.polled_roots = set()
+        self._next_poll = time.monotonic() + poll_interval
+        for root in self.path_list:
+            self._scan_root(root)
+
+    @property
+    def inotify(self):
+        return self._fd >= 0
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _add_watch(self, path):
+        """为文件夹添加监视，监视数用尽或不支持inotify时返回False"""
+        if self._fd < 0:
+            return False
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path),
+                                          WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                return False
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return True
+            raise OSError(err, os.strerror(err), path)
+        self.wds[wd] = path
+        return True
+
+    def _scan_root(self, root):
+        """列出目标路径的直接子条目，并检查其中的每个子文件夹"""
+        if not self._add_watch(root):
+            self.polled_roots.add(root)
+        self.children[root] = {}
+        with os.scandir(root) as it:
+            for entry in it:
+                self._add_child(root, entry.name)
+
+    def _add_child(self, root, name):
+        path = os.path.join(root, name)
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            return
+        mtime_ns = st.st_mtime_ns
+        is_dir = stat.S_ISDIR(st.st_mode)
+        self.children[root][name] = [mtime_ns, is_dir]
+        if is_dir:
+            self._scan_subtree(path, None, (root, name))
+
+    def _scan_subtree(self, path, parent, owner):
+        """遍历新出现的子树并添加监视，将其最新修改时间回传给所属的祖先链
+        遍历时按发现顺序记录各文件夹，结束后逆序回传各文件夹的子树最新修改时间"""
+        order = []
+        stack = [(path, parent)]
+        while stack:
+            dir_path, dir_parent = stack.pop()
+            if not self._add_watch(dir_path):
+                self.polled.add(owner)
+            latest = None
+            try:
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        try:
+                            mtime_ns = entry.stat(
+                                follow_symlinks=False).st_mtime_ns
+                        except FileNotFoundError:
+                            continue
+                        if latest is None or mtime_ns > latest:
+                            latest = mtime_ns
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append((entry.path, dir_path))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            self.dirs[dir_path] = [dir_parent, owner, latest, set()]
+            if dir_parent in self.dirs:
+                self.dirs[dir_parent][3].add(dir_path)
+            order.append(dir_path)
+        for dir_path in reversed(order[1:]):
+            node = self.dirs[dir_path]
+            parent_node = self.dirs[node[0]]
+            if node[2] is not None and (parent_node[2] is None
+                                        or node[2] > parent_node[2]):
+                parent_node[2] = node[2]
+        if order:
+            self._touch(path, self.dirs[path][2])
+
+    def _propagate(self, dir_path, mtime_ns):
+        """文件夹中的条目出现了新的修改时间，沿祖先链向上回传，祖先已不旧于它时提前停止"""
+        node = self.dirs.get(dir_path)
+        if node is None or mtime_ns is None:
+            return
+        owner = node[1]
+        while node is not None:
+            if node[2] is not None and node[2] >= mtime_ns:
+                return
+            node[2] = mtime_ns
+            node = self.dirs.get(node[0])
+        self._bump(owner, mtime_ns)
+
+    def _touch(self, dir_path, mtime_ns):
+        """文件夹自身（或其子树整体）出现了新的修改时间，作为上一级文件夹中的条目回传"""
+        node = self.dirs[dir_path]
+        if node[0] is None:
+            self._bump(node[1], mtime_ns)
+        else:
+            self._propagate(node[0], mtime_ns)
+
+    def _bump(self, owner, mtime_ns):
+        root, name = owner
+        child = self.children[root].get(name)
+        if child is not None and mtime_ns is not None and mtime_ns > child[0]:
+            child[0] = mtime_ns
+
+    def _forget(self, path):
+        """删除某个文件夹及其所有后代文件夹的记录，对应的监视由内核自动移除"""
+        node = self.dirs.pop(path, None)
+        if node is None:
+            return
+        if node[0] in self.dirs:
+            self.dirs[node[0]][3].discard(path)
+        stack = list(node[3])
+        while stack:
+            child = self.dirs.pop(stack.pop(), None)
+            if child is not None:
+                stack.extend(child[3])
+
+    def _handle(self, wd, mask, name):
+        if mask & IN_IGNORED:
+            self.wds.pop(wd, None)
+            return
+        dir_path = self.wds.get(wd)
+        if dir_path is None or not name:
+            return
+        path = os.path.join(dir_path, name)
+        removed = mask & (IN_DELETE | IN_MOVED_FROM)
+        if dir_path in self.children:
+            # 目标路径下直接子条目的增删改
+            if removed:
+                self.children[dir_path].pop(name, None)
+                self._forget(path)
+            elif name not in self.children[dir_path] or \
+                    mask & (IN_CREATE | IN_MOVED_TO):
+                self._forget(path)
+                self._add_child(dir_path, name)
+            else:
+                try:
+                    mtime_ns = os.lstat(path).st_mtime_ns
+                except FileNotFoundError:
+                    return
+                child = self.children[dir_path][name]
+                latest = self.dirs[path][2] if path in self.dirs else None
+                if latest is not None and latest > mtime_ns:
+                    mtime_ns = latest
+                child[0] = mtime_ns
+            return
+
+        node = self.dirs.get(dir_path)
+        if node is None:
+            return
+        # 子树内部的变化：变化的条目沿祖先链回传，
+        # 文件夹自身的修改时间随条目增删而变化，作为上一级文件夹中的条目回传
+        if removed:
+            self._forget(path)
+        else:
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._forget(path)
+                self._scan_subtree(path, dir_path, node[1])
+            try:
+                self._propagate(dir_path, os.lstat(path).st_mtime_ns)
+            except FileNotFoundError:
+                pass
+        try:
+            self._touch(dir_path, os.stat(dir_path).st_mtime_ns)
+        except FileNotFoundError:
+            pass
+
+    def _poll(self):
+        """重新检查无法使用inotify的目标路径和直接子文件夹"""
+        roots, self.polled_roots = self.polled_roots, set()
+        owners, self.polled = self.polled, set()
+        for root in roots:
+            for name in self.children[root]:
+                self._forget(os.path.join(root, name))
+            self._scan_root(root)
+        for root, name in owners:
+            if root in roots:
+                continue
+            self._forget(os.path.join(root, name))
+            self.children[root].pop(name, None)
+            self._add_child(root, name)
+
+    def rescan(self):
+        """丢弃当前状态并完整重新检查（用于inotify事件队列溢出）"""
+        self.dirs.clear()
+        self.polled.clear()
+        self.polled_roots.clear()
+        for root in self.path_list:
+            self._scan_root(root)
+
+    def ranking(self, root):
+        """返回目标路径下按最新修改时间从新到旧排序的直接子条目
+        :return entries: list[(int, str, bool)], (mtime_ns, name, is_dir)
+        """
+        with self.lock:
+            entries = [(mtime_ns, name, is_dir) for name, (mtime_ns, is_dir)
+                       in self.children[root].items()]
+        entries.sort(key=lambda x: x[0], reverse=True)
+        return entries
+
+    def _order(self):
+        return [[name for _, name, _ in self.ranking(root)]
+                for root in self.path_list]
+
+    def poll_once(self, timeout):
+        """等待并处理一批事件，到达检查间隔时重新检查退回轮询的部分
+        :return changed: bool, 各目标路径下直接子条目的排序是否变化
+        """
+        before = self._order()
+        deadline = min(time.monotonic() + timeout, self._next_poll)
+        wait = max(0.0, deadline - time.monotonic())
+        if self._fd >= 0:
+            readable, _, _ = select.select([self._fd], [], [], wait)
+            if readable:
+                self._read_events()
+        else:
+            time.sleep(wait)
+        if time.monotonic() >= self._next_poll:
+            with self.lock:
+                self._poll()
+            self._next_poll = time.monotonic() + self.poll_interval
+        return self._order() != before
+
+    def _read_events(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        with self.lock:
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    self.rescan()
+                    return
+                self._handle(wd, mask, name)
+
+    def run(self, on_change=None, stop=None):
+        """持续处理事件，排序变化时调用on_change()，stop被设置时返回
+        :param on_change: callable, 排序变化时调用的回调函数
+        :param stop: threading.Event, 用于停止监视
+        """
+        while stop is None or not stop.is_set():
+            if self.poll_once(1.0) and on_change is not None:
+                on_change()
@@ -1,5 +1,44 @@
+import asyncio
+import contextlib
+import http.client
+import io
+import re
+import socket
+import sqlite3
+import tempfile
+import threading
 import unittest
+from concurrent.futures import CancelledError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from modtime_pecker import *
+import benchmark
+import modtime_pecker.core
+from modtime_pecker.agent import (AgentClient, AgentError, AgentServer,
+                                  Coordinator, rank)
+from modtime_pecker.core import (_fd_latest_ns, _iterative_latest_ns,
+                                 _load_numpy, _numpy_check, _process_check)
+from modtime_pecker.filter import ExcludeMatcher
+from modtime_pecker.index import MtimeIndex
+from modtime_pecker.report import ReportReader, write_report
+from modtime_pecker.snapshot import Snapshot, diff_snapshots
+from modtime_pecker.stats import Counters, ScanStats
+from modtime_pecker.watch import Watcher
+
+
+def make_tree(root, spec):
+    """按 {相对路径: 修改时间(秒)} 创建测试用的文件夹树，以'/'结尾的为文件夹"""
+    for rel_path in sorted(spec, key=lambda p: -p.count('/')):
+        path = os.path.join(root, *rel_path.strip('/').split('/'))
+        if rel_path.endswith('/'):
+            os.makedirs(path, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'w').close()
+    # 先创建所有条目再设置时间，避免创建子条目时刷新父文件夹的修改时间
+    for rel_path, mtime in spec.items():
+        path = os.path.join(root, *rel_path.strip('/').split('/'))
+        os.utime(path, (mtime, mtime))
+
 
 class TestCli(unittest.TestCase):
     def test_path_noargs(self):
@@ -59,12 +98,1237 @@ class TestCli(unittest.TestCase):
 
 class TestGetLatestModificationTime(unittest.TestCase):
     def test_valid_path(self):
-        print(get_latest_modification_time('C:\\Program Files\\Windows Defender')[0])
+        print(render_text([get_latest_modification_time('C:\\Program Files\\Windows Defender')]))
         self.assertTrue(True)
 
     def test_invalid_path(self):
         with self.assertRaises(FileNotFoundError):
-            print(get_latest_modification_time('C:\\Progr4m Files\\Wind0ws Defender')[0])
+            get_latest_modification_time('C:\\Progr4m Files\\Wind0ws Defender')
+
+
+class TestScanResult(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        make_tree(self.root, {
+            'old.txt': 1000,
+            'sub/': 2000,
+            'sub/deeper/': 2000,
+            'sub/deeper/new.txt': 5000,
+            'empty/': 3000,
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_records(self):
+        result = get_latest_modification_time(self.root)
+        self.assertEqual(list(result), [
+            (5000 * 10**9, 'sub', 1),
+            (3000 * 10**9, 'empty', 1),
+            (1000 * 10**9, 'old.txt', 0),
+        ])
+        self.assertEqual(result.latest, 5000 * 10**9)
+
+    def test_render(self):
+        results = multi_check([self.root])
+        text = render_text(results, linesep='\n')
+        self.assertTrue(text.startswith(f"In {self.root}: \n"))
+        self.assertIn(f"{format_mtime(5000 * 10**9)} - sub\n", text)
+        self.assertEqual(render_json(results)[self.root][-1],
+                         {format_mtime(1000 * 10**9): 'old.txt'})
+
+
+class TestEngines(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        make_tree(self.root, {
+            'a/': 100, 'a/x.txt': 700, 'a/b/': 200, 'a/b/y.txt': 900,
+            'c/': 400, 'c/d/': 300, 'e.txt': 500,
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_engines_agree(self):
+        expected = list(get_latest_modification_time(self.root, 'recursive'))
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                self.assertEqual(
+                    list(get_latest_modification_time(self.root, engine)),
+                    expected)
+
+    def test_deeper_than_recursion_limit(self):
+        path = os.path.join(self.root, 'deep')
+        os.mkdir(path)
+        # os.makedirs和shutil.rmtree本身都是递归实现的，逐层创建和删除
+        depth = sys.getrecursionlimit() + 100
+        for _ in range(depth):
+            path = os.path.join(path, 'd')
+            os.mkdir(path)
+        try:
+            result = get_latest_modification_time(self.root, 'iterative')
+            self.assertIn('deep', result.names)
+        finally:
+            for _ in range(depth):
+                os.rmdir(path)
+                path = os.path.dirname(path)
+
+    def test_workers(self):
+        other = tempfile.TemporaryDirectory()
+        self.addCleanup(other.cleanup)
+        make_tree(other.name, {'f/': 10, 'f/g.txt': 20, 'h.txt': 30})
+        serial = multi_check([self.root, other.name])
+        parallel = multi_check([self.root, other.name], workers=4)
+        self.assertEqual([list(r) for r in parallel],
+                         [list(r) for r in serial])
+        with self.assertRaises(ValueError):
+            multi_check([self.root], workers=0)
+
+    def test_process_engine(self):
+        expected = [list(get_latest_modification_time(self.root))]
+        self.assertEqual(
+            [list(r) for r in multi_check([self.root], engine='process',
+                                          workers=2)],
+            expected)
+        # 每个任务只列出一个文件夹，强制在更深的层级切分子树
+        self.assertEqual(
+            [list(r) for r in _process_check([self.root], 2, chunk_size=1)],
+            expected)
+
+    @unittest.skipUnless('fd' in ENGINES, 'dir_fd is not supported')
+    def test_fd_engine_descriptor_limit(self):
+        path = self.root
+        for i in range(20):
+            path = os.path.join(path, 'deep')
+            os.mkdir(path)
+            open(os.path.join(path, f'{i}.txt'), 'w').close()
+        limit = modtime_pecker.core.FD_WALK_LIMIT
+        modtime_pecker.core.FD_WALK_LIMIT = 4
+        try:
+            counts = Counters()
+            self.assertEqual(_fd_latest_ns(self.root, counts=counts),
+                             _iterative_latest_ns(self.root))
+            self.assertEqual(counts.scandir_calls, 25)
+        finally:
+            modtime_pecker.core.FD_WALK_LIMIT = limit
+        self.assertEqual(list(multi_check([self.root], engine='fd',
+                                          workers=2, stats=ScanStats())[0]),
+                         list(get_latest_modification_time(self.root)))
+        with self.assertRaises(ValueError):
+            multi_check([self.root], engine='fd', exclude=['a'])
+
+    def test_numpy_engine(self):
+        # 未安装NumPy时退回到默认引擎，结果应相同
+        for kwargs in ({}, {'limit': 2},
+                       {'limit': 1, 'offset': 1, 'oldest': True}):
+            with self.subTest(**kwargs):
+                self.assertEqual(
+                    [list(r) for r in multi_check(
+                        [self.root], engine='numpy', workers=2, **kwargs)],
+                    [list(r) for r in multi_check([self.root], **kwargs)])
+        # 阈值查询时numpy引擎给出确切的最新修改时间，只比较条目
+        result = multi_check([self.root], engine='numpy', since=450)[0]
+        self.assertEqual(sorted(result.names), ['a', 'e.txt'])
+        self.assertEqual(result.since_ns, 450 * 10**9)
+
+    @unittest.skipIf(_load_numpy() is None, 'NumPy is not installed')
+    def test_numpy_aggregation(self):
+        stats = ScanStats()
+        result = _numpy_check([self.root], stats=stats,
+                              selection=Selection(1, 1))[0]
+        self.assertEqual(list(result), [(500 * 10**9, 'e.txt', 0)])
+        self.assertEqual(result.omitted, 2)
+        self.assertEqual(result.latest, 900 * 10**9)
+        self.assertEqual(stats.counts.scandir_calls, 5)
+        self.assertEqual(list(_numpy_check([self.root])[0]),
+                         list(get_latest_modification_time(self.root)))
+        with self.assertRaises(ValueError):
+            multi_check([self.root], engine='numpy', follow_symlinks=True)
+
+    def test_since(self):
+        # 找到第一个更新的条目后即停止遍历，其修改时间不一定是子树中最新的
+        for engine in [*ENGINES, 'process']:
+            with self.subTest(engine=engine):
+                result = multi_check([self.root], engine=engine, since=450)[0]
+                self.assertEqual(sorted(result.names), ['a', 'e.txt'])
+                self.assertTrue(all(m > 450 * 10**9 for m in result.mtimes))
+                self.assertEqual(result.since_ns, 450 * 10**9)
+        result = get_latest_modification_time(self.root, since=150)
+        self.assertEqual(sorted(result.names), ['a', 'c', 'e.txt'])
+        self.assertIn('changed since', render_text([result]))
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            multi_check([self.root], engine='nope')
+
+
+class TestExclude(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        make_tree(self.root, {
+            'a/': 100, 'a/x.txt': 200, 'a/.git/': 100, 'a/.git/HEAD': 900,
+            'a/node_modules/': 100, 'a/node_modules/m.js': 800,
+            'build/': 300, 'build/out.o': 300, 'c/': 100, 'c/build/': 100,
+            'c/build/y.pyc': 700, 'c/keep.log': 150, 'c/drop.log': 600,
+            'e.txt': 50,
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_matcher(self):
+        matcher = ExcludeMatcher(['# comment', '.git', 'node_modules/',
+                                  '*.pyc', '/build', 'docs/**/tmp'])
+        self.assertTrue(matcher.match('a/.git', '.git', True))
+        self.assertTrue(matcher.match('a/node_modules', 'node_modules', True))
+        self.assertIsNone(matcher.match('a/node_modules', 'node_modules',
+                                        False))
+        self.assertTrue(matcher.match('x/y.pyc', 'y.pyc', False))
+        self.assertTrue(matcher.match('build', 'build', True))
+        self.assertIsNone(matcher.match('c/build', 'build', True))
+        self.assertTrue(matcher.match('docs/tmp', 'tmp', True))
+        self.assertTrue(matcher.match('docs/a/b/tmp', 'tmp', True))
+        negated = ExcludeMatcher(['*.log', '!keep.log'])
+        self.assertTrue(negated.match('drop.log', 'drop.log', False))
+        self.assertFalse(negated.match('keep.log', 'keep.log', False))
+
+    def test_pruned_subtrees(self):
+        exclude = ['.git', 'node_modules/', '/build', '*.log']
+        for engine in ['iterative', 'process']:
+            with self.subTest(engine=engine):
+                result = multi_check([self.root], engine=engine, workers=2,
+                                     exclude=exclude)[0]
+                self.assertEqual(list(result), [
+                    (700 * 10**9, 'c', True), (200 * 10**9, 'a', True),
+                    (50 * 10**9, 'e.txt', False)])
+                self.assertEqual(
+                    (result.pruned_entries, result.pruned_dirs), (5, 3))
+        self.assertIn('Pruned 5 entries (3 directories).',
+                      render_text([result]))
+        with self.assertRaises(ValueError):
+            multi_check([self.root], engine='recursive', exclude=exclude)
+
+    def test_gitignore(self):
+        with open(os.path.join(self.root, 'c', '.gitignore'), 'w') as f:
+            f.write('build/\n*.log\n!keep.log\n')
+        os.utime(os.path.join(self.root, 'c', '.gitignore'), (100, 100))
+        os.utime(os.path.join(self.root, 'c'), (100, 100))
+        result = get_latest_modification_time(self.root, gitignore=True)
+        self.assertEqual(dict(zip(result.names, result.mtimes))['c'],
+                         150 * 10**9)
+        self.assertEqual((result.pruned_entries, result.pruned_dirs), (2, 1))
+        # 不遵循.gitignore时不统计被排除的条目
+        self.assertIsNone(get_latest_modification_time(self.root)
+                          .pruned_entries)
+
+    def test_stream_reports_pruned(self):
+        out = io.StringIO()
+        stream_check([self.root], out, exclude=['.git'])
+        record = json.loads(out.getvalue())
+        self.assertEqual((record['pruned_entries'], record['pruned_dirs']),
+                         (1, 1))
+
+
+class TestBenchmark(unittest.TestCase):
+    def snapshot(self, shape, seed):
+        with tempfile.TemporaryDirectory() as root:
+            count = benchmark.generate_tree(root, shape, 0.05, seed)
+            entries = []
+            for dir_path, dir_names, file_names in os.walk(root):
+                for name in sorted(dir_names + file_names):
+                    path = os.path.join(dir_path, name)
+                    entries.append((os.path.relpath(path, root),
+                                    os.lstat(path).st_mtime_ns))
+        self.assertEqual(count, len(entries))
+        return entries
+
+    def test_reproducible_trees(self):
+        for shape in benchmark.SHAPES:
+            with self.subTest(shape=shape):
+                self.assertEqual(self.snapshot(shape, 1),
+                                 self.snapshot(shape, 1))
+        self.assertNotEqual(self.snapshot('skewed', 1),
+                            self.snapshot('skewed', 2))
+
+    def test_compare(self):
+        def report(rate):
+            return {'scale': 1.0, 'seed': 0, 'results': {'wide': [
+                {'bench': 'multi_check', 'entries_per_sec': rate}]}}
+        self.assertEqual(benchmark.compare(report(90), report(100)), [])
+        self.assertEqual(len(benchmark.compare(report(50), report(100))), 1)
+        with self.assertRaises(ValueError):
+            benchmark.compare(report(100), dict(report(100), seed=1))
+
+    def test_import_is_lazy(self):
+        record = benchmark.measure_import(1)
+        self.assertEqual(record['loaded'], [])
+        self.assertGreater(record['seconds'], 0)
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        make_tree(self.root, {
+            'a/': 100, 'a/x.txt': 700, 'a/b/': 200, 'a/b/y.txt': 900,
+            'c/': 400, 'c/d/': 300, 'e.txt': 500,
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_counts(self):
+        for engine, workers in [('iterative', None), ('iterative', 2),
+                                ('process', 2)]:
+            with self.subTest(engine=engine, workers=workers):
+                events = []
+                stats = ScanStats(hook=lambda event, data:
+                                  events.append((event, data['path'])))
+                multi_check([self.root], engine=engine, workers=workers,
+                            stats=stats)
+                data = stats.to_dict()
+                self.assertEqual(
+                    (data['scandir_calls'], data['stat_calls'],
+                     data['entries'], data['dirs']), (5, 7, 7, 4))
+                self.assertEqual(
+                    sorted(os.path.basename(path) for path in data['subtrees']),
+                    ['a', 'c'])
+                self.assertEqual(data['subtrees'][os.path.join(
+                    self.root, 'a')]['entries'], 3)
+                self.assertEqual(sorted(events), sorted([
+                    ('root', self.root),
+                    ('subtree', os.path.join(self.root, 'a')),
+                    ('subtree', os.path.join(self.root, 'c'))]))
+                self.assertIn('scandir calls: 5', stats.summary())
+
+    def test_output_bytes(self):
+        stats = ScanStats()
+        out = io.StringIO()
+        stream_check([self.root], out, stats=stats)
+        self.assertEqual(stats.output_bytes, len(out.getvalue()))
+        self.assertGreater(stats.phases['format'], 0)
+        with self.assertRaises(ValueError):
+            multi_check([self.root], engine='recursive', stats=ScanStats())
+
+
+@unittest.skipIf(os.name == 'nt', 'creating symlinks needs privileges')
+class TestSymlinks(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        make_tree(self.root, {
+            'a/': 100, 'a/x.txt': 200, 'data/': 100, 'data/new.txt': 900,
+        })
+        for target, link in [('../data', 'a/link'), ('..', 'a/loop'),
+                             ('loop', 'a/self'), ('/nonexistent', 'broken')]:
+            path = os.path.join(self.root, *link.split('/'))
+            os.symlink(target, path)
+            os.utime(path, (50, 50), follow_symlinks=False)
+        for folder in ['a', '']:
+            os.utime(os.path.join(self.root, folder), (100, 100))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def latest(self, **kwargs):
+        result = multi_check([self.root], **kwargs)[0]
+        return dict(zip(result.names, result.mtimes))
+
+    def test_not_followed_by_default(self):
+        self.assertEqual(self.latest(), {
+            'a': 200 * 10**9, 'data': 900 * 10**9, 'broken': 50 * 10**9})
+        self.assertEqual(
+            list(get_latest_modification_time(self.root, 'recursive')),
+            list(get_latest_modification_time(self.root)))
+
+    def test_follow_terminates_on_loops(self):
+        for engine, workers in [('iterative', None), ('iterative', 2),
+                                ('process', 2)]:
+            with self.subTest(engine=engine, workers=workers):
+                stats = ScanStats()
+                latest = self.latest(engine=engine, workers=workers,
+                                     follow_symlinks=True, stats=stats)
+                self.assertEqual(latest['a'], 900 * 10**9)
+                self.assertEqual(latest['broken'], 50 * 10**9)
+                self.assertGreater(stats.counts.cycles, 0)
+
+    def test_dedup(self):
+        stats = ScanStats()
+        latest = self.latest(follow_symlinks=True, dedup=True, stats=stats)
+        self.assertEqual(latest['a'], 900 * 10**9)
+        self.assertGreater(stats.counts.reused, 0)
+        with self.assertRaises(ValueError):
+            multi_check([self.root], engine='process', dedup=True)
+        with self.assertRaises(ValueError):
+            multi_check([self.root], dedup=True, exclude=['.git'])
+
+
+@unittest.skipIf(os.name == 'nt', "symlinks need privileges on Windows")
+class TestFileSystemBoundary(unittest.TestCase):
+    def setUp(self):
+        # 以指向另一文件系统（tmpfs）的符号链接模拟挂载点
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        try:
+            self.other = tempfile.TemporaryDirectory(dir='/dev/shm')
+        except OSError:
+            self.skipTest("/dev/shm is not available")
+        if os.stat(self.other.name).st_dev == os.stat(self.root).st_dev:
+            self.skipTest("/dev/shm is on the same filesystem")
+        make_tree(self.root, {'a/': 100, 'a/x.txt': 200})
+        make_tree(self.other.name, {'new.txt': 900})
+        os.utime(self.other.name, (300, 300))
+        os.symlink(self.other.name, os.path.join(self.root, 'a', 'mnt'))
+        os.symlink(self.other.name, os.path.join(self.root, 'mnt'))
+        for folder in ['a', '']:
+            os.utime(os.path.join(self.root, folder), (100, 100))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        self.other.cleanup()
+
+    def test_one_file_system(self):
+        for engine, workers, dedup in [('iterative', None, False),
+                                       ('iterative', 2, False),
+                                       ('iterative', None, True),
+                                       ('process', 2, False)]:
+            with self.subTest(engine=engine, workers=workers, dedup=dedup):
+                result = multi_check([self.root], engine=engine,
+                                     workers=workers, follow_symlinks=True,
+                                     dedup=dedup)[0]
+                self.assertEqual(dict(zip(result.names, result.mtimes))['a'],
+                                 900 * 10**9)
+                self.assertIsNone(result.mount_skipped)
+                result = multi_check([self.root], engine=engine,
+                                     workers=workers, follow_symlinks=True,
+                                     dedup=dedup, one_file_system=True)[0]
+                latest = dict(zip(result.names, result.mtimes))
+                # 挂载点只计入其自身的修改时间，不进入其中
+                self.assertEqual(latest['a'], 300 * 10**9)
+                self.assertEqual(latest['mnt'], 300 * 10**9)
+                self.assertEqual(result.mount_skipped,
+                                 [os.path.join(self.root, 'a', 'mnt'),
+                                  os.path.join(self.root, 'mnt')])
+                self.assertIn("Skipped at mount boundaries",
+                              render_text([result]))
+
+    def test_one_file_system_unsupported(self):
+        with self.assertRaises(ValueError):
+            multi_check([self.root], engine='recursive',
+                        one_file_system=True)
+
+
+class TestPerDeviceLimit(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        make_tree(self.tmp.name, {f'd{i}/f.txt': 100 + i for i in range(6)})
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def engine(self, path, since_ns=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return None
+
+    def scan(self, **kwargs):
+        async def collect():
+            return [result async for result in
+                    scan([self.tmp.name], self.engine, workers=4, **kwargs)]
+        return asyncio.run(collect())
+
+    def test_per_device(self):
+        self.scan()
+        self.assertGreater(self.peak, 1)
+        self.peak = 0
+        self.scan(per_device=1)
+        self.assertEqual(self.peak, 1)
+        self.peak = 0
+        self.scan(per_device=4, device_limits={self.tmp.name: 2})
+        self.assertEqual(self.peak, 2)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.scan(per_device=0)
+        with self.assertRaises(ValueError):
+            multi_check([self.tmp.name], engine='process', per_device=1)
+
+
+class TestMtimeTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        make_tree(self.root, {
+            'a/': 100, 'a/b/': 100, 'a/b/c.txt': 800, 'a/d.txt': 300,
+            'e/': 600, 'f.txt': 400,
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_children_match_full_scan(self):
+        progress = []
+        tree = MtimeTree(self.root).scan(progress=lambda *args:
+                                         progress.append(args))
+        self.assertEqual(progress[-1], (tree.dirs, tree.entries))
+        for path in [self.root, os.path.join(self.root, 'a'),
+                     os.path.join(self.root, 'a', 'b')]:
+            with self.subTest(path=path):
+                self.assertEqual(list(tree.children(path)),
+                                 list(get_latest_modification_time(path)))
+        self.assertEqual(tree.latest[os.path.join(self.root, 'e')], None)
+
+    def test_cancel(self):
+        cancel = threading.Event()
+        cancel.set()
+        with self.assertRaises(CancelledError):
+            MtimeTree(self.root).scan(cancel)
+
+    @unittest.skipIf(os.name == 'nt' or os.geteuid() == 0,
+                     'permissions are not enforced')
+    def test_unreadable_subfolder(self):
+        locked = os.path.join(self.root, 'a', 'b')
+        os.chmod(locked, 0)
+        try:
+            tree = MtimeTree(self.root).scan()
+        finally:
+            os.chmod(locked, 0o755)
+        self.assertEqual([path for path, _ in tree.guard.errors], [locked])
+        self.assertEqual(tree.incomplete,
+                         {self.root, os.path.join(self.root, 'a'), locked})
+        result = tree.children()
+        self.assertEqual(result.names, ['e', 'f.txt', 'a'])
+        self.assertEqual(result.incomplete, ['a'])
+        self.assertEqual([path for path, _ in result.errors], [locked])
+        self.assertIsNone(tree.children(os.path.join(self.root, 'e')).errors)
+
+
+class TestDepth(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        make_tree(self.root, {
+            'a/': 100, 'a/b/': 100, 'a/b/c/': 100, 'a/b/c/x.txt': 800,
+            'a/y.txt': 300, 'd/': 600, 'f.txt': 400,
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_nested_levels(self):
+        result = multi_check([self.root], depth=3, workers=2)[0]
+        self.assertEqual(list(result),
+                         list(get_latest_modification_time(self.root)))
+        a = result.subresults['a']
+        self.assertEqual(list(a), list(get_latest_modification_time(
+            os.path.join(self.root, 'a'))))
+        self.assertEqual(a.subresults['b'].names, ['c'])
+        self.assertEqual(a.subresults['b'].subresults, None)
+        self.assertEqual(len(result.subresults['d']), 0)
+        self.assertIsNone(multi_check([self.root])[0].subresults)
+        self.assertEqual(render_json([result])[self.root][0]['children'][1],
+                         {format_mtime(300 * 10**9): 'y.txt'})
+        self.assertIn("\n        " + format_mtime(800 * 10**9) + " - c\n",
+                      render_text([result], linesep='\n'))
+
+    def test_single_pass(self):
+        counts = []
+        for depth in (1, 3):
+            stats = ScanStats()
+            multi_check([self.root], depth=depth, stats=stats)
+            counts.append((stats.counts.scandir_calls,
+                           stats.counts.stat_calls))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_unsupported(self):
+        for kwargs in [{'engine': 'process'}, {'exclude': ['d']},
+                       {'depth': 0}]:
+            with self.subTest(**kwargs):
+                with self.assertRaises(ValueError):
+                    multi_check([self.root], **{'depth': 2, **kwargs})
+
+
+class TestSelection(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        spec = {f'f{i:02}.txt': 1000 + 7 * i for i in range(40)}
+        spec.update({'a/': 100, 'a/x.txt': 1200, 'b/': 1050, 'c/': 100,
+                     'c/y.txt': 900})
+        make_tree(self.root, spec)
+        self.full = list(get_latest_modification_time(self.root))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pages(self):
+        oldest = self.full[::-1]
+        cases = [({'limit': 5}, self.full[:5]),
+                 ({'limit': 5, 'offset': 3}, self.full[3:8]),
+                 ({'limit': 5, 'oldest': True}, oldest[:5]),
+                 ({'offset': 40}, self.full[40:]),
+                 ({'oldest': True}, oldest),
+                 ({'limit': 100}, self.full)]
+        for kwargs, expected in cases:
+            for engine, workers, stats in [('iterative', None, None),
+                                           ('iterative', 2, ScanStats()),
+                                           ('process', 2, None)]:
+                with self.subTest(engine=engine, workers=workers,
+                                  stats=stats is not None, **kwargs):
+                    result = multi_check([self.root], engine, workers,
+                                         stats=stats, **kwargs)[0]
+                    self.assertEqual(list(result), expected)
+                    self.assertEqual(result.omitted,
+                                     len(self.full) - len(expected))
+                    self.assertEqual(result.latest, self.full[0][0])
+
+    def test_omitted_output(self):
+        result = get_latest_modification_time(self.root, limit=2)
+        self.assertIn(f"Omitted {len(self.full) - 2} entries.",
+                      render_text([result]))
+        record = next(ndjson_records(result))
+        self.assertEqual(record['omitted'], len(self.full) - 2)
+        self.assertIsNone(get_latest_modification_time(self.root).omitted)
+
+    def test_since_and_depth(self):
+        result = get_latest_modification_time(self.root, since=1250,
+                                              limit=3, oldest=True)
+        changed = [entry for entry in self.full if entry[0] > 1250 * 10**9]
+        self.assertEqual(list(result), changed[::-1][:3])
+        self.assertEqual(result.omitted, len(changed) - 3)
+        result = multi_check([self.root], depth=2, limit=1)[0]
+        self.assertEqual(result.subresults['a'].names, ['x.txt'])
+        self.assertEqual(len(result), 1)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            get_latest_modification_time(self.root, limit=-1)
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, 'root')
+        make_tree(self.root, {
+            'a/': 100, 'a/x.txt': 200, 'b/': 300, 'c.txt': 400, 'd.txt': 500,
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip(self):
+        results = multi_check([self.root], depth=2)
+        snapshot = Snapshot.from_results(results, 123)
+        path = os.path.join(self.tmp.name, 'scan.snap')
+        snapshot.save(path)
+        loaded = Snapshot.load(path)
+        self.assertEqual(loaded.created_ns, 123)
+        self.assertEqual(loaded.dirs, snapshot.dirs)
+        self.assertEqual(loaded.roots, [self.root])
+        self.assertEqual(loaded.depth, 2)
+        self.assertEqual(loaded.dirs[self.root][1],
+                         ['a', 'b', 'c.txt', 'd.txt'])
+        self.assertEqual(list(diff_snapshots(snapshot, loaded)), [])
+        with open(path, 'wb') as f:
+            f.write(b'not a snapshot' * 4)
+        with self.assertRaises(ValueError):
+            Snapshot.load(path)
+
+    def test_nested_roots(self):
+        a = os.path.join(self.root, 'a')
+        for paths in ([self.root, a], [a, self.root]):
+            with self.subTest(paths=paths):
+                snapshot = Snapshot.from_results(multi_check(paths, depth=2))
+                self.assertEqual(sorted(snapshot.roots), [self.root, a])
+                self.assertEqual(snapshot.depth, 2)
+                self.assertEqual(snapshot.dirs[a][:2], (0, ['x.txt']))
+                path = os.path.join(self.tmp.name, 'nested.snap')
+                snapshot.save(path)
+                self.assertEqual(Snapshot.load(path).dirs, snapshot.dirs)
+
+    def test_diff(self):
+        old = Snapshot.from_results(multi_check([self.root], depth=2))
+        make_tree(self.root, {'a/x.txt': 900, 'e.txt': 600})
+        os.remove(os.path.join(self.root, 'd.txt'))
+        new = Snapshot.from_results(multi_check([self.root], depth=2))
+        a = os.path.join(self.root, 'a')
+        self.assertEqual(list(diff_snapshots(old, new)), [
+            (self.root, 'a', 'changed', 200 * 10**9, 900 * 10**9, True),
+            (self.root, 'd.txt', 'removed', 500 * 10**9, None, False),
+            (self.root, 'e.txt', 'added', None, 600 * 10**9, False),
+            (a, 'x.txt', 'changed', 200 * 10**9, 900 * 10**9, False),
+        ])
+        text = render_diff(diff_snapshots(old, new), linesep='\n')
+        self.assertIn(f"removed  {format_mtime(500 * 10**9)} - d.txt\n", text)
+        self.assertEqual(render_diff([]), f"No changes.{os.linesep}")
+
+
+class TestBinaryReport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, 'root')
+        make_tree(self.root, {
+            'a/': 100, 'a/x.txt': 200, 'b/': 300, 'c.txt': 400, 'd.txt': 500,
+            '中文.txt': 600,
+        })
+        self.path = os.path.join(self.tmp.name, 'report.mtr')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip(self):
+        results = multi_check([self.root], depth=2)
+        write_report(self.path, results)
+        with ReportReader(self.path) as reader:
+            self.assertEqual(reader.roots, [self.root])
+            self.assertEqual(len(reader), 3)
+            section = reader[self.root]
+            self.assertEqual(list(section), list(results[0]))
+            self.assertEqual(section[-1], (200 * 10**9, 'a', 1))
+            self.assertEqual([name for _, name, _ in section.between(
+                300 * 10**9, 500 * 10**9)], ['c.txt', 'b'])
+            self.assertEqual(len(list(section.between(end_ns=100))), 0)
+            self.assertEqual(list(reader[os.path.join(self.root, 'a')]),
+                             [(200 * 10**9, 'x.txt', 0)])
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * 64)
+        with self.assertRaises(ValueError):
+            ReportReader(self.path)
+
+    def test_nested_roots(self):
+        a = os.path.join(self.root, 'a')
+        for paths in ([self.root, a], [a, self.root]):
+            with self.subTest(paths=paths):
+                write_report(self.path, multi_check(paths, depth=2))
+                with ReportReader(self.path) as reader:
+                    self.assertEqual(sorted(reader.roots), [self.root, a])
+                    self.assertEqual(len(reader), 3)
+                    self.assertEqual(reader[a].level, 0)
+                    self.assertEqual(list(reader[a]),
+                                     [(200 * 10**9, 'x.txt', 0)])
+                for share_nested in (False, True):
+                    with open(self.path, 'wb') as f:
+                        stream_check(paths, f, 'binary', depth=2,
+                                     share_nested=share_nested)
+                    with ReportReader(self.path) as reader:
+                        self.assertEqual(sorted(reader.roots), [self.root, a])
+                        self.assertEqual(reader[a].level, 0)
+
+    def test_stream(self):
+        with open(self.path, 'wb') as f:
+            stream_check([self.root], f, 'binary')
+        with ReportReader(self.path) as reader:
+            self.assertEqual(list(reader[self.root]),
+                             list(get_latest_modification_time(self.root)))
+        out = io.StringIO()
+        stream_check([self.root], out, 'json')
+        self.assertEqual(out.getvalue(), json.dumps(
+            render_json(multi_check([self.root])), ensure_ascii=False,
+            indent=4))
+        paths = [self.root, os.path.join(self.root, 'a')]
+        out = io.StringIO()
+        stream_check(paths, out, 'json')
+        self.assertEqual(json.loads(out.getvalue()),
+                         render_json(multi_check(paths)))
+        self.assertEqual(''.join(json_chunks([])), '{}')
+
+
+class TestNestedRoots(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, 'data')
+        make_tree(self.root, {
+            'p/': 100, 'p/q/': 100, 'p/q/r.txt': 700, 'p/q/s/': 100,
+            'p/q/s/t.txt': 300, 'p/u.txt': 200, 'v/': 100, 'v/w.txt': 400,
+            'x.txt': 500,
+        })
+        self.link = os.path.join(self.tmp.name, 'link')
+        os.symlink(self.root, self.link)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_unique_roots(self):
+        paths = [self.root + os.sep, self.root, self.link,
+                 os.path.join(self.root, 'v'), 'missing']
+        self.assertEqual(unique_roots(paths),
+                         [self.root + os.sep, os.path.join(self.root, 'v'),
+                          'missing'])
+
+    def test_shared_walk(self):
+        nested = [os.path.join(self.root, 'p', 'q'),
+                  os.path.join(self.root, 'p', 'q', 's'),
+                  os.path.join(self.link, 'v')]
+        for depth, limit in ((1, None), (2, None), (3, 1)):
+            with self.subTest(depth=depth, limit=limit):
+                separate = [multi_check([path], depth=depth, limit=limit)[0]
+                            for path in [self.root, *nested]]
+                stats = ScanStats()
+                shared = multi_check([*nested, self.root, self.link],
+                                     depth=depth, limit=limit, stats=stats)
+                self.assertEqual([result.path for result in shared],
+                                 [*nested, self.root])
+                self.assertEqual(
+                    [render_json([result]) for result in shared],
+                    [render_json([result]) for result in
+                     separate[1:] + separate[:1]])
+                alone = ScanStats()
+                multi_check([self.root], depth=depth, limit=limit,
+                            stats=alone)
+                # 嵌套的目标路径不会再次列出
+                self.assertEqual(stats.counts.scandir_calls,
+                                 alone.counts.scandir_calls)
+
+    def test_cli_stream_shares_walk(self):
+        out = os.path.join(self.tmp.name, 'out.ndjson')
+        calls = []
+        for paths in ([self.root], [self.root, os.path.join(self.root, 'p')]):
+            sys.argv = ['modtime_pecker.py', '-p', *paths, '--format',
+                        'ndjson', '--out', out, '--stats']
+            err = io.StringIO()
+            with contextlib.redirect_stderr(err):
+                cli()
+            calls.append(re.search(r'scandir calls: (\d+)',
+                                   err.getvalue()).group(1))
+            with open(out, encoding='utf-8') as f:
+                self.assertEqual([json.loads(line)['path'] for line in f],
+                                 paths)
+        # 命令行已读取完所有目标路径，流式输出时嵌套的目标路径不会再次列出
+        self.assertEqual(calls[0], calls[1])
+
+    def test_stream_reads_paths_lazily(self):
+        out = io.StringIO()
+        written = []
+
+        def paths():
+            for path in (self.root, os.path.join(self.root, 'p', 'q'),
+                         os.path.join(self.root, 'v')):
+                written.append(out.getvalue().count('\n'))
+                yield path
+        self.assertEqual(stream_check(paths(), out, concurrency=1), 3)
+        # 只预先读取一个目标路径，读取第三个目标路径时第一个目标路径的结果已经写出
+        self.assertEqual(written, [0, 0, 1])
+
+
+class TestAgent(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.roots = [os.path.join(self.tmp.name, name)
+                      for name in ('host1', 'host2')]
+        make_tree(self.roots[0], {'a/': 100, 'a/x.txt': 400, 'b.txt': 200})
+        make_tree(self.roots[1], {'c/': 100, 'c/y.txt': 300, 'd.txt': 500})
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        self.tmp.cleanup()
+
+    def start(self, check):
+        server = AgentServer(check, ('127.0.0.1', 0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.servers.append(server)
+        return server.address
+
+    def test_merge_and_failures(self):
+        agents = [self.start(agent_handler([root])) for root in self.roots]
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            dead = f"127.0.0.1:{sock.getsockname()[1]}"
+        with Coordinator([*agents, dead], timeout=5) as coordinator:
+            responses, failures = coordinator.check({})
+            self.assertEqual(list(responses), agents)
+            self.assertEqual(list(failures), [dead])
+            self.assertEqual(
+                [(agent, entry['name']) for agent, _, entry in
+                 rank(responses)],
+                [(agents[1], 'd.txt'), (agents[0], 'a'), (agents[1], 'c'),
+                 (agents[0], 'b.txt')])
+            # 之后的请求复用同一连接，代理之外的路径被拒绝
+            responses, _ = coordinator.check({'limit': 1, 'oldest': True})
+            self.assertEqual([entry['name'] for _, _, entry in
+                              rank(responses, oldest=True)], ['b.txt', 'c'])
+            responses, failures = coordinator.check(
+                {'paths': [self.roots[0]]})
+            self.assertEqual(list(responses), [agents[0]])
+            self.assertIn('outside', failures[agents[1]])
+            for agent in agents:
+                self.assertEqual(coordinator.clients[agent].connections, 1)
+        text = render_ranking(rank(responses), failures)
+        self.assertIn(f"a (in {self.roots[0]} on {agents[0]})", text)
+        self.assertIn("Failed agents:", text)
+
+    def test_malformed_request(self):
+        agent = self.start(agent_handler(self.roots))
+        client = AgentClient(agent, timeout=5)
+        try:
+            for request in ({'since': '1'}, {'depth': 1.5}, {'limit': -1},
+                            {'oldest': 'yes'}):
+                with self.subTest(request=request):
+                    with self.assertRaises(AgentError) as cm:
+                        client.check(request)
+                    self.assertIn('Invalid', str(cm.exception))
+            # 出错后代理仍可处理请求
+            self.assertEqual(len(client.check({'limit': 1})['results']), 2)
+        finally:
+            client.close()
+        host, port = agent.rsplit(':', 1)
+        conn = http.client.HTTPConnection(host, int(port), timeout=5)
+        try:
+            conn.request('POST', '/check', b'{"since": "1"}')
+            self.assertEqual(conn.getresponse().status, 400)
+        finally:
+            conn.close()
+        with self.assertRaises(TypeError):
+            get_latest_modification_time(self.roots[0], since='1')
+        conn = http.client.HTTPConnection(host, int(port), timeout=5)
+        try:
+            conn.putrequest('POST', '/check')
+            conn.putheader('Content-Length', 'abc')
+            conn.endheaders()
+            self.assertEqual(conn.getresponse().status, 400)
+        finally:
+            conn.close()
+
+    def test_non_object_reply(self):
+        class Proxy(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                body = b'["bad gateway"]'
+                self.send_response(502)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+        proxy = ThreadingHTTPServer(('127.0.0.1', 0), Proxy)
+        threading.Thread(target=proxy.serve_forever, daemon=True).start()
+        self.servers.append(proxy)
+        agents = [f"127.0.0.1:{proxy.server_address[1]}",
+                  self.start(agent_handler(self.roots))]
+        with Coordinator(agents, timeout=5) as coordinator:
+            responses, failures = coordinator.check({})
+        self.assertEqual(failures, {agents[0]: 'Invalid response (HTTP 502)'})
+        self.assertEqual(list(responses), agents[1:])
+
+    def test_timeout(self):
+        def slow(request):
+            time.sleep(1)
+            return []
+
+        agents = [self.start(slow), self.start(agent_handler(self.roots))]
+        with Coordinator(agents, timeout=0.2) as coordinator:
+            responses, failures = coordinator.check({'limit': 1})
+        self.assertEqual(failures, {agents[0]: 'timed out after 0.2s'})
+        self.assertEqual([entry['name'] for _, _, entry in rank(responses)],
+                         ['d.txt', 'a'])
+
+
+class TestAsyncScan(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.roots = []
+        for i in range(3):
+            root = os.path.join(self.tmp.name, str(i))
+            make_tree(root, {'a/': 100 + i, 'a/x.txt': 700 + i, 'b.txt': 500})
+            self.roots.append(root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scan_yields_every_root(self):
+        async def collect():
+            return [result async for result in
+                    scan(self.roots, workers=2, concurrency=2)]
+        results = asyncio.run(collect())
+        self.assertEqual(sorted(result.path for result in results),
+                         sorted(self.roots))
+        for result in results:
+            self.assertEqual(list(result),
+                             list(get_latest_modification_time(result.path)))
+
+    def test_stream_ndjson(self):
+        out = io.StringIO()
+        self.assertEqual(stream_check(iter(self.roots), out, workers=2,
+                                      concurrency=1), 3)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(sorted(record['path'] for record in records),
+                         sorted(self.roots))
+        self.assertEqual(records[0]['entries'][0]['name'], 'a')
+
+        out = io.StringIO()
+        stream_check(self.roots[:1], out, per_child=True)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(r['name'], r['is_dir']) for r in records],
+                         [('a', True), ('b.txt', False)])
+
+    def test_early_exit(self):
+        async def first():
+            async for result in scan(self.roots, concurrency=1):
+                return result
+        self.assertIn(asyncio.run(first()).path, self.roots)
+
+
+class TestMtimeIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, 'root')
+        self.index_path = os.path.join(self.tmp.name, 'cache', 'index.db')
+        make_tree(self.root, {
+            'a/': 100, 'a/x.txt': 700, 'a/b/': 200, 'a/b/y.txt': 900,
+            'c/': 400, 'c/d/': 300, 'e.txt': 500,
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check(self, rebuild=False):
+        with MtimeIndex(self.index_path, rebuild=rebuild) as index:
+            results = multi_check([self.root], index=index)
+        return [list(r) for r in results], index
+
+    def test_unchanged_rescan_saves_scandir(self):
+        expected = [list(r) for r in multi_check([self.root])]
+        first, index = self.check()
+        self.assertEqual(first, expected)
+        self.assertEqual(index.scandir_saved, 0)
+        second, index = self.check()
+        self.assertEqual(second, expected)
+        self.assertEqual(index.scandir_calls, 0)
+        self.assertEqual(index.scandir_saved, 4)
+        _, index = self.check(rebuild=True)
+        self.assertEqual(index.scandir_saved, 0)
+
+    def test_changed_file_and_folder(self):
+        self.check()
+        # 修改已知文件只需重新stat，新增文件会改变所在文件夹的修改时间
+        os.utime(os.path.join(self.root, 'a', 'x.txt'), (8000, 8000))
+        make_tree(self.root, {'c/d/z.txt': 9000})
+        results, index = self.check()
+        self.assertEqual(results, [list(r) for r in multi_check([self.root])])
+        self.assertEqual(results[0][0][1], 'c')
+        self.assertIn((8000 * 10**9, 'a', 1), results[0])
+        self.assertEqual(index.scandir_calls, 1)
+
+    def test_entry_vanishes_during_listing(self):
+        a = os.path.join(self.root, 'a')
+        x = os.path.join(a, 'x.txt')
+        real_scandir = os.scandir
+
+        def racing_scandir(path):
+            if path != a or not os.path.exists(x):
+                return real_scandir(path)
+            with real_scandir(path) as it:
+                entries = list(it)
+            # 在scandir之后、stat之前删除条目
+            os.remove(x)
+            return contextlib.nullcontext(entries)
+        os.scandir = racing_scandir
+        try:
+            with MtimeIndex(self.index_path) as index:
+                result = multi_check([self.root], index=index)[0]
+        finally:
+            os.scandir = real_scandir
+        self.assertEqual([path for path, _ in result.errors], [x])
+        self.assertEqual(result.incomplete, ['a'])
+        self.assertIn((900 * 10**9, 'a', 1), list(result))
+        # 跳过条目的文件夹不写入索引，下次检查时重新列出
+        results, index = self.check()
+        self.assertEqual(results, [list(r) for r in multi_check([self.root])])
+        self.assertEqual(index.scandir_calls, 1)
+
+    def test_old_schema(self):
+        os.makedirs(os.path.dirname(self.index_path))
+        conn = sqlite3.connect(self.index_path)
+        conn.execute(
+            "CREATE TABLE dirs (path BLOB PRIMARY KEY, "
+            "mtime_ns INTEGER NOT NULL, scanned_ns INTEGER NOT NULL, "
+            "latest_ns INTEGER, entries TEXT NOT NULL)")
+        conn.close()
+        self.check()
+        self.assertEqual(self.check()[1].scandir_calls, 0)
+
+    def test_rejects_parallel(self):
+        with MtimeIndex(self.index_path) as index:
+            with self.assertRaises(ValueError):
+                multi_check([self.root], workers=2, index=index)
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        make_tree(self.root, {
+            'a/': 100, 'a/b/': 200, 'a/b/y.txt': 900,
+            'c/': 400, 'c/d/': 300, 'e.txt': 500,
+        })
+        self.watcher = Watcher([self.root], poll_interval=0.2)
+
+    def tearDown(self):
+        self.watcher.close()
+        self.tmp.cleanup()
+
+    def names(self):
+        return [name for _, name, _ in self.watcher.ranking(self.root)]
+
+    def wait_for(self, names):
+        for _ in range(20):
+            self.watcher.poll_once(0.1)
+            if self.names() == names:
+                break
+        self.assertEqual(self.names(), names)
+
+    def test_initial_scan(self):
+        self.assertEqual(list(watch_results(self.watcher)[0]),
+                         list(get_latest_modification_time(self.root)))
+
+    def test_updates(self):
+        # 深层文件的修改沿祖先链回传给直接子文件夹
+        os.utime(os.path.join(self.root, 'c', 'd'), (8000, 8000))
+        self.wait_for(['c', 'a', 'e.txt'])
+        # 新建的子文件夹被加入监视，其中的变化同样回传
+        new_dir = os.path.join(self.root, 'a', 'b', 'new')
+        os.makedirs(new_dir)
+        self.wait_for(['a', 'c', 'e.txt'])
+        self.assertIn(new_dir, self.watcher.dirs)
+        future = 4 * 10**9
+        make_tree(self.root, {'a/b/new/z.txt': future})
+        for _ in range(20):
+            self.watcher.poll_once(0.1)
+            if self.watcher.ranking(self.root)[0][0] == future * 10**9:
+                break
+        self.assertEqual(self.watcher.ranking(self.root)[0],
+                         (future * 10**9, 'a', True))
+        # 直接子条目的新增和删除
+        os.remove(os.path.join(self.root, 'e.txt'))
+        make_tree(self.root, {'f.txt': 100})
+        self.wait_for(['a', 'c', 'f.txt'])
+
+    def test_rejects_ignored_options(self):
+        for option in (['--since', '0'], ['--engine', 'recursive'],
+                       ['-w', '2'], ['--follow-symlinks'], ['--dedup'],
+                       ['--index', 'x.db'], ['--stats'],
+                       ['--format', 'ndjson'], ['--out', 'x.json'], ['-sj'],
+                       ['--time-budget', '1'], ['--eta-file', 'x.json']):
+            with self.subTest(option=option):
+                sys.argv = ['modtime_pecker.py', '-p', self.root, '--watch',
+                            *option]
+                with contextlib.redirect_stderr(io.StringIO()), \
+                        self.assertRaises(SystemExit):
+                    cli()
+
+
+class TestFaultTolerance(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        make_tree(self.root, {
+            'a/': 100, 'a/x.txt': 700, 'a/b/': 200, 'a/b/y.txt': 900,
+            'c/': 400, 'c/d/': 300, 'e.txt': 500,
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_engines_record_errors(self):
+        missing = os.path.join(self.root, 'missing')
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                with self.assertRaises(FileNotFoundError):
+                    ENGINES[engine](missing)
+                guard = ScanGuard()
+                self.assertIsNone(ENGINES[engine](missing, guard=guard))
+                self.assertEqual([path for path, _ in guard.errors],
+                                 [missing])
+
+    @unittest.skipIf(os.name == 'nt' or os.geteuid() == 0,
+                     'permissions are not enforced')
+    def test_unreadable_subfolder(self):
+        locked = os.path.join(self.root, 'a', 'b')
+        os.chmod(locked, 0)
+        try:
+            for engine in ENGINES:
+                with self.subTest(engine=engine):
+                    result = get_latest_modification_time(self.root, engine)
+                    self.assertEqual(result.names, ['a', 'e.txt', 'c'])
+                    self.assertEqual(result.incomplete, ['a'])
+                    self.assertEqual([path for path, _ in result.errors],
+                                     [locked])
+                    self.assertFalse(result.complete)
+        finally:
+            os.chmod(locked, 0o755)
+
+    def test_timeout_keeps_partial_results(self):
+        engines = [DEFAULT_ENGINE, 'process']
+        if _load_numpy() is not None:
+            engines.append('numpy')
+        for engine in engines:
+            with self.subTest(engine=engine):
+                result, = multi_check([self.root], engine, progress=False,
+                                      timeout=1e-9)
+                # 直接子条目都已列出，子文件夹只计入其自身的修改时间
+                self.assertEqual(list(result), [
+                    (500 * 10**9, 'e.txt', False),
+                    (400 * 10**9, 'c', True), (100 * 10**9, 'a', True)])
+                self.assertTrue(result.timed_out)
+                self.assertEqual(result.incomplete, ['c', 'a'])
+                record, = ndjson_records(result)
+                self.assertEqual(record['incomplete'], ['c', 'a'])
+                self.assertTrue(record['timed_out'])
+        # 展开的各层文件夹在超时后不再列出
+        result, = multi_check([self.root], progress=False, depth=2,
+                              timeout=1e-9)
+        self.assertTrue(result.timed_out)
+        self.assertEqual(result.incomplete, ['c', 'a'])
+        self.assertEqual([len(child) for child in result.subresults.values()],
+                         [0, 0])
+        with self.assertRaises(ValueError):
+            multi_check([self.root], progress=False, timeout=0)
+
+    def test_complete_scan(self):
+        progress = ScanProgress()
+        result, = multi_check([self.root], progress=progress,
+                              root_timeout=60)
+        self.assertTrue(result.complete)
+        self.assertNotIn('errors', next(ndjson_records(result)))
+        # 目标路径和a、a/b、c、c/d各列出一次
+        self.assertEqual((progress.dirs, progress.entries), (5, 7))
+
+    def test_progress_eta(self):
+        progress = ScanProgress(expected_entries=100)
+        self.assertIsNone(ScanProgress().eta())
+        progress.add(1, 50)
+        progress.started -= 2
+        self.assertAlmostEqual(progress.rates()[1], 25, places=0)
+        self.assertAlmostEqual(progress.eta(), 2, places=0)
+        progress.add(1, 50)
+        self.assertIsNone(progress.eta())
+
+    def test_stream_progress(self):
+        try:
+            import tqdm
+        except ImportError:
+            self.skipTest('tqdm is not installed')
+        progress = ScanProgress()
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err):
+            stream_check([self.root], io.StringIO(), progress=progress)
+        self.assertGreater(progress.entries, 0)
+        self.assertIn('entries', err.getvalue())
 
 
 if __name__ == '__main__':